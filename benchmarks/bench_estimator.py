@@ -0,0 +1,55 @@
+"""Throughput of the token estimators, in MB/s of input text.
+
+Run with ``python benchmarks/bench_estimator.py``.
+"""
+from __future__ import annotations
+
+import json
+import time
+from typing import Callable, List
+
+from beskar.estimator import CalibratedEstimator
+from beskar.tokenizer import BPEEstimator
+from beskar.types import estimate_tokens
+
+PROSE = (
+    "The quick brown fox jumps over the lazy dog while the assistant reads "
+    "the tool output and decides which file to open next. "
+)
+CODE = "def handler(event, context):\n    return {'status': 200, 'body': event['id']}\n"
+JSON = json.dumps({"id": 123, "items": [{"name": "widget", "price": 9.99}] * 4})
+
+
+def _corpus(blocks: int) -> List[str]:
+    samples = [PROSE * 8, CODE * 6, JSON * 2]
+    return [samples[i % len(samples)] + str(i) for i in range(blocks)]
+
+
+def _measure(label: str, texts: List[str], run: Callable[[], object], repeat: int = 5) -> None:
+    run()  # warm caches and lazy loads
+    size_mb = sum(len(t.encode("utf-8")) for t in texts) / 1e6
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<34} {size_mb / best:10.1f} MB/s")
+
+
+def main() -> None:
+    texts = _corpus(2000)
+    bpe = BPEEstimator()
+    calibrated = CalibratedEstimator()
+    _measure("estimate_tokens (len // 4)", texts, lambda: [estimate_tokens(t) for t in texts])
+    _measure("CalibratedEstimator", texts, lambda: calibrated.estimate_many(texts))
+    _measure("BPEEstimator per text", texts, lambda: [bpe(t) for t in texts])
+    _measure("BPEEstimator.estimate_many", texts, lambda: bpe.estimate_many(texts))
+
+    cold = BPEEstimator()
+    start = time.perf_counter()
+    cold.estimate_many(texts)
+    print(f"{'BPEEstimator cold (load + fill)':<34} {time.perf_counter() - start:10.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Importance pruning time at 1k, 10k and 100k messages.
+
+Compares the column-scored pruner (NumPy when installed, pure Python
+otherwise) with the previous per-unit scoring and full sort. Run with
+``python benchmarks/bench_pruner.py``.
+"""
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Dict, List
+
+from beskar import pruner
+from beskar.pruner import _get_content_text, _has_tool_use, find_tool_pairs, prune_messages
+from beskar.types import BeskarMessage, PrunerConfig
+
+
+def _conversation(n: int) -> List[BeskarMessage]:
+    messages: List[BeskarMessage] = []
+    while len(messages) < n:
+        i = len(messages)
+        if i % 7 == 0:
+            messages.append(
+                {
+                    "role": "assistant",
+                    "content": [{"type": "tool_use", "id": f"t{i}", "name": "fn", "input": {}}],
+                }
+            )
+            messages.append(
+                {
+                    "role": "user",
+                    "content": [{"type": "tool_result", "tool_use_id": f"t{i}", "content": "ok"}],
+                }
+            )
+        else:
+            role = "user" if i % 2 == 0 else "assistant"
+            messages.append({"role": role, "content": "word " * (i * 37 % 900)})
+    return messages[:n]
+
+
+def _full_sort_prune(messages: List[BeskarMessage], max_turns: int) -> List[BeskarMessage]:
+    # The pruner before column scoring: a dict per unit and a full sort.
+    total = len(messages)
+    pairs = find_tool_pairs(messages)
+
+    def score(i: int) -> float:
+        length = min(len(_get_content_text(messages[i])) / 5000, 0.2)
+        return (i / total) * 0.5 + (0.3 if _has_tool_use(messages[i]) else 0.0) + length
+
+    index_to_pair: Dict[int, str] = {}
+    for pid, (use_idx, result_idx) in pairs.items():
+        for idx in (use_idx, result_idx):
+            if idx >= 0:
+                index_to_pair[idx] = pid
+    processed: set[int] = set()
+    units: List[Dict[str, Any]] = []
+    for i in range(total):
+        if i in processed:
+            continue
+        pid = index_to_pair.get(i)
+        indices = [idx for idx in pairs[pid] if idx >= 0] if pid is not None else [i]
+        units.append({"indices": indices, "score": min(score(idx) for idx in indices)})
+        processed.update(indices)
+    units.sort(key=lambda u: u["score"])
+    dropped: set[int] = set()
+    remaining = total
+    for unit in units:
+        if remaining <= max_turns or remaining - len(unit["indices"]) < 1:
+            break
+        dropped.update(unit["indices"])
+        remaining -= len(unit["indices"])
+    return [m for i, m in enumerate(messages) if i not in dropped]
+
+
+def _best(run: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    numpy = pruner._np
+    print(f"{'messages':>9} {'full sort':>12} {'columns':>12} {'numpy':>12}")
+    for n in (1_000, 10_000, 100_000):
+        messages = _conversation(n)
+        config = PrunerConfig(strategy="importance", max_turns=n // 10)
+        repeat = 5 if n < 100_000 else 2
+        full_sort = _best(lambda: _full_sort_prune(messages, n // 10), repeat)
+        pruner._np = None
+        columns = _best(lambda: prune_messages(messages, config), repeat)
+        pruner._np = numpy
+        vectorized = (
+            f"{_best(lambda: prune_messages(messages, config), repeat) * 1e3:10.1f}ms"
+            if numpy is not None
+            else f"{'n/a':>12}"
+        )
+        print(f"{n:>9} {full_sort * 1e3:10.1f}ms {columns * 1e3:10.1f}ms {vectorized}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,14 @@
 """Beskar — Claude-native token optimization for agentic pipelines."""
 from __future__ import annotations
 
-from .client import BeskarClient
-from .types import BeskarError, CompressorError, PrunerError
+from .client import AsyncBeskarClient, BeskarClient
+from .types import BeskarError, CompressorError, PreflightError, PrunerError
 
-__all__ = ["BeskarClient", "BeskarError", "CompressorError", "PrunerError"]
+__all__ = [
+    "AsyncBeskarClient",
+    "BeskarClient",
+    "BeskarError",
+    "CompressorError",
+    "PreflightError",
+    "PrunerError",
+]
@@ -3,9 +3,9 @@ from __future__ import annotations
 
 import json
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, TypedDict, Union, cast
+from typing import Any, Callable, Dict, List, Optional, TypedDict, Union, cast
 
-from .types import BeskarMessage, CacheBreakpoint, CacheConfig, estimate_tokens
+from .types import BeskarMessage, CacheBreakpoint, CacheConfig, estimate_many, estimate_tokens
 
 
 class _CacheRequestRequired(TypedDict):
@@ -26,6 +26,7 @@ class CacheResult:
 def structure_cache(
     request: CacheRequest,
     config: Optional[CacheConfig] = None,
+    estimator: Optional[Callable[[str], int]] = None,
 ) -> CacheResult:
     """Place cache_control breakpoints on eligible content blocks.
 
@@ -36,6 +37,7 @@ def structure_cache(
     Enforces a maximum of 4 breakpoints per request.
     Never mutates the input request.
     """
+    estimate = estimator or estimate_tokens
     threshold = config.min_token_threshold if config is not None else 1024
     breakpoints: List[CacheBreakpoint] = []
     placed = 0
@@ -48,7 +50,7 @@ def structure_cache(
     # 1. System prompt breakpoint
     if placed < 4 and system is not None:
         if isinstance(system, str):
-            tokens = estimate_tokens(system)
+            tokens = estimate(system)
             if tokens >= threshold:
                 system = [
                     {"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}
@@ -57,7 +59,9 @@ def structure_cache(
                 placed += 1
         elif isinstance(system, list) and len(system) > 0:
             last_idx = len(system) - 1
-            total_tokens = sum(estimate_tokens(str(block.get("text", ""))) for block in system)
+            total_tokens = sum(
+                estimate_many([str(block.get("text", "")) for block in system], estimate)
+            )
             if total_tokens >= threshold:
                 system = [
                     {**block, "cache_control": {"type": "ephemeral"}} if i == last_idx else block
@@ -68,7 +72,7 @@ def structure_cache(
 
     # 2. Tools breakpoint
     if placed < 4 and tools:
-        combined_tokens = estimate_tokens(
+        combined_tokens = estimate(
             "".join(json.dumps(t, default=str) for t in tools)
         )
         if combined_tokens >= threshold:
@@ -80,7 +84,7 @@ def structure_cache(
             breakpoints.append(
                 CacheBreakpoint(
                     position=last_idx,
-                    estimated_tokens=estimate_tokens(
+                    estimated_tokens=estimate(
                         json.dumps(tools[last_idx], default=str)
                     ),
                 )
@@ -103,7 +107,7 @@ def structure_cache(
         content: Any = msg["content"]
 
         if isinstance(content, str):
-            tokens = estimate_tokens(content)
+            tokens = estimate(content)
             if tokens >= threshold:
                 placed += 1
                 breakpoints.append(CacheBreakpoint(position=i, estimated_tokens=tokens))
@@ -136,7 +140,7 @@ def structure_cache(
             new_messages.append(msg)
             continue
 
-        tokens = estimate_tokens(str(content_list[last_text_idx].get("text", "")))
+        tokens = estimate(str(content_list[last_text_idx].get("text", "")))
         if tokens >= threshold:
             placed += 1
             breakpoints.append(CacheBreakpoint(position=i, estimated_tokens=tokens))
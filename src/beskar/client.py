@@ -1,98 +1,646 @@
-"""Client module — BeskarClient wrapping the Anthropic SDK."""
+"""Client module — BeskarClient and AsyncBeskarClient wrapping the Anthropic SDK."""
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Union
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Literal, Optional, Sequence, Tuple, Union, overload
 
 import anthropic
 
 from .cache import structure_cache
-from .compressor import collapse_tool_chains, compress_tool_result
-from .metrics import MetricsTracker, create_metrics_tracker
+from .compressor import (
+    ToolTokenCache,
+    collapse_tool_chains,
+    compress_tool_results,
+    dedupe_tool_results,
+)
+from .estimator import CalibratedEstimator, estimate_request_tokens
+from .metrics import SUMMARIZATION_TAGS, MetricsTracker, create_metrics_tracker
+from .minhash import MinHasher
+from .output_limits import OutputLimiter
+from .preflight import run_preflight
 from .pruner import prune_messages
-from .types import BeskarConfig, BeskarMessage, MetricsSummary
+from .relevance import BM25Index
+from .router import Router, tool_chain_depth
+from .spill import with_recall_tool
+from .streaming import (
+    AsyncMeteredStream,
+    AsyncMeteredStreamManager,
+    MeteredStream,
+    MeteredStreamManager,
+    StreamUsage,
+)
+from .summarizer import (
+    MERGE_SYSTEM_PROMPT,
+    SUMMARY_SYSTEM_PROMPT,
+    BackgroundSummarizer,
+    render_transcript,
+)
+from .thinking import ThinkingController, thinking_tokens, turn_type
+from .tracing import resolve_tracer
+from .types import (
+    BeskarConfig,
+    BeskarMessage,
+    LatencySummary,
+    MetricsSummary,
+    PreflightError,
+    RoutingSummary,
+    ThinkingSummary,
+    TurnType,
+)
 
 
-class BeskarClient:
-    """Drop-in replacement for anthropic.messages.create() with optimization pipeline."""
+def _set_stage_attributes(
+    span: Any, before: List[BeskarMessage], after: List[BeskarMessage]
+) -> None:
+    span.set_attribute("beskar.messages.in", len(before))
+    span.set_attribute("beskar.messages.out", len(after))
+    span.set_attribute("beskar.tokens.estimated_before", estimate_request_tokens(before))
+    span.set_attribute("beskar.tokens.estimated_after", estimate_request_tokens(after))
+
+
+def _set_usage_attributes(span: Any, usage: anthropic.types.Usage) -> None:
+    span.set_attribute("beskar.usage.input_tokens", usage.input_tokens)
+    span.set_attribute("beskar.usage.output_tokens", usage.output_tokens)
+    span.set_attribute(
+        "beskar.usage.cache_creation_input_tokens", usage.cache_creation_input_tokens or 0
+    )
+    span.set_attribute("beskar.usage.cache_read_input_tokens", usage.cache_read_input_tokens or 0)
+
+
+@dataclass
+class _Call:
+    """A request after the pre-call pipeline, with what is recorded once it returns."""
+
+    params: Dict[str, Any]
+    messages: List[BeskarMessage]
+    system: Optional[Union[str, List[Any]]]
+    tools: Optional[List[Any]]
+    requested_model: Optional[str]
+    model: Optional[str]
+    turn: TurnType
+    thinking_budget: int
+    route: Tuple[Any, ...]
+    requested_max_tokens: int
+    max_tokens: int
+    tags: Optional[Dict[str, str]]
+    started: float
+    prepared: float
+
+
+class _BaseClient:
+    """Configuration, pipeline state and metrics shared by the sync and async clients."""
 
     def __init__(self, config: Optional[BeskarConfig] = None) -> None:
         self._config = config or BeskarConfig()
         self._anthropic = anthropic.Anthropic(api_key=self._config.api_key)
         self._tracker = create_metrics_tracker(self._config.metrics)
-        self.messages = self._MessagesNamespace(self)
+        self._tracer = resolve_tracer(self._config.tracing)
+        self._tool_tokens = ToolTokenCache(self._config.token_estimator)
+        self._relevance_index = BM25Index()
+        self._minhasher = MinHasher()
+        self._router = Router(self._config.routing) if self._config.routing else None
+        self._output_limiter = (
+            OutputLimiter(self._config.output_limits) if self._config.output_limits else None
+        )
+        self._thinking = (
+            ThinkingController(self._config.thinking, self._config.token_estimator)
+            if self._config.thinking
+            else None
+        )
+        self._summarizer: Optional[BackgroundSummarizer] = None
+        pruner = self._config.pruner
+        if pruner and pruner.strategy == "summarize" and pruner.summary_model:
+            self._summarizer = BackgroundSummarizer(
+                self._summarize,
+                pruner.summary_step,
+                cache=pruner.summary_cache,
+                merge=self._merge_summaries,
+            )
         self.metrics = self._MetricsNamespace(self)
 
-    class _MessagesNamespace:
-        def __init__(self, client: "BeskarClient") -> None:
-            self._client = client
+    def _summarize(self, messages: List[BeskarMessage]) -> str:
+        """Summarize *messages* with ``PrunerConfig.summary_model`` (runs in the background)."""
+        return self._call_summary_model(SUMMARY_SYSTEM_PROMPT, render_transcript(messages))
 
-        def create(self, **params: Any) -> anthropic.types.Message:
-            """Create a message with the Beskar optimization pipeline.
+    def _merge_summaries(self, summaries: List[str]) -> str:
+        return self._call_summary_model(MERGE_SYSTEM_PROMPT, "\n\n---\n\n".join(summaries))
 
-            Accepts the same keyword arguments as
-            ``anthropic.messages.create()`` (model, max_tokens, messages,
-            system, tools, etc.).
-            """
-            client = self._client
-            config = client._config
+    def _call_summary_model(self, system: str, text: str) -> str:
+        pruner = self._config.pruner
+        assert pruner is not None and pruner.summary_model is not None
+        response = self._anthropic.messages.create(
+            model=pruner.summary_model,
+            max_tokens=pruner.summary_max_tokens,
+            system=system,
+            messages=[{"role": "user", "content": text}],
+        )
+        if self._config.metrics:
+            tags = {**self._config.metrics.tags, **SUMMARIZATION_TAGS}
+            self._tracker.track(response.usage, model=pruner.summary_model, tags=tags)
+        return "".join(
+            block.text for block in response.content if isinstance(block, anthropic.types.TextBlock)
+        )
 
-            messages: List[BeskarMessage] = list(params.get("messages", []))
-            system: Optional[Union[str, List[Any]]] = params.get("system")
-            tools: Optional[List[Any]] = params.get("tools")
+    def close(self) -> None:
+        """Stop the background summarizer, if any."""
+        if self._summarizer is not None:
+            self._summarizer.close()
 
-            # Step 1 — Pruner
-            if config.pruner:
-                messages = prune_messages(messages, config.pruner)
+    def _prepare(
+        self, params: Dict[str, Any], root: Any, started: float, streaming: bool = False
+    ) -> _Call:
+        """Run pipeline steps 1–7 on *params* and build the request to send.
 
-            # Step 2 — Cache
-            if config.cache:
+        Streamed calls keep the caller's ``max_tokens``: a stream already
+        passed through cannot be retried if the adapted limit cuts it short.
+        """
+        config = self._config
+        tracer = self._tracer
+        call_tags: Optional[Dict[str, str]] = params.pop("beskar_tags", None)
+        messages: List[BeskarMessage] = list(params.get("messages", []))
+        system: Optional[Union[str, List[Any]]] = params.get("system")
+        tools: Optional[List[Any]] = params.get("tools")
+        if config.compressor and config.compressor.spill is not None:
+            tools = with_recall_tool(tools)
+        if root.is_recording():
+            root.set_attribute("beskar.model", str(params.get("model")))
+            root.set_attribute("beskar.messages.in", len(messages))
+            root.set_attribute(
+                "beskar.tokens.estimated_before",
+                estimate_request_tokens(messages, system, tools),
+            )
+
+        # Step 1 — Pruner
+        if config.pruner:
+            with tracer.start_as_current_span("beskar.pruner") as span:
+                before = messages
+                messages = prune_messages(
+                    messages,
+                    config.pruner,
+                    config.token_estimator,
+                    self._summarizer,
+                    self._relevance_index,
+                    self._minhasher,
+                )
+                if span.is_recording():
+                    _set_stage_attributes(span, before, messages)
+                    span.set_attribute("beskar.pruner.strategy", config.pruner.strategy)
+
+        # Step 2 — Cache
+        if config.cache:
+            with tracer.start_as_current_span("beskar.cache") as span:
                 request: Dict[str, Any] = {"messages": messages}
                 if system is not None:
                     request["system"] = system
                 if tools is not None:
                     request["tools"] = tools
-                cache_result = structure_cache(request, config.cache)  # type: ignore[arg-type]
+                cache_result = structure_cache(
+                    request, config.cache, config.token_estimator  # type: ignore[arg-type]
+                )
+                before = messages
                 messages = cache_result.request["messages"]
                 system = cache_result.request.get("system", system)
                 tools = cache_result.request.get("tools", tools)
+                if span.is_recording():
+                    _set_stage_attributes(span, before, messages)
+                    span.set_attribute(
+                        "beskar.cache.breakpoints", len(cache_result.breakpoints)
+                    )
+
+        # Step 3 — Compressor (truncate + chain collapse + dedupe)
+        if config.compressor:
+            with tracer.start_as_current_span("beskar.compressor") as span:
+                before = messages
+                compressed = compress_tool_results(
+                    messages, config.compressor, config.token_estimator
+                )
+                messages = collapse_tool_chains(
+                    compressed, config.compressor, self._tool_tokens
+                )
+                # After collapsing, so every reference points at a result still sent
+                messages = dedupe_tool_results(messages, config.compressor)
+                if span.is_recording():
+                    _set_stage_attributes(span, before, messages)
+
+        # Step 4 — Router: send the request to the cheapest adequate model
+        requested_model: Optional[str] = params.get("model")
+        model = requested_model
+        if self._router is not None:
+            with tracer.start_as_current_span("beskar.router") as span:
+                input_tokens = self._tool_tokens.history_tokens(
+                    messages
+                ) + estimate_request_tokens([], system, tools, config.token_estimator)
+                model = self._router.route(
+                    requested_model,
+                    input_tokens,
+                    tool_chain_depth(messages),
+                    int(params.get("max_tokens", 0)),
+                    system,
+                )
+                if span.is_recording():
+                    span.set_attribute("beskar.router.requested", str(requested_model))
+                    span.set_attribute("beskar.router.routed", str(model))
 
-            # Step 3 — Compressor (truncate + chain collapse)
-            if config.compressor:
-                compressed: List[BeskarMessage] = []
-                for msg in messages:
-                    if msg.get("role") == "user" and isinstance(msg.get("content"), list):
-                        new_content = [
-                            compress_tool_result(block, config.compressor)
-                            if isinstance(block, dict) and block.get("type") == "tool_result"
-                            else block
-                            for block in msg["content"]
-                        ]
-                        compressed.append({**msg, "content": new_content})
-                    else:
-                        compressed.append(msg)
-                messages = collapse_tool_chains(compressed, config.compressor)
-
-            # Step 4 — API call
-            modified_params = dict(params)
-            modified_params["messages"] = messages
-            if system is not None:
-                modified_params["system"] = system
-            if tools is not None:
-                modified_params["tools"] = tools
-
-            response: anthropic.types.Message = client._anthropic.messages.create(
-                **modified_params
+        # Step 5 — Thinking: set or remove the thinking budget for this call
+        thinking: Optional[Dict[str, Any]] = params.get("thinking")
+        turn: TurnType = turn_type(messages)
+        thinking_budget = 0
+        if self._thinking is not None:
+            with tracer.start_as_current_span("beskar.thinking") as span:
+                thinking, turn, thinking_budget = self._thinking.apply(
+                    params, messages, model
+                )
+                if span.is_recording():
+                    span.set_attribute("beskar.thinking.turn", turn)
+                    span.set_attribute("beskar.thinking.budget_tokens", thinking_budget)
+
+        # Step 6 — Output limit: size max_tokens to what this route produces
+        requested_max_tokens = int(params.get("max_tokens", 0))
+        max_tokens = requested_max_tokens
+        route = (model, tuple(sorted((call_tags or {}).items())), turn)
+        if self._output_limiter is not None and not streaming:
+            with tracer.start_as_current_span("beskar.output_limit") as span:
+                max_tokens = self._output_limiter.limit(
+                    route, requested_max_tokens, thinking_budget
+                )
+                if config.metrics:
+                    self._tracker.record_event(
+                        "output_limit",
+                        "adapted" if max_tokens < requested_max_tokens else "default",
+                    )
+                if span.is_recording():
+                    span.set_attribute("beskar.output_limit.max_tokens", max_tokens)
+
+        # Step 7 — Preflight: make sure the request fits the context window
+        if config.preflight:
+            with tracer.start_as_current_span("beskar.preflight") as span:
+                before = messages
+                try:
+                    checked = run_preflight(
+                        messages,
+                        system,
+                        tools,
+                        model,
+                        max_tokens,
+                        config.preflight,
+                        config.compressor,
+                        config.token_estimator,
+                        self._tool_tokens,
+                    )
+                except PreflightError:
+                    if config.metrics:
+                        self._tracker.record_event("preflight", "rejected")
+                    raise
+                messages = checked.messages
+                outcome = checked.actions[-1] if checked.actions else "fits"
+                if config.metrics:
+                    self._tracker.record_event("preflight", outcome)
+                if span.is_recording():
+                    _set_stage_attributes(span, before, messages)
+                    span.set_attribute("beskar.preflight.action", outcome)
+                    span.set_attribute("beskar.preflight.budget", checked.budget)
+
+        modified_params = dict(params)
+        modified_params["messages"] = messages
+        if model is not None:
+            modified_params["model"] = model
+        if thinking is not None:
+            modified_params["thinking"] = thinking
+        else:
+            modified_params.pop("thinking", None)
+        if system is not None:
+            modified_params["system"] = system
+        if tools is not None:
+            modified_params["tools"] = tools
+        if max_tokens != requested_max_tokens:
+            modified_params["max_tokens"] = max_tokens
+
+        if root.is_recording():
+            root.set_attribute("beskar.messages.out", len(messages))
+            root.set_attribute(
+                "beskar.tokens.estimated_after",
+                estimate_request_tokens(messages, system, tools),
             )
+        return _Call(
+            modified_params,
+            messages,
+            system,
+            tools,
+            requested_model,
+            model,
+            turn,
+            thinking_budget,
+            route,
+            requested_max_tokens,
+            max_tokens,
+            call_tags,
+            started,
+            time.perf_counter(),
+        )
 
-            # Step 5 — Metrics
-            if config.metrics:
-                client._tracker.track(response.usage, model=params.get("model"))
+    def _retry_limit(
+        self, call: _Call, response: anthropic.types.Message, retries: int
+    ) -> Optional[int]:
+        """Larger ``max_tokens`` to retry *response* with, if it was cut short and may be."""
+        limiter = self._output_limiter
+        if (
+            limiter is None
+            or response.stop_reason != "max_tokens"
+            or retries >= limiter.config.max_retries
+        ):
+            return None
+        return limiter.retry_limit(call.max_tokens, call.requested_max_tokens)
 
-            return response
+    def _thinking_used(self, call: _Call, response: anthropic.types.Message) -> int:
+        if call.thinking_budget <= 0:
+            return 0
+        return thinking_tokens(response, self._config.token_estimator)
+
+    def _finish(
+        self,
+        call: _Call,
+        usage: anthropic.types.Usage,
+        thinking_used: int,
+        sent: float,
+        received: float,
+        truncated: Sequence[anthropic.types.Usage] = (),
+        first_token: Optional[float] = None,
+        complete: bool = True,
+    ) -> None:
+        """Run pipeline steps 9–10 for a call that returned *usage*.
+
+        An incomplete (closed early) stream is tracked for its usage but not
+        fed to the output limiter or thinking controller.
+        """
+        config = self._config
+        model = call.model
+        if complete and self._output_limiter is not None:
+            self._output_limiter.observe(call.route, usage.output_tokens)
+        if complete and self._thinking is not None and call.thinking_budget > 0:
+            self._thinking.record(model, call.turn, thinking_used)
+        else:
+            thinking_used = 0
+
+        # Step 9 — Metrics
+        if config.metrics:
+            with self._tracer.start_as_current_span("beskar.metrics"):
+                tags = {**config.metrics.tags, **(call.tags or {})}
+                for cut_short in truncated:
+                    self._tracker.track(cut_short, model=model, tags=tags)
+                    self._tracker.record_event("output_limit", "retried")
+                usage_record = self._tracker.track(usage, model=model, tags=tags)
+                if self._router is not None:
+                    self._tracker.record_routing(call.requested_model, model, usage_record)
+                if self._thinking is not None:
+                    self._tracker.record_thinking(
+                        call.turn,
+                        call.thinking_budget,
+                        self._thinking.config.fixed_budget,
+                        thinking_used,
+                        model,
+                    )
+                self._tracker.record_latency("overhead", call.prepared - call.started, model)
+                if first_token is not None:
+                    self._tracker.record_latency("ttft", first_token - sent, model)
+                self._tracker.record_latency("api", received - sent, model)
+
+        # Step 10 — Calibrate the token estimator against billed input tokens
+        if isinstance(config.token_estimator, CalibratedEstimator):
+            config.token_estimator.observe_request(
+                call.messages,
+                call.system,
+                call.tools,
+                usage.input_tokens
+                + (usage.cache_creation_input_tokens or 0)
+                + (usage.cache_read_input_tokens or 0),
+            )
+
+    def _finish_stream(self, call: _Call, sent: float, stream: StreamUsage) -> None:
+        usage = stream.usage
+        if usage is None:
+            return  # closed before the response started
+        thinking_used = (
+            stream.thinking_tokens(self._config.token_estimator)
+            if call.thinking_budget > 0
+            else 0
+        )
+        self._finish(
+            call,
+            usage,
+            thinking_used,
+            sent,
+            time.perf_counter(),
+            first_token=stream.first_token_at,
+            complete=stream.complete,
+        )
 
     class _MetricsNamespace:
-        def __init__(self, client: "BeskarClient") -> None:
+        def __init__(self, client: "_BaseClient") -> None:
             self._client = client
 
         def summary(self) -> MetricsSummary:
             return self._client._tracker.summary()
+
+        def summarization(self) -> MetricsSummary:
+            """Usage of Beskar's own background summarization calls."""
+            return self._client._tracker.summary_for_tags(SUMMARIZATION_TAGS)
+
+        def preflight(self) -> Dict[str, int]:
+            """Requests per preflight outcome.
+
+            Outcomes are ``"fits"``, the last escalation step a request needed
+            (``"compress"``, ``"collapse"`` or ``"prune"``), and ``"rejected"``.
+            """
+            return self._client._tracker.event_counts("preflight")
+
+        def routing(self) -> Dict[Tuple[Optional[str], Optional[str]], RoutingSummary]:
+            """Routed calls as ``{(requested, routed): RoutingSummary}``."""
+            return self._client._tracker.routing_summary()
+
+        def thinking(self) -> Dict[str, ThinkingSummary]:
+            """Thinking budgets per turn type, against ``ThinkingConfig.fixed_budget``."""
+            return self._client._tracker.thinking_summary()
+
+        def output_limits(self) -> Dict[str, int]:
+            """Calls per output-limit outcome.
+
+            Outcomes are ``"adapted"`` (``max_tokens`` lowered), ``"default"``
+            (the caller's limit kept) and ``"retried"`` (one per retry after a
+            response stopped on ``max_tokens``).
+            """
+            return self._client._tracker.event_counts("output_limit")
+
+        def latency(self) -> Dict[str, Dict[Optional[str], LatencySummary]]:
+            """Latency percentiles as ``{kind: {model: LatencySummary}}``."""
+            return self._client._tracker.latency_summary()
+
+
+class BeskarClient(_BaseClient):
+    """Drop-in replacement for anthropic.messages.create() with optimization pipeline."""
+
+    def __init__(self, config: Optional[BeskarConfig] = None) -> None:
+        super().__init__(config)
+        self.messages = self._MessagesNamespace(self)
+
+    class _MessagesNamespace:
+        def __init__(self, client: "BeskarClient") -> None:
+            self._client = client
+
+        @overload
+        def create(self, *, stream: Literal[True], **params: Any) -> MeteredStream: ...
+
+        @overload
+        def create(
+            self, *, stream: Literal[False] = ..., **params: Any
+        ) -> anthropic.types.Message: ...
+
+        def create(
+            self, *, stream: bool = False, **params: Any
+        ) -> Union[anthropic.types.Message, MeteredStream]:
+            """Create a message with the Beskar optimization pipeline.
+
+            Accepts the same keyword arguments as
+            ``anthropic.messages.create()`` (model, max_tokens, messages,
+            system, tools, etc.), plus ``beskar_tags`` — a dict of metrics
+            tags for this call, which is not forwarded to the API.
+
+            With ``stream=True`` the SDK's event stream is returned wrapped in
+            a ``MeteredStream``: events pass through as they arrive, and usage
+            from ``message_start``/``message_delta`` and time to first token
+            are recorded when the stream ends or is closed.
+            """
+            started = time.perf_counter()
+            client = self._client
+            tracer = client._tracer
+            with tracer.start_as_current_span("beskar.messages.create") as root:
+                call = client._prepare(params, root, started, streaming=stream)
+
+                # Step 8 — API call, retried with a larger limit if cut short
+                with tracer.start_as_current_span("beskar.api_call") as span:
+                    sent = time.perf_counter()
+                    if stream:
+                        events = client._anthropic.messages.create(**call.params, stream=True)
+                        return MeteredStream(
+                            events, lambda usage: client._finish_stream(call, sent, usage)
+                        )
+                    response: anthropic.types.Message = client._anthropic.messages.create(
+                        **call.params
+                    )
+                    truncated: List[anthropic.types.Usage] = []
+                    larger = client._retry_limit(call, response, 0)
+                    while larger is not None:
+                        truncated.append(response.usage)
+                        call.max_tokens = call.params["max_tokens"] = larger
+                        response = client._anthropic.messages.create(**call.params)
+                        larger = client._retry_limit(call, response, len(truncated))
+                    received = time.perf_counter()
+                    if span.is_recording():
+                        _set_usage_attributes(span, response.usage)
+
+                client._finish(
+                    call,
+                    response.usage,
+                    client._thinking_used(call, response),
+                    sent,
+                    received,
+                    truncated,
+                )
+            return response
+
+        def stream(self, **params: Any) -> MeteredStreamManager:
+            """Stream a message with the Beskar pipeline, like ``anthropic.messages.stream()``.
+
+            The pipeline runs now and the request is sent when the returned
+            context manager is entered. The ``MeteredMessageStream`` it yields
+            supports the SDK helpers (``text_stream``, ``get_final_message()``
+            …) and records usage and time to first token on exit.
+            """
+            started = time.perf_counter()
+            client = self._client
+            with client._tracer.start_as_current_span("beskar.messages.stream") as root:
+                call = client._prepare(params, root, started, streaming=True)
+            return MeteredStreamManager(
+                client._anthropic.messages.stream(**call.params),
+                lambda sent, usage: client._finish_stream(call, sent, usage),
+            )
+
+
+class AsyncBeskarClient(_BaseClient):
+    """Async counterpart of ``BeskarClient``, wrapping ``anthropic.AsyncAnthropic``.
+
+    The pipeline itself runs synchronously before each request; background
+    summaries keep using a sync client on the summarizer's thread.
+    """
+
+    def __init__(self, config: Optional[BeskarConfig] = None) -> None:
+        super().__init__(config)
+        self._async_anthropic = anthropic.AsyncAnthropic(api_key=self._config.api_key)
+        self.messages = self._MessagesNamespace(self)
+
+    class _MessagesNamespace:
+        def __init__(self, client: "AsyncBeskarClient") -> None:
+            self._client = client
+
+        @overload
+        async def create(self, *, stream: Literal[True], **params: Any) -> AsyncMeteredStream: ...
+
+        @overload
+        async def create(
+            self, *, stream: Literal[False] = ..., **params: Any
+        ) -> anthropic.types.Message: ...
+
+        async def create(
+            self, *, stream: bool = False, **params: Any
+        ) -> Union[anthropic.types.Message, AsyncMeteredStream]:
+            """Async ``BeskarClient.messages.create()``."""
+            started = time.perf_counter()
+            client = self._client
+            tracer = client._tracer
+            with tracer.start_as_current_span("beskar.messages.create") as root:
+                call = client._prepare(params, root, started, streaming=stream)
+
+                # Step 8 — API call, retried with a larger limit if cut short
+                with tracer.start_as_current_span("beskar.api_call") as span:
+                    sent = time.perf_counter()
+                    if stream:
+                        events = await client._async_anthropic.messages.create(
+                            **call.params, stream=True
+                        )
+                        return AsyncMeteredStream(
+                            events, lambda usage: client._finish_stream(call, sent, usage)
+                        )
+                    response: anthropic.types.Message = (
+                        await client._async_anthropic.messages.create(**call.params)
+                    )
+                    truncated: List[anthropic.types.Usage] = []
+                    larger = client._retry_limit(call, response, 0)
+                    while larger is not None:
+                        truncated.append(response.usage)
+                        call.max_tokens = call.params["max_tokens"] = larger
+                        response = await client._async_anthropic.messages.create(**call.params)
+                        larger = client._retry_limit(call, response, len(truncated))
+                    received = time.perf_counter()
+                    if span.is_recording():
+                        _set_usage_attributes(span, response.usage)
+
+                client._finish(
+                    call,
+                    response.usage,
+                    client._thinking_used(call, response),
+                    sent,
+                    received,
+                    truncated,
+                )
+            return response
+
+        def stream(self, **params: Any) -> AsyncMeteredStreamManager:
+            """Async ``BeskarClient.messages.stream()``; use with ``async with``."""
+            started = time.perf_counter()
+            client = self._client
+            with client._tracer.start_as_current_span("beskar.messages.stream") as root:
+                call = client._prepare(params, root, started, streaming=True)
+            return AsyncMeteredStreamManager(
+                client._async_anthropic.messages.stream(**call.params),
+                lambda sent, usage: client._finish_stream(call, sent, usage),
+            )
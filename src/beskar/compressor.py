@@ -1,117 +1,746 @@
 """Compressor module — tool result and chain compression."""
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Set
+import hashlib
+import io
+import json
+import re
+from dataclasses import replace
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
 
-from .types import BeskarMessage, CompressorConfig, estimate_tokens
+from .spill import RECALL_TOOL_NAME, spill_marker
+from .types import BeskarMessage, CompressorConfig, estimate_many, estimate_tokens
 
 
-def compress_tool_result(block: Dict[str, Any], config: CompressorConfig) -> Dict[str, Any]:
+def _path_tree(paths: List[str]) -> Dict[str, Any]:
+    # Nested dict of path segments; a ``None`` leaf selects the whole subtree.
+    tree: Dict[str, Any] = {}
+    for path in paths:
+        parts = path.split(".")
+        node = tree
+        for part in parts[:-1]:
+            child = node.setdefault(part, {})
+            if child is None:
+                break  # a shorter path already selects this subtree
+            node = child
+        else:
+            node[parts[-1]] = None
+    return tree
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or (isinstance(value, (str, list, dict)) and not value)
+
+
+def _filter_json(
+    value: Any,
+    allow: Optional[Dict[str, Any]],
+    deny: Optional[Dict[str, Any]],
+    drop_empty: bool,
+) -> Any:
+    if isinstance(value, list):
+        return [_filter_json(item, allow, deny, drop_empty) for item in value]
+    if not isinstance(value, dict):
+        return value
+    out: Dict[str, Any] = {}
+    for key, item in value.items():
+        if allow is not None and key not in allow:
+            continue
+        child_deny = None
+        if deny is not None and key in deny:
+            child_deny = deny[key]
+            if child_deny is None:
+                continue
+        child_allow = allow[key] if allow is not None else None
+        item = _filter_json(item, child_allow, child_deny, drop_empty)
+        if drop_empty and _is_empty(item):
+            continue
+        out[key] = item
+    return out
+
+
+def _sample_json(value: Any, head: int, tail: int, max_chars: int) -> Any:
+    if isinstance(value, str):
+        if len(value) > max_chars:
+            return f"{value[:max_chars]}... [{len(value) - max_chars} more chars]"
+        return value
+    if isinstance(value, list):
+        if len(value) <= head + tail + 1:
+            return [_sample_json(item, head, tail, max_chars) for item in value]
+        # The marker is added after sampling so max_chars never cuts it.
+        omitted = len(value) - head - tail
+        return [
+            *(_sample_json(item, head, tail, max_chars) for item in value[:head]),
+            f"... {omitted} more items ...",
+            *(_sample_json(item, head, tail, max_chars) for item in value[len(value) - tail :]),
+        ]
+    if isinstance(value, dict):
+        return {k: _sample_json(v, head, tail, max_chars) for k, v in value.items()}
+    return value
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _compress_json(
+    text: str,
+    config: CompressorConfig,
+    estimate: Callable[[str], int],
+    tool_name: Optional[str],
+) -> Optional[str]:
+    """Compress *text* as JSON, or return ``None`` if it is not a JSON object or array.
+
+    Field filters, empty-value removal and minification always apply. Arrays
+    are then sampled and long strings shortened only as far as needed to fit
+    ``max_tool_result_tokens``, halving the limits until the result fits or
+    reaches its floor. The result is valid JSON even if still over budget.
+    """
+    json_config = config.json
+    assert json_config is not None
+    if text.lstrip()[:1] not in ("{", "["):
+        return None
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return None
+
+    allow = json_config.allow_fields.get(tool_name) if tool_name else None
+    deny = json_config.deny_fields.get(tool_name) if tool_name else None
+    value = _filter_json(
+        value,
+        _path_tree(allow) if allow is not None else None,
+        _path_tree(deny) if deny else None,
+        json_config.drop_empty,
+    )
+    compact = _dumps(value)
+    budget = config.max_tool_result_tokens
+    if budget is None or estimate(compact) <= budget:
+        return compact
+
+    head, tail = json_config.array_head, json_config.array_tail
+    max_chars = json_config.max_string_chars
+    while True:
+        sampled = _dumps(_sample_json(value, head, tail, max_chars))
+        if estimate(sampled) <= budget or (head <= 1 and tail == 0 and max_chars <= 16):
+            return sampled
+        head, tail, max_chars = max(head // 2, 1), tail // 2, max(max_chars // 2, 16)
+
+
+# Variable parts of a log line: any word that contains a digit, from its
+# leading hex letters on — numbers, hex ids and each field of a timestamp.
+# A single pattern keeps normalization linear on multi-megabyte logs.
+_LOG_VARIABLE = re.compile(r"\b[0-9a-fA-F]*\d\w*")
+_LOG_ERROR = re.compile(
+    r"\b(?:error|errors|fatal|exception|traceback|failed|failure|panic|critical)\b", re.I
+)
+
+
+def _iter_lines(texts: List[str]) -> Iterator[str]:
+    # Lines across all blocks, without the trailing newline; a line may span blocks.
+    partial = ""
+    for text in texts:
+        for line in io.StringIO(text):
+            if line.endswith("\n"):
+                yield partial + line[:-1]
+                partial = ""
+            else:
+                partial += line
+    if partial:
+        yield partial
+
+
+def compact_log(texts: List[str], fold_repeats: bool = True) -> str:
+    """Collapse repetitive log lines in one pass over *texts*.
+
+    Lines are compared after replacing numbers, hex ids and timestamps, and
+    only the last carriage-return segment of a line (the final state of a
+    progress bar) is kept. A run of such lines is rendered as ``line ×N``.
+    With *fold_repeats*, a line that repeats an earlier, non-adjacent one is
+    folded into its first occurrence too; error-like lines are only folded
+    into an immediately preceding duplicate, so each separate occurrence
+    stays in place.
+    """
+    entries: List[List[Any]] = []  # [line, count]
+    first_seen: Dict[str, int] = {}
+    prev_key: Optional[str] = None
+    prev_index = -1
+    for line in _iter_lines(texts):
+        if "\r" in line:
+            line = line.rstrip("\r").rsplit("\r", 1)[-1]
+        key = _LOG_VARIABLE.sub("#", line)
+        if key == prev_key:
+            entries[prev_index][1] += 1
+            continue
+        prev_key = key
+        index = first_seen.get(key) if fold_repeats and key.strip() else None
+        if index is not None and not _LOG_ERROR.search(line):
+            entries[index][1] += 1
+            prev_index = index
+            continue
+        prev_index = len(entries)
+        entries.append([line, 1])
+        first_seen.setdefault(key, prev_index)
+    return "\n".join(line if count == 1 else f"{line} ×{count}" for line, count in entries)
+
+
+def _take_head(texts: List[str], limit: int, at_lines: bool) -> str:
+    parts: List[str] = []
+    remaining = limit
+    for text in texts:
+        if remaining <= 0:
+            break
+        part = text[:remaining]
+        parts.append(part)
+        remaining -= len(part)
+    head = "".join(parts)
+    if at_lines:
+        cut = head.rfind("\n")
+        if cut > 0:
+            head = head[:cut]
+    return head
+
+
+def _take_tail(texts: List[str], limit: int, at_lines: bool) -> str:
+    parts: List[str] = []
+    remaining = limit
+    for text in reversed(texts):
+        if remaining <= 0:
+            break
+        part = text[-remaining:]
+        parts.append(part)
+        remaining -= len(part)
+    tail = "".join(reversed(parts))
+    if at_lines:
+        cut = tail.find("\n")
+        if 0 <= cut < len(tail) - 1:
+            tail = tail[cut + 1 :]
+    return tail
+
+
+def _truncate(texts: List[str], total: int, limit: int, config: CompressorConfig) -> str:
+    """Keep about *limit* characters of the concatenated *texts*.
+
+    Reads only the blocks at the kept ends, so a result made of many text
+    blocks is never joined in full.
+    """
+    at_lines = config.truncate_at_lines
+    if config.truncation == "tail":
+        return "[truncated]\n" + _take_tail(texts, limit, at_lines)
+    if config.truncation == "head-tail":
+        head = _take_head(texts, limit // 2, at_lines)
+        tail = _take_tail(texts, limit - limit // 2, at_lines)
+        omitted = total - len(head) - len(tail)
+        return f"{head}\n[... {omitted} characters truncated ...]\n{tail}"
+    return _take_head(texts, limit, at_lines) + "\n[truncated]"
+
+
+def _with_text(block: Dict[str, Any], content: Any, text: str) -> Dict[str, Any]:
+    if isinstance(content, str):
+        return {**block, "content": text}
+
+    # Array content: replace first text block with *text*, preserve non-text, drop extra text
+    new_content: List[Any] = []
+    text_replaced = False
+    for b in content:
+        if isinstance(b, dict) and b.get("type") == "text" and not text_replaced:
+            new_content.append({**b, "text": text})
+            text_replaced = True
+        elif not (isinstance(b, dict) and b.get("type") == "text"):
+            new_content.append(b)
+        # Subsequent text blocks are dropped (merged into the replaced one)
+
+    return {**block, "content": new_content}
+
+
+def tool_use_names(messages: List[BeskarMessage]) -> Dict[str, str]:
+    """Map each ``tool_use`` id in *messages* to its tool name."""
+    names: Dict[str, str] = {}
+    for msg in messages:
+        content = msg.get("content")
+        if msg.get("role") != "assistant" or not isinstance(content, list):
+            continue
+        for block in content:
+            if isinstance(block, dict) and block.get("type") == "tool_use":
+                names[str(block.get("id"))] = str(block.get("name", ""))
+    return names
+
+
+def compress_tool_result(
+    block: Dict[str, Any],
+    config: CompressorConfig,
+    estimator: Optional[Callable[[str], int]] = None,
+    tool_name: Optional[str] = None,
+) -> Dict[str, Any]:
     """Truncate oversized tool result content.
 
     Preserves `tool_use_id` and `type`. Never mutates the input block.
+    ``config.truncation`` selects which part of the content is kept.
+
+    With ``config.json`` set, content that parses as JSON is compressed
+    structurally instead and stays valid JSON; *tool_name* selects its
+    field filters (see ``tool_use_names()``). With ``config.compact_logs``,
+    other text over budget is run through ``compact_log()`` before it is
+    truncated; only results of ``config.log_tools`` fold non-adjacent repeats.
+    With ``config.spill``, the original content is stored and a recall
+    marker is appended as a separate text block.
+
+    The truncation length is scaled by the text's chars-per-token ratio
+    under *estimator*, so the result lands near the token budget.
     """
-    if config.max_tool_result_tokens is None:
+    result = _compress(block, config, estimator, tool_name)
+    if config.spill is None or result is block:
+        return result
+    tool_use_id = str(block.get("tool_use_id"))
+    config.spill.put(tool_use_id, block.get("content", ""))
+    content: Any = result["content"]
+    marker = {"type": "text", "text": spill_marker(tool_use_id)}
+    if isinstance(content, str):
+        return {**result, "content": [{"type": "text", "text": content}, marker]}
+    return {**result, "content": [*content, marker]}
+
+
+def compress_tool_results(
+    messages: List[BeskarMessage],
+    config: CompressorConfig,
+    estimator: Optional[Callable[[str], int]] = None,
+) -> List[BeskarMessage]:
+    """Apply ``compress_tool_result()`` to every tool result in *messages*.
+
+    Returns a new list; messages without tool results are passed through.
+    Results of ``beskar_recall`` calls are the payload the model asked for
+    and are left whole — truncating them again would only ask for a recall.
+    """
+    names = tool_use_names(messages)
+    compressed: List[BeskarMessage] = []
+    for msg in messages:
+        content: Any = msg.get("content")
+        if msg.get("role") == "user" and isinstance(content, list):
+            new_content: List[Any] = []
+            for block in content:
+                if isinstance(block, dict) and block.get("type") == "tool_result":
+                    name = names.get(str(block.get("tool_use_id")))
+                    if name != RECALL_TOOL_NAME:
+                        block = compress_tool_result(block, config, estimator, name)
+                new_content.append(block)
+            compressed.append({**msg, "content": new_content})
+        else:
+            compressed.append(msg)
+    return compressed
+
+
+def _compress(
+    block: Dict[str, Any],
+    config: CompressorConfig,
+    estimator: Optional[Callable[[str], int]],
+    tool_name: Optional[str],
+) -> Dict[str, Any]:
+    if config.max_tool_result_tokens is None and config.json is None:
         return block
 
     content: Any = block.get("content", "")
 
     if isinstance(content, str):
-        text = content
+        texts = [content]
     elif isinstance(content, list):
-        text = "".join(
+        texts = [
             b.get("text", "")
             for b in content
             if isinstance(b, dict) and b.get("type") == "text"
-        )
+        ]
     else:
         return block
 
-    if estimate_tokens(text) <= config.max_tool_result_tokens:
+    if config.json is not None and texts:
+        text = texts[0] if len(texts) == 1 else "".join(texts)
+        compacted = _compress_json(text, config, estimator or estimate_tokens, tool_name)
+        if compacted is not None:
+            return block if compacted == text else _with_text(block, content, compacted)
+
+    if config.max_tool_result_tokens is None:
         return block
 
-    truncated = text[: config.max_tool_result_tokens * 4] + "\n[truncated]"
+    total = sum(map(len, texts))
+    tokens = _text_tokens(texts, total, estimator)
+    if tokens <= config.max_tool_result_tokens:
+        return block
 
-    if isinstance(content, str):
-        return {**block, "content": truncated}
+    if config.compact_logs and texts:
+        named = config.log_tools is not None
+        if not named or tool_name in (config.log_tools or ()):
+            compacted_log = compact_log(texts, fold_repeats=named)
+            if len(compacted_log) < total:
+                texts = [compacted_log]
+                total = len(compacted_log)
+                tokens = _text_tokens(texts, total, estimator)
+                if tokens <= config.max_tool_result_tokens:
+                    return _with_text(block, content, compacted_log)
 
-    # Array content: replace first text block with truncated, preserve non-text, drop extra text
-    new_content: List[Any] = []
-    text_replaced = False
-    for b in content:
-        if isinstance(b, dict) and b.get("type") == "text" and not text_replaced:
-            new_content.append({**b, "text": truncated})
-            text_replaced = True
-        elif not (isinstance(b, dict) and b.get("type") == "text"):
-            new_content.append(b)
-        # Subsequent text blocks are dropped (merged into the truncated one)
+    if estimator is None:
+        limit = config.max_tool_result_tokens * 4
+    else:
+        limit = config.max_tool_result_tokens * total // max(tokens, 1)
+    return _with_text(block, content, _truncate(texts, total, limit, config))
 
-    return {**block, "content": new_content}
+
+def _text_tokens(
+    texts: List[str], total: int, estimator: Optional[Callable[[str], int]]
+) -> int:
+    if estimator is None:
+        return total // 4
+    return sum(estimate_many(texts, estimator))
+
+
+class ToolTokenCache:
+    """Token estimates for ``tool_use`` and ``tool_result`` blocks, keyed by id.
+
+    A tool call's input does not change once made, so each ``tool_use`` is
+    estimated once and then reused on every later request of the
+    conversation. Results are keyed by id and a digest of their content, as
+    truncation, dedupe and preflight rewrite them; hashing is far cheaper
+    than estimating. Used by the size-based collapse policy; the cache is
+    cleared when it reaches ``max_entries``.
+    """
+
+    def __init__(
+        self, estimator: Optional[Callable[[str], int]] = None, max_entries: int = 50_000
+    ) -> None:
+        self.estimate: Callable[[str], int] = estimator or estimate_tokens
+        self._estimator = estimator
+        self._max_entries = max_entries
+        self._tokens: Dict[Tuple[str, str, bytes], int] = {}
+
+    def block_tokens(self, block: Dict[str, Any]) -> int:
+        block_type = block.get("type")
+        if block_type == "tool_use":
+            key = (str(block_type), str(block.get("id")), b"")
+        else:
+            digest = _content_digest(block.get("content", ""))
+            key = (str(block_type), str(block.get("tool_use_id")), digest)
+        tokens = self._tokens.get(key)
+        if tokens is not None:
+            return tokens
+        if block_type == "tool_use":
+            tokens = self.estimate(json.dumps(block.get("input", {}), default=str))
+        else:
+            content = block.get("content", "")
+            if isinstance(content, str):
+                tokens = self.estimate(content)
+            else:
+                texts = [
+                    b.get("text", "")
+                    for b in content
+                    if isinstance(b, dict) and b.get("type") == "text"
+                ]
+                tokens = sum(estimate_many(texts, self._estimator))
+        if len(self._tokens) >= self._max_entries:
+            self._tokens.clear()
+        self._tokens[key] = tokens
+        return tokens
+
+    def history_tokens(self, messages: List[BeskarMessage]) -> int:
+        """Estimated tokens of *messages*; other text is counted in one batch."""
+        total = 0
+        texts: List[str] = []
+        for msg in messages:
+            content: Any = msg.get("content", "")
+            if isinstance(content, str):
+                texts.append(content)
+                continue
+            for b in content:
+                if not isinstance(b, dict):
+                    continue
+                if b.get("type") in ("tool_use", "tool_result"):
+                    total += self.block_tokens(b)
+                elif b.get("type") == "text":
+                    texts.append(str(b.get("text", "")))
+        return total + sum(estimate_many(texts, self._estimator))
+
+
+def _collapse_by_size(
+    messages: List[BeskarMessage],
+    calls: List[Tuple[int, Dict[str, Any], int]],
+    results: Dict[str, Tuple[int, Dict[str, Any]]],
+    config: CompressorConfig,
+    cache: ToolTokenCache,
+) -> Set[str]:
+    # Collapse the chains with the highest tokens × age until the history fits.
+    target = config.collapse_target_tokens
+    assert target is not None
+    total = cache.history_tokens(messages)
+    if total <= target:
+        return set()
+    n = len(messages)
+    min_age = config.collapse_after_turns or 0
+    ranked: List[Tuple[int, int, int, str, int]] = []
+    for i, use, result_idx in calls:
+        age = n - 1 - result_idx
+        if age <= min_age:
+            continue
+        tool_id = str(use.get("id"))
+        tokens = cache.block_tokens(use) + cache.block_tokens(results[tool_id][1])
+        summary = f"[Tool: {use.get('name', 'unknown')} \u2014 result collapsed after {n - i} turns]"
+        ranked.append((-tokens * age, result_idx, i, tool_id, tokens - cache.estimate(summary)))
+    ranked.sort()
+
+    stale: Set[str] = set()
+    for _, _, _, tool_id, saved in ranked:
+        if total <= target:
+            break
+        stale.add(tool_id)
+        total -= saved
+    return stale
 
 
 def collapse_tool_chains(
-    messages: List[BeskarMessage], config: CompressorConfig
+    messages: List[BeskarMessage],
+    config: CompressorConfig,
+    token_cache: Optional[ToolTokenCache] = None,
 ) -> List[BeskarMessage]:
-    """Replace old single-tool pairs with a synthetic summary assistant message.
+    """Collapse stale tool calls into a synthetic summary.
+
+    A ``tool_result`` is stale once more than ``collapse_after_turns``
+    messages follow the message holding it. With ``collapse_target_tokens``
+    set, staleness is decided by size instead: old chains are ranked by
+    estimated ``tokens × age`` and collapsed in that order until the history
+    fits the target. *token_cache* keeps those estimates across calls.
+    Results are located through one ``tool_use_id`` → message index map, so
+    the whole pass is linear in the history length (plus the ranking sort).
 
-    Only collapses turns that contain exactly one ``tool_use`` block.
-    Multi-tool turns (parallel tool calls) are left unchanged — this is a V1
-    simplification, not a bug.
+    When every call of an assistant turn is stale — including parallel
+    (multi-tool) turns — the turn becomes a summary assistant message. When
+    only some are, the stale ``tool_use`` blocks are swapped for a summary
+    text block and the rest of the turn is kept. Stale ``tool_result``
+    blocks are removed, along with any user message they leave empty.
+
+    With ``config.spill`` set, each collapsed result is stored there and the
+    summary names its ``tool_use_id`` for recall.
 
     Never mutates the input list or message objects.
     """
-    if config.collapse_after_turns is None:
+    if config.collapse_after_turns is None and config.collapse_target_tokens is None:
         return messages
 
-    threshold = config.collapse_after_turns
     n = len(messages)
+
+    results: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+    for idx, msg in enumerate(messages):
+        content: Any = msg.get("content")
+        if msg.get("role") == "user" and isinstance(content, list):
+            for b in content:
+                if isinstance(b, dict) and b.get("type") == "tool_result":
+                    results.setdefault(str(b.get("tool_use_id")), (idx, b))
+
+    # Every answered tool call: (assistant message index, tool_use block, result index)
+    calls: List[Tuple[int, Dict[str, Any], int]] = []
+    for i, msg in enumerate(messages):
+        content = msg.get("content")
+        if msg.get("role") == "assistant" and isinstance(content, list):
+            for b in content:
+                if isinstance(b, dict) and b.get("type") == "tool_use":
+                    found = results.get(str(b.get("id")))
+                    if found is not None:
+                        calls.append((i, b, found[0]))
+
+    if config.collapse_target_tokens is not None:
+        stale_ids = _collapse_by_size(
+            messages, calls, results, config, token_cache or ToolTokenCache()
+        )
+    else:
+        threshold = config.collapse_after_turns
+        assert threshold is not None
+        stale_ids = {str(b.get("id")) for _, b, r in calls if n - 1 - r > threshold}
+    if not stale_ids:
+        return list(messages)
+
+    replacements: Dict[int, Any] = {}
+    touched: Set[int] = set()
+    for i in sorted({i for i, b, _ in calls if str(b.get("id")) in stale_ids}):
+        msg = messages[i]
+        content = msg["content"]
+        uses = [b for b in content if isinstance(b, dict) and b.get("type") == "tool_use"]
+        stale = [b for b in uses if str(b.get("id")) in stale_ids]
+
+        turns_ago = n - i
+        names = [str(b.get("name", "unknown")) for b in stale]
+        if len(stale) == 1:
+            summary = f"[Tool: {names[0]} \u2014 result collapsed after {turns_ago} turns]"
+        else:
+            summary = f"[Tools: {', '.join(names)} \u2014 results collapsed after {turns_ago} turns]"
+        turn_ids = {str(b.get("id")) for b in stale}
+        for b in stale:
+            tool_id = str(b.get("id"))
+            result_idx, result_block = results[tool_id]
+            touched.add(result_idx)
+            if config.spill is not None:
+                config.spill.put(tool_id, result_block.get("content", ""))
+                summary += " " + spill_marker(tool_id)
+
+        if len(stale) == len(uses):
+            replacements[i] = {"role": "assistant", "content": summary}
+        else:
+            kept = [
+                b
+                for b in content
+                if not (
+                    isinstance(b, dict)
+                    and b.get("type") == "tool_use"
+                    and str(b.get("id")) in turn_ids
+                )
+            ]
+            replacements[i] = {**msg, "content": [{"type": "text", "text": summary}, *kept]}
+
     result: List[Any] = []
-    skip: Set[int] = set()
+    for idx, msg in enumerate(messages):
+        if idx in replacements:
+            result.append(replacements[idx])
+        elif idx in touched:
+            remaining = [
+                b
+                for b in msg["content"]
+                if not (
+                    isinstance(b, dict)
+                    and b.get("type") == "tool_result"
+                    and str(b.get("tool_use_id")) in stale_ids
+                )
+            ]
+            if remaining:
+                result.append({**msg, "content": remaining})
+        else:
+            result.append(msg)
 
-    for i in range(n):
-        if i in skip:
-            continue
+    return result
 
-        msg: Any = messages[i]
 
-        if msg.get("role") == "assistant":
-            content: Any = msg.get("content", "")
-            if isinstance(content, list):
-                tool_use_blocks = [
-                    b
-                    for b in content
-                    if isinstance(b, dict) and b.get("type") == "tool_use"
-                ]
+def _content_digest(content: Any) -> bytes:
+    if isinstance(content, str):
+        data = content.encode("utf-8")
+    else:
+        data = json.dumps(content, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+_REFERENCE = re.compile(r"\[Same result as tool_use_id (.+)\]\Z")
+
+
+def _unspilled(block: Dict[str, Any]) -> Any:
+    # Content without the spill marker compress_tool_result() appends; the
+    # marker names the block's own id, so it would make every copy unique.
+    content = block.get("content", "")
+    marker = {"type": "text", "text": spill_marker(str(block.get("tool_use_id")))}
+    if isinstance(content, list) and content and content[-1] == marker:
+        return content[:-1]
+    return content
+
+
+def _reference_target(block: Dict[str, Any]) -> Optional[str]:
+    # tool_use_id a deduped result points at, or None for a full result.
+    content = block.get("content")
+    match = _REFERENCE.match(content) if isinstance(content, str) else None
+    return match.group(1) if match else None
+
+
+def dedupe_tool_results(
+    messages: List[BeskarMessage], config: CompressorConfig
+) -> List[BeskarMessage]:
+    """Replace exact repeats of earlier ``tool_result`` contents with a reference.
 
-                if len(tool_use_blocks) == 1:
-                    tool_id = tool_use_blocks[0].get("id")
-                    tool_name = tool_use_blocks[0].get("name", "unknown")
-                    next_idx = i + 1
-
-                    if next_idx < n:
-                        next_msg: Any = messages[next_idx]
-                        if next_msg.get("role") == "user":
-                            next_content: Any = next_msg.get("content", "")
-                            if isinstance(next_content, list):
-                                has_matching = any(
-                                    isinstance(b, dict)
-                                    and b.get("type") == "tool_result"
-                                    and b.get("tool_use_id") == tool_id
-                                    for b in next_content
-                                )
-                                if has_matching:
-                                    distance = n - 1 - next_idx
-                                    if distance > threshold:
-                                        turns_ago = n - i
-                                        result.append(
-                                            {
-                                                "role": "assistant",
-                                                "content": f"[Tool: {tool_name} \u2014 result collapsed after {turns_ago} turns]",
-                                            }
-                                        )
-                                        skip.add(next_idx)
-                                        continue
-
-        result.append(msg)
+    Contents are hashed across the whole history; the first occurrence is
+    kept and each later duplicate's content becomes a short pointer to the
+    first result's ``tool_use_id``. The duplicate block keeps its own
+    ``tool_use_id`` (and any other fields), so pairing stays valid. Contents
+    shorter than the reference itself are left alone, as are results of
+    ``beskar_recall`` calls. Spilled results are compared without their
+    recall marker.
 
+    Never mutates the input list or message objects.
+    """
+    if not config.dedupe_tool_results:
+        return messages
+
+    recalls = {
+        tool_id for tool_id, name in tool_use_names(messages).items() if name == RECALL_TOOL_NAME
+    }
+    first_seen: Dict[bytes, str] = {}
+    result: List[BeskarMessage] = []
+    for msg in messages:
+        content: Any = msg.get("content")
+        if msg.get("role") != "user" or not isinstance(content, list):
+            result.append(msg)
+            continue
+        new_content: List[Any] = []
+        changed = False
+        for block in content:
+            if not (
+                isinstance(block, dict)
+                and block.get("type") == "tool_result"
+                and str(block.get("tool_use_id")) not in recalls
+            ):
+                new_content.append(block)
+                continue
+            payload = block.get("content", "")
+            if _reference_target(block) is not None:
+                new_content.append(block)  # already a reference
+                continue
+            digest = _content_digest(_unspilled(block))
+            original = first_seen.setdefault(digest, str(block.get("tool_use_id")))
+            reference = f"[Same result as tool_use_id {original}]"
+            if original != block.get("tool_use_id") and (
+                not isinstance(payload, str) or len(payload) > len(reference)
+            ):
+                new_content.append({**block, "content": reference})
+                changed = True
+            else:
+                new_content.append(block)
+        result.append({**msg, "content": new_content} if changed else msg)
     return result
+
+
+def repair_dedupe_references(
+    messages: List[BeskarMessage], previous: List[BeskarMessage], config: CompressorConfig
+) -> List[BeskarMessage]:
+    """Restore deduped results whose full copy was dropped since *previous*.
+
+    Collapsing or pruning a deduped history can remove the one full result
+    that later ``[Same result as tool_use_id …]`` blocks point at. Those
+    blocks get the content back from *previous* and the history is deduped
+    again, so every reference points at a result still sent.
+    """
+    kept: Set[str] = set()
+    targets: Set[str] = set()
+    for msg in messages:
+        content: Any = msg.get("content")
+        if msg.get("role") == "user" and isinstance(content, list):
+            for b in content:
+                if isinstance(b, dict) and b.get("type") == "tool_result":
+                    target = _reference_target(b)
+                    if target is None:
+                        kept.add(str(b.get("tool_use_id")))
+                    else:
+                        targets.add(target)
+    if targets <= kept:
+        return messages
+
+    payloads: Dict[str, Any] = {}
+    for msg in previous:
+        content = msg.get("content")
+        if msg.get("role") == "user" and isinstance(content, list):
+            for b in content:
+                if isinstance(b, dict) and b.get("type") == "tool_result":
+                    if _reference_target(b) is None:
+                        payloads[str(b.get("tool_use_id"))] = b.get("content", "")
+
+    repaired: List[BeskarMessage] = []
+    for msg in messages:
+        content = msg.get("content")
+        if msg.get("role") != "user" or not isinstance(content, list):
+            repaired.append(msg)
+            continue
+        new_content: List[Any] = []
+        for b in content:
+            target = _reference_target(b) if isinstance(b, dict) else None
+            if target in payloads and target not in kept:
+                b = {**b, "content": payloads[target]}
+            new_content.append(b)
+        repaired.append({**msg, "content": new_content})
+    return dedupe_tool_results(repaired, replace(config, dedupe_tool_results=True))
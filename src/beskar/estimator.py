@@ -0,0 +1,281 @@
+"""Estimator module — request token estimates and estimators calibrated against real usage."""
+from __future__ import annotations
+
+import json
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .types import BeskarMessage, estimate_tokens
+
+# Flat estimates for binary blocks, whose base64 data is not billed as text:
+# an image at the largest size sent without downscaling (~1.15 MP / 750),
+# and a few pages of a PDF document.
+IMAGE_BLOCK_TOKENS = 1_600
+DOCUMENT_BLOCK_TOKENS = 6_000
+
+CONTENT_CLASSES: Tuple[str, ...] = ("prose", "code", "json", "cjk")
+_PROSE, _CODE, _JSON, _CJK = range(4)
+
+# Tokens per character before any calibration — 4 chars/token for prose
+# matches estimate_tokens(); the rest are typical for Claude's tokenizer.
+DEFAULT_TOKENS_PER_CHAR: Tuple[float, ...] = (1 / 4.0, 1 / 3.2, 1 / 2.8, 1.0)
+
+# Value of the constant feature that fits per-request overhead, on the same
+# scale as character counts so one forgetting factor suits both.
+_OVERHEAD_UNIT = 1000
+
+# Hiragana/Katakana, CJK ideographs (+ Ext. A), Hangul, compatibility ideographs, full-width forms.
+_CJK_CHARS = re.compile(
+    "[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]"
+)
+_CODE_MARKERS = re.compile(
+    r"[{}();=<>\[\]]|^\s{2,}\S|\b(?:def|class|return|import|function|const|let|var)\b",
+    re.M,
+)
+
+
+def classify(text: str) -> List[int]:
+    """Return per-class character counts ``[prose, code, json, cjk]`` for *text*.
+
+    CJK characters are counted individually; the remaining characters are
+    attributed to a single class chosen for the whole string.
+    """
+    counts = [0, 0, 0, 0]
+    if not text:
+        return counts
+    cjk = _CJK_CHARS.subn("", text)[1]
+    counts[_CJK] = cjk
+    rest = len(text) - cjk
+    if rest == 0:
+        return counts
+    head = text.lstrip()[:1]
+    if head in ("{", "[") and text.rstrip()[-1:] in ("}", "]"):
+        counts[_JSON] = rest
+    elif len(_CODE_MARKERS.findall(text, 0, 4096)) * 40 > min(len(text), 4096):
+        counts[_CODE] = rest
+    else:
+        counts[_PROSE] = rest
+    return counts
+
+
+def _add(total: List[int], counts: List[int]) -> None:
+    for i, value in enumerate(counts):
+        total[i] += value
+
+
+def _block_features(block: Any, total: List[int]) -> int:
+    # Adds the block's text characters to *total*; returns the flat-rate
+    # tokens of any image or base64 document blocks, which have no text.
+    if not isinstance(block, dict):
+        return 0
+    block_type = block.get("type")
+    media = 0
+    if block_type == "text":
+        _add(total, classify(str(block.get("text", ""))))
+    elif block_type == "tool_use":
+        total[_JSON] += len(json.dumps(block.get("input", {}), default=str))
+    elif block_type == "tool_result":
+        media += _content_features(block.get("content", ""), total)
+    elif block_type == "image":
+        media += IMAGE_BLOCK_TOKENS
+    elif block_type == "document":
+        source = block.get("source") or {}
+        if source.get("type") == "text":
+            _add(total, classify(str(source.get("data", ""))))
+        elif source.get("type") == "content":
+            media += _content_features(source.get("content", ""), total)
+        else:
+            media += DOCUMENT_BLOCK_TOKENS
+    return media
+
+
+def _content_features(content: Any, total: List[int]) -> int:
+    if isinstance(content, str):
+        _add(total, classify(content))
+        return 0
+    media = 0
+    if isinstance(content, list):
+        for block in content:
+            media += _block_features(block, total)
+    return media
+
+
+def _request_features(
+    messages: Sequence[BeskarMessage], system: Any, tools: Any
+) -> Tuple[List[int], int]:
+    # Per-class character counts and the flat-rate tokens of media blocks.
+    total = [0, 0, 0, 0]
+    media = _content_features(system, total) if system is not None else 0
+    if tools:
+        total[_JSON] += sum(len(json.dumps(t, default=str)) for t in tools)
+    for msg in messages:
+        media += _content_features(msg.get("content", ""), total)
+    return total, media
+
+
+def request_features(
+    messages: Sequence[BeskarMessage], system: Any = None, tools: Any = None
+) -> List[int]:
+    """Return per-class character counts for a full request.
+
+    Image and base64 document blocks carry no text and are not counted.
+    """
+    return _request_features(messages, system, tools)[0]
+
+
+def estimate_request_tokens(
+    messages: Sequence[BeskarMessage],
+    system: Any = None,
+    tools: Any = None,
+    estimator: Optional[Callable[[str], int]] = None,
+) -> int:
+    """Estimate input tokens for a full request (system + tools + messages).
+
+    Only text is estimated; image and base64 document blocks, including
+    those inside tool results, count as ``IMAGE_BLOCK_TOKENS`` and
+    ``DOCUMENT_BLOCK_TOKENS``.
+    """
+    estimate = estimator or estimate_tokens
+    total = 0
+    if isinstance(system, str):
+        total += estimate(system)
+    elif isinstance(system, list):
+        total += sum(
+            estimate(str(block.get("text", "")))
+            for block in system
+            if isinstance(block, dict)
+        )
+    if tools:
+        total += estimate("".join(json.dumps(t, default=str) for t in tools))
+    for msg in messages:
+        total += _content_tokens(msg.get("content", ""), estimate)
+    return total
+
+
+def _content_tokens(content: Any, estimate: Callable[[str], int]) -> int:
+    # Text is estimated as text; images and base64 documents get a flat rate.
+    if isinstance(content, str):
+        return estimate(content)
+    if not isinstance(content, list):
+        return estimate(json.dumps(content, default=str))
+    total = 0
+    for block in content:
+        block_type = block.get("type") if isinstance(block, dict) else None
+        if block_type == "text":
+            total += estimate(str(block.get("text", "")))
+        elif block_type == "tool_use":
+            total += estimate(json.dumps(block.get("input", {}), default=str))
+        elif block_type == "tool_result":
+            total += _content_tokens(block.get("content", ""), estimate)
+        elif block_type == "image":
+            total += IMAGE_BLOCK_TOKENS
+        elif block_type == "document":
+            source = block.get("source") or {}
+            if source.get("type") == "text":
+                total += estimate(str(source.get("data", "")))
+            elif source.get("type") == "content":
+                total += _content_tokens(source.get("content", ""), estimate)
+            else:
+                total += DOCUMENT_BLOCK_TOKENS
+        else:
+            total += estimate(json.dumps(block, default=str))
+    return total
+
+
+class CalibratedEstimator:
+    """Token estimator whose per-class ratios are fitted from real usage.
+
+    Estimates are ``sum(chars[class] * tokens_per_char[class])``. After each
+    call, ``observe()`` compares the request's per-class character counts with
+    the input tokens the API actually billed, and updates the ratios by
+    recursive least squares with exponential forgetting. Each update is
+    O(1) in history length.
+
+    The fit also has a constant term for the fixed per-request overhead
+    (system scaffolding, tool-use framing), reported as ``overhead_tokens``
+    and left out of text estimates, so it does not inflate the ratios.
+    ``observe_request()`` subtracts image and document blocks at their flat
+    rates before fitting.
+
+    Instances are callable like ``estimate_tokens``. Pass one as
+    ``BeskarConfig.token_estimator`` so cache thresholds and tool-result
+    truncation use calibrated counts; ``BeskarClient`` feeds it automatically.
+    """
+
+    def __init__(
+        self,
+        tokens_per_char: Sequence[float] = DEFAULT_TOKENS_PER_CHAR,
+        forgetting: float = 0.995,
+        min_tokens_per_char: float = 0.05,
+        max_tokens_per_char: float = 4.0,
+        max_overhead_tokens: int = 20_000,
+    ) -> None:
+        self._weights: Tuple[float, ...] = tuple(tokens_per_char)
+        self._overhead = 0.0  # per _OVERHEAD_UNIT of the constant feature
+        self._forgetting = forgetting
+        self._bounds = (min_tokens_per_char, max_tokens_per_char)
+        self._max_overhead = max_overhead_tokens / _OVERHEAD_UNIT
+        self._p_init = 1e-4
+        self._p = [[self._p_init if i == j else 0.0 for j in range(5)] for i in range(5)]
+        self._lock = threading.Lock()
+        self.observations = 0
+
+    def __call__(self, text: str) -> int:
+        return self.estimate_counts(classify(text))
+
+    def estimate_many(self, texts: Sequence[str]) -> List[int]:
+        return [self.estimate_counts(classify(text)) for text in texts]
+
+    def estimate_counts(self, counts: Sequence[int]) -> int:
+        w = self._weights
+        return int(sum(c * w[i] for i, c in enumerate(counts)))
+
+    def ratios(self) -> Dict[str, float]:
+        """Current characters-per-token ratio for each content class."""
+        return {name: 1.0 / w for name, w in zip(CONTENT_CLASSES, self._weights)}
+
+    @property
+    def overhead_tokens(self) -> float:
+        """Fitted fixed tokens per request beyond its text."""
+        return self._overhead * _OVERHEAD_UNIT
+
+    def observe(self, counts: Sequence[int], actual_tokens: int) -> None:
+        """Update the ratios from one request's features and its billed input tokens."""
+        x = [float(c) for c in counts] + [float(_OVERHEAD_UNIT)]
+        if actual_tokens <= 0 or not any(x[:4]):
+            return
+        with self._lock:
+            lam = self._forgetting
+            p = self._p
+            w = list(self._weights) + [self._overhead]
+            px = [sum(p[i][j] * x[j] for j in range(5)) for i in range(5)]
+            denom = lam + sum(x[i] * px[i] for i in range(5))
+            gain = [v / denom for v in px]
+            error = actual_tokens - sum(w[i] * x[i] for i in range(5))
+            lo, hi = self._bounds
+            self._weights = tuple(
+                min(max(w[i] + gain[i] * error, lo), hi) for i in range(4)
+            )
+            self._overhead = min(max(w[4] + gain[4] * error, 0.0), self._max_overhead)
+            self._p = [
+                [(p[i][j] - gain[i] * px[j]) / lam for j in range(5)] for i in range(5)
+            ]
+            # Anti-windup: directions that are never excited would grow without bound.
+            for i in range(5):
+                if self._p[i][i] > self._p_init:
+                    scale = (self._p_init / self._p[i][i]) ** 0.5
+                    for j in range(5):
+                        self._p[i][j] *= scale
+                        self._p[j][i] *= scale
+            self.observations += 1
+
+    def observe_request(
+        self,
+        messages: Sequence[BeskarMessage],
+        system: Any,
+        tools: Any,
+        actual_tokens: int,
+    ) -> None:
+        counts, media = _request_features(messages, system, tools)
+        self.observe(counts, actual_tokens - media)
@@ -0,0 +1,223 @@
+"""Exporter module — OpenMetrics / Prometheus exposition of MetricsTracker data."""
+from __future__ import annotations
+
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+from .metrics import MetricsTracker, TagSet
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Latency bucket upper bounds, in seconds.
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+_INVALID_LABEL_CHARS = re.compile(r"[^a-zA-Z0-9_]")
+
+# (family name, help text, MetricsSummary attribute)
+_COUNTERS: Tuple[Tuple[str, str, str], ...] = (
+    ("beskar_calls", "API calls tracked.", "total_calls"),
+    ("beskar_input_tokens", "Uncached input tokens.", "total_input_tokens"),
+    ("beskar_output_tokens", "Output tokens.", "total_output_tokens"),
+    ("beskar_cache_creation_tokens", "Cache creation input tokens.", "total_cache_creation_tokens"),
+    ("beskar_cache_read_tokens", "Cache read input tokens.", "total_cache_read_tokens"),
+    ("beskar_cost_usd", "Estimated cost in USD.", "estimated_cost_usd"),
+    ("beskar_savings_usd", "Estimated savings from cache reads in USD.", "estimated_savings_usd"),
+)
+
+
+def _label_name(key: str) -> str:
+    name = _INVALID_LABEL_CHARS.sub("_", key)
+    return "_" + name if not name or name[0].isdigit() else name
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{_label_name(k)}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _series_labels(model: Optional[str], tags: TagSet) -> List[Tuple[str, str]]:
+    # "model" wins over a user tag with the same name
+    return [("model", model or "unknown")] + [(k, v) for k, v in tags if _label_name(k) != "model"]
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def render_openmetrics(
+    tracker: MetricsTracker,
+    latency_buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+) -> str:
+    """Render *tracker*'s counters and latency histograms in OpenMetrics text format."""
+    lines: List[str] = []
+    series = sorted(
+        tracker.summary_by_series().items(),
+        key=lambda item: (item[0][0] or "", item[0][1]),
+    )
+
+    for family, help_text, attr in _COUNTERS:
+        lines.append(f"# TYPE {family} counter")
+        lines.append(f"# HELP {family} {help_text}")
+        for (model, tags), summary in series:
+            labels = _labels(_series_labels(model, tags))
+            lines.append(f"{family}_total{labels} {_format_value(getattr(summary, attr))}")
+
+    histograms = sorted(
+        tracker.latency_histograms().items(), key=lambda item: (item[0][0], item[0][1] or "")
+    )
+    if histograms:
+        family = "beskar_latency_seconds"
+        lines.append(f"# TYPE {family} histogram")
+        lines.append(f"# HELP {family} Latency by kind (api, ttft, overhead) and model.")
+        bounds_us = [int(b * 1_000_000) for b in latency_buckets]
+        for (kind, model), hist in histograms:
+            base = [("kind", kind), ("model", model or "unknown")]
+            for bound, cumulative in zip(latency_buckets, hist.cumulative_counts(bounds_us)):
+                lines.append(f"{family}_bucket{_labels(base + [('le', repr(float(bound)))])} {cumulative}")
+            lines.append(f"{family}_bucket{_labels(base + [('le', '+Inf')])} {hist.count}")
+            lines.append(f"{family}_count{_labels(base)} {hist.count}")
+            lines.append(f"{family}_sum{_labels(base)} {repr(hist.total / 1_000_000)}")
+
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+class OpenMetricsExporter:
+    """Caches rendered exposition text so frequent scrapes stay cheap.
+
+    Rendering snapshots each tracker shard under that shard's lock only for
+    the duration of a copy, so scraping never blocks ``track()`` for longer
+    than one snapshot. Within ``min_interval_s`` of the last render, the
+    cached text is returned without touching the tracker at all.
+    """
+
+    def __init__(
+        self,
+        tracker: MetricsTracker,
+        min_interval_s: float = 1.0,
+        latency_buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        self._tracker = tracker
+        self._min_interval_s = min_interval_s
+        self._latency_buckets = tuple(latency_buckets)
+        self._lock = threading.Lock()
+        self._cached: Optional[str] = None
+        self._rendered_at = 0.0
+
+    def render(self) -> str:
+        with self._lock:
+            now = time.monotonic()
+            if self._cached is None or now - self._rendered_at >= self._min_interval_s:
+                self._cached = render_openmetrics(self._tracker, self._latency_buckets)
+                self._rendered_at = now
+            return self._cached
+
+
+def make_handler(exporter: OpenMetricsExporter) -> type:
+    """Return a ``BaseHTTPRequestHandler`` subclass serving *exporter* on ``/metrics``."""
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = exporter.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return _MetricsHandler
+
+
+def start_http_server(
+    tracker: MetricsTracker,
+    port: int = 9464,
+    addr: str = "0.0.0.0",
+    min_interval_s: float = 1.0,
+) -> ThreadingHTTPServer:
+    """Serve *tracker* on ``http://addr:port/metrics`` from a daemon thread.
+
+    Call ``shutdown()`` on the returned server to stop it.
+    """
+    server = ThreadingHTTPServer(
+        (addr, port), make_handler(OpenMetricsExporter(tracker, min_interval_s))
+    )
+    server.daemon_threads = True
+    thread = threading.Thread(
+        target=server.serve_forever, name="beskar-metrics-http", daemon=True
+    )
+    thread.start()
+    return server
+
+
+class PrometheusCollector:
+    """Custom collector for ``prometheus_client``.
+
+    Register with ``prometheus_client.REGISTRY.register(PrometheusCollector(tracker))``.
+    Requires the optional ``prometheus_client`` package.
+    """
+
+    def __init__(
+        self,
+        tracker: MetricsTracker,
+        latency_buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        self._tracker = tracker
+        self._latency_buckets = tuple(latency_buckets)
+
+    def collect(self) -> Iterator[Any]:
+        from prometheus_client.core import CounterMetricFamily, HistogramMetricFamily
+
+        series = [
+            (_series_labels(model, tags), summary)
+            for (model, tags), summary in self._tracker.summary_by_series().items()
+        ]
+        # prometheus_client needs one label set per family; missing tags become "".
+        label_names: List[str] = []
+        for labels, _ in series:
+            for key, _ in labels:
+                name = _label_name(key)
+                if name not in label_names:
+                    label_names.append(name)
+        for family, help_text, attr in _COUNTERS:
+            metric = CounterMetricFamily(family, help_text, labels=label_names)
+            for labels, summary in series:
+                values = {_label_name(k): v for k, v in labels}
+                metric.add_metric([values.get(n, "") for n in label_names], getattr(summary, attr))
+            yield metric
+
+        histograms = self._tracker.latency_histograms()
+        if not histograms:
+            return
+        latency = HistogramMetricFamily(
+            "beskar_latency_seconds",
+            "Latency by kind (api, ttft, overhead) and model.",
+            labels=["kind", "model"],
+        )
+        bounds_us = [int(b * 1_000_000) for b in self._latency_buckets]
+        for (kind, model), hist in histograms.items():
+            buckets: List[Tuple[str, float]] = [
+                (repr(float(bound)), float(cumulative))
+                for bound, cumulative in zip(self._latency_buckets, hist.cumulative_counts(bounds_us))
+            ]
+            buckets.append(("+Inf", float(hist.count)))
+            latency.add_metric([kind, model or "unknown"], buckets, hist.total / 1_000_000)
+        yield latency
+
@@ -0,0 +1,289 @@
+"""Journal module — append-only binary log of TokenUsage records."""
+from __future__ import annotations
+
+import json
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from .types import BeskarError, TokenUsage
+
+# Sorted (key, value) pairs, as metrics.TagSet.
+_TagSet = Tuple[Tuple[str, str], ...]
+
+_MAGIC = b"BKJ1"
+# Model definition: tag, model id, byte length — followed by the UTF-8 name.
+_MODEL = struct.Struct("<cHH")
+# Tag set definition: tag, tag set id, byte length — followed by the pairs as JSON.
+_TAGS = struct.Struct("<cHH")
+# Usage record: tag, timestamp, model id, calls, input, output, cache creation, cache read.
+_USAGE = struct.Struct("<cdHQQQQQ")
+# Tagged usage record: as a usage record, with the tag set id after the model id.
+_TAGGED_USAGE = struct.Struct("<cdHHQQQQQ")
+_TAG_MODEL = b"M"
+_TAG_TAGS = b"T"
+_TAG_USAGE = b"U"
+_TAG_TAGGED_USAGE = b"V"
+
+
+@dataclass
+class JournalEntry:
+    timestamp: float
+    model: Optional[str]
+    calls: int
+    usage: TokenUsage
+    tags: _TagSet = ()
+
+
+@dataclass
+class _Parsed:
+    entries: List[JournalEntry]
+    valid_length: int
+    model_ids: Dict[Optional[str], int]
+    tag_ids: Dict[_TagSet, int]
+
+
+def _parse(data: bytes) -> _Parsed:
+    """Parse journal bytes into entries and the model and tag set id tables.
+
+    ``valid_length`` stops before a truncated trailing record, e.g. one cut
+    short by a crash.
+    """
+    if not data:
+        return _Parsed([], 0, {None: 0}, {(): 0})
+    if data[: len(_MAGIC)] != _MAGIC:
+        raise BeskarError("not a Beskar usage journal")
+    names: Dict[int, Optional[str]] = {0: None}
+    tag_sets: Dict[int, _TagSet] = {0: ()}
+    entries: List[JournalEntry] = []
+    offset = len(_MAGIC)
+    end = len(data)
+    while offset < end:
+        tag = data[offset : offset + 1]
+        if tag == _TAG_MODEL:
+            if offset + _MODEL.size > end:
+                break
+            _, model_id, length = _MODEL.unpack_from(data, offset)
+            start = offset + _MODEL.size
+            if start + length > end:
+                break
+            names[model_id] = data[start : start + length].decode("utf-8")
+            offset = start + length
+        elif tag == _TAG_TAGS:
+            if offset + _TAGS.size > end:
+                break
+            _, tags_id, length = _TAGS.unpack_from(data, offset)
+            start = offset + _TAGS.size
+            if start + length > end:
+                break
+            pairs = json.loads(data[start : start + length].decode("utf-8"))
+            tag_sets[tags_id] = tuple((str(k), str(v)) for k, v in pairs)
+            offset = start + length
+        elif tag in (_TAG_USAGE, _TAG_TAGGED_USAGE):
+            tags_id = 0
+            if tag == _TAG_USAGE:
+                if offset + _USAGE.size > end:
+                    break
+                _, ts, model_id, calls, inp, out, creation, read = _USAGE.unpack_from(data, offset)
+                offset += _USAGE.size
+            else:
+                if offset + _TAGGED_USAGE.size > end:
+                    break
+                _, ts, model_id, tags_id, calls, inp, out, creation, read = (
+                    _TAGGED_USAGE.unpack_from(data, offset)
+                )
+                offset += _TAGGED_USAGE.size
+            entries.append(
+                JournalEntry(
+                    timestamp=ts,
+                    model=names.get(model_id),
+                    calls=calls,
+                    usage=TokenUsage(
+                        input_tokens=inp,
+                        output_tokens=out,
+                        cache_creation_input_tokens=creation,
+                        cache_read_input_tokens=read,
+                    ),
+                    tags=tag_sets.get(tags_id, ()),
+                )
+            )
+        else:
+            raise BeskarError(f"corrupt usage journal at byte {offset}")
+    return _Parsed(
+        entries,
+        offset,
+        {name: model_id for model_id, name in names.items()},
+        {tag_set: tags_id for tags_id, tag_set in tag_sets.items()},
+    )
+
+
+class UsageJournal:
+    """Append-only binary journal of per-call usage, reloadable after a restart.
+
+    Each call costs one fixed-size record (51 bytes, 53 when tagged). Model
+    names and tag sets are written once and then referenced by id.
+    ``compact()`` rolls records older than a cutoff into one record per
+    (bucket, model, tag set), which keeps a long-lived journal small while
+    preserving totals.
+
+    A record cut short by a crash is discarded on open.
+    """
+
+    def __init__(self, path: str, fsync: bool = False) -> None:
+        self.path = path
+        self._fsync = fsync
+        self._lock = threading.Lock()
+        self._open()
+
+    def _open(self) -> None:
+        data = b""
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                data = f.read()
+        parsed = _parse(data)
+        self._model_ids = parsed.model_ids
+        self._tag_ids = parsed.tag_ids
+        self._file: BinaryIO = open(self.path, "r+b" if data else "wb")
+        if not data:
+            self._file.write(_MAGIC)
+        else:
+            self._file.truncate(parsed.valid_length)
+            self._file.seek(parsed.valid_length)
+
+    def _model_id(self, model: Optional[str]) -> int:
+        model_id = self._model_ids.get(model)
+        if model_id is None:
+            model_id = len(self._model_ids)
+            encoded = (model or "").encode("utf-8")
+            self._file.write(_MODEL.pack(_TAG_MODEL, model_id, len(encoded)) + encoded)
+            self._model_ids[model] = model_id
+        return model_id
+
+    def _tags_id(self, tags: _TagSet) -> int:
+        tags_id = self._tag_ids.get(tags)
+        if tags_id is None:
+            tags_id = len(self._tag_ids)
+            encoded = json.dumps([list(pair) for pair in tags]).encode("utf-8")
+            self._file.write(_TAGS.pack(_TAG_TAGS, tags_id, len(encoded)) + encoded)
+            self._tag_ids[tags] = tags_id
+        return tags_id
+
+    def _write_usage(
+        self,
+        usage: TokenUsage,
+        model: Optional[str],
+        timestamp: float,
+        calls: int,
+        tags: _TagSet = (),
+    ) -> None:
+        counts = (
+            calls,
+            usage.input_tokens,
+            usage.output_tokens,
+            usage.cache_creation_input_tokens,
+            usage.cache_read_input_tokens,
+        )
+        model_id = self._model_id(model)
+        if not tags:
+            self._file.write(_USAGE.pack(_TAG_USAGE, timestamp, model_id, *counts))
+        else:
+            tags_id = self._tags_id(tags)
+            self._file.write(
+                _TAGGED_USAGE.pack(_TAG_TAGGED_USAGE, timestamp, model_id, tags_id, *counts)
+            )
+
+    def append(
+        self,
+        usage: TokenUsage,
+        model: Optional[str] = None,
+        timestamp: Optional[float] = None,
+        calls: int = 1,
+        tags: _TagSet = (),
+    ) -> None:
+        """Append one record; *tags* is the sorted tag set the usage was tracked under."""
+        with self._lock:
+            self._write_usage(
+                usage, model, time.time() if timestamp is None else timestamp, calls, tags
+            )
+            if self._fsync:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+
+    def flush(self) -> None:
+        with self._lock:
+            self._file.flush()
+
+    def replay(self) -> Iterator[JournalEntry]:
+        """Yield every record currently in the journal, oldest first."""
+        self.flush()
+        with open(self.path, "rb") as f:
+            entries = _parse(f.read()).entries
+        return iter(entries)
+
+    def compact(
+        self, older_than_s: float, bucket_s: float = 3600.0, now: Optional[float] = None
+    ) -> int:
+        """Roll records older than *older_than_s* into per-(bucket, model, tags) records.
+
+        Rewrites the file atomically. Returns the number of records removed.
+        """
+        cutoff = (time.time() if now is None else now) - older_than_s
+        with self._lock:
+            self._file.flush()
+            with open(self.path, "rb") as f:
+                entries = _parse(f.read()).entries
+
+            rollups: Dict[Tuple[float, Optional[str], _TagSet], List[int]] = {}
+            recent: List[JournalEntry] = []
+            for entry in entries:
+                if entry.timestamp >= cutoff:
+                    recent.append(entry)
+                    continue
+                bucket = (entry.timestamp // bucket_s) * bucket_s
+                acc = rollups.setdefault((bucket, entry.model, entry.tags), [0, 0, 0, 0, 0])
+                u = entry.usage
+                acc[0] += entry.calls
+                acc[1] += u.input_tokens
+                acc[2] += u.output_tokens
+                acc[3] += u.cache_creation_input_tokens
+                acc[4] += u.cache_read_input_tokens
+
+            self._file.close()
+            tmp_path = self.path + ".tmp"
+            self._file = open(tmp_path, "wb")
+            self._file.write(_MAGIC)
+            self._model_ids = {None: 0}
+            self._tag_ids = {(): 0}
+            for (bucket, model, tags), acc in sorted(rollups.items(), key=lambda kv: kv[0][0]):
+                usage = TokenUsage(
+                    input_tokens=acc[1],
+                    output_tokens=acc[2],
+                    cache_creation_input_tokens=acc[3],
+                    cache_read_input_tokens=acc[4],
+                )
+                self._write_usage(usage, model, bucket, acc[0], tags)
+            for entry in recent:
+                self._write_usage(
+                    entry.usage, entry.model, entry.timestamp, entry.calls, entry.tags
+                )
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            os.replace(tmp_path, self.path)
+            self._file = open(self.path, "r+b")
+            self._file.seek(0, os.SEEK_END)
+            return len(entries) - len(rollups) - len(recent)
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __enter__(self) -> "UsageJournal":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
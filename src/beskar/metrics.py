@@ -1,11 +1,41 @@
 """Metrics module — token usage tracking and cost estimation."""
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+import math
+import struct
+import threading
+import time
+import weakref
+from array import array
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 
 import anthropic
 
-from .types import MetricsConfig, MetricsSummary, TokenUsage
+from .types import (
+    BeskarError,
+    LatencyKind,
+    LatencySummary,
+    MetricsConfig,
+    MetricsSummary,
+    RoutingSummary,
+    ThinkingSummary,
+    TokenUsage,
+)
+from .window import RollingWindow
+
+if TYPE_CHECKING:
+    from .journal import UsageJournal
 
 # Per-model pricing (USD per million tokens).
 # Falls back to Sonnet rates for unrecognised model strings.
@@ -41,12 +71,16 @@ _MODEL_ALIASES: Dict[str, str] = {
 PRICING = PRICING_BY_MODEL["claude-sonnet-4-20250514"]
 
 
+def resolve_model(model: str) -> str:
+    """Canonical name of *model*; names without an alias are returned unchanged."""
+    return _MODEL_ALIASES.get(model, model)
+
+
 def _resolve_pricing(model: Optional[str] = None) -> Dict[str, float]:
     """Return the pricing dict for *model*, falling back to Sonnet rates."""
     if model is None:
         return PRICING
-    canonical = _MODEL_ALIASES.get(model, model)
-    return PRICING_BY_MODEL.get(canonical, PRICING)
+    return PRICING_BY_MODEL.get(resolve_model(model), PRICING)
 
 
 def map_usage(raw: anthropic.types.Usage) -> TokenUsage:
@@ -79,51 +113,635 @@ def estimate_savings_usd(usage: TokenUsage, model: Optional[str] = None) -> floa
     )
 
 
+class LogHistogram:
+    """Fixed-memory, log-linear histogram of non-negative integers (HDR-style).
+
+    Values below ``2 ** (sub_bucket_bits + 1)`` are counted exactly. Each
+    power-of-two range above that is split into ``2 ** sub_bucket_bits``
+    equal buckets, which bounds the relative error at ``2 ** -sub_bucket_bits``
+    (~3% by default). Values above ``max_value`` are clamped to it. Memory
+    is fixed at construction and does not depend on the number of records.
+
+    Histograms with the same parameters can be merged in-process with
+    ``merge()``, or across processes via ``to_bytes()`` / ``from_bytes()``.
+    """
+
+    _HEADER = struct.Struct("<4sBQQQQQI")
+    _ENTRY = struct.Struct("<IQ")
+    _MAGIC = b"BKH1"
+
+    def __init__(self, sub_bucket_bits: int = 5, max_value: int = 2**36) -> None:
+        self._bits = sub_bucket_bits
+        self._sub = 1 << sub_bucket_bits
+        self._max_value = max_value
+        self._counts = array("Q", [0]) * (self._index(max_value) + 1)
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        sub = self._sub
+        if value < 2 * sub:
+            return value
+        shift = value.bit_length() - self._bits - 1
+        return 2 * sub + (shift - 1) * sub + ((value >> shift) - sub)
+
+    def _bucket_bounds(self, index: int) -> Tuple[int, int]:
+        sub = self._sub
+        if index < 2 * sub:
+            return index, index
+        offset = index - 2 * sub
+        shift = offset // sub + 1
+        low = (offset % sub + sub) << shift
+        return low, low + (1 << shift) - 1
+
+    def record(self, value: int, count: int = 1) -> None:
+        value = min(max(int(value), 0), self._max_value)
+        self._counts[self._index(value)] += count
+        if self.count == 0 or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += count
+        self.total += value * count
+
+    def percentile(self, q: float) -> float:
+        """Return the value at percentile *q* (0–100), 0.0 when empty."""
+        if self.count == 0:
+            return 0.0
+        rank = max(1, math.ceil(q / 100.0 * self.count))
+        seen = 0
+        for index, bucket_count in enumerate(self._counts):
+            if not bucket_count:
+                continue
+            seen += bucket_count
+            if seen >= rank:
+                low, high = self._bucket_bounds(index)
+                return float(min(max((low + high) / 2, self.min), self.max))
+        return float(self.max)
+
+    def cumulative_counts(self, bounds: Sequence[int]) -> List[int]:
+        """Return, for each ascending bound, how many records fall at or below it.
+
+        Resolution is one bucket: a bucket counts toward a bound once its
+        upper edge is at or below that bound.
+        """
+        result: List[int] = []
+        seen = 0
+        index = 0
+        n = len(self._counts)
+        for bound in bounds:
+            while index < n and self._bucket_bounds(index)[1] <= bound:
+                seen += self._counts[index]
+                index += 1
+            result.append(seen)
+        return result
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def _check_compatible(self, other: "LogHistogram") -> None:
+        if other._bits != self._bits or other._max_value != self._max_value:
+            raise BeskarError("cannot merge histograms with different parameters")
+
+    def merge(self, other: "LogHistogram") -> None:
+        """Add all of *other*'s records to this histogram."""
+        self._check_compatible(other)
+        if other.count == 0:
+            return
+        counts = self._counts
+        for index, bucket_count in enumerate(other._counts):
+            if bucket_count:
+                counts[index] += bucket_count
+        if self.count == 0 or other.min < self.min:
+            self.min = other.min
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def copy(self) -> "LogHistogram":
+        clone = LogHistogram(self._bits, self._max_value)
+        clone.merge(self)
+        return clone
+
+    def to_bytes(self) -> bytes:
+        """Serialize sparsely: a fixed header plus one entry per non-empty bucket."""
+        entries = [(i, c) for i, c in enumerate(self._counts) if c]
+        parts = [
+            self._HEADER.pack(
+                self._MAGIC, self._bits, self._max_value,
+                self.count, self.total, self.min, self.max, len(entries),
+            )
+        ]
+        parts.extend(self._ENTRY.pack(i, c) for i, c in entries)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "LogHistogram":
+        try:
+            magic, bits, max_value, count, total, lo, hi, n = cls._HEADER.unpack_from(data)
+        except struct.error as exc:
+            raise BeskarError("truncated histogram data") from exc
+        if magic != cls._MAGIC:
+            raise BeskarError("not a serialized LogHistogram")
+        hist = cls(bits, max_value)
+        offset = cls._HEADER.size
+        for _ in range(n):
+            index, bucket_count = cls._ENTRY.unpack_from(data, offset)
+            hist._counts[index] = bucket_count
+            offset += cls._ENTRY.size
+        hist.count, hist.total, hist.min, hist.max = count, total, lo, hi
+        return hist
+
+
+def summarize_latency(hist: LogHistogram) -> LatencySummary:
+    """Convert a microsecond histogram into a millisecond ``LatencySummary``."""
+    return LatencySummary(
+        count=hist.count,
+        mean_ms=hist.mean / 1000.0,
+        min_ms=hist.min / 1000.0,
+        max_ms=hist.max / 1000.0,
+        p50_ms=hist.percentile(50) / 1000.0,
+        p90_ms=hist.percentile(90) / 1000.0,
+        p99_ms=hist.percentile(99) / 1000.0,
+        p999_ms=hist.percentile(99.9) / 1000.0,
+    )
+
+
+# Accumulator slots — one list of ints per (model, tags) series inside each shard.
+_CALLS, _INPUT, _OUTPUT, _CACHE_CREATION, _CACHE_READ = range(5)
+
+# Sorted (key, value) pairs; hashable so it can key the accumulators.
+TagSet = Tuple[Tuple[str, str], ...]
+_SeriesKey = Tuple[Optional[str], TagSet]
+
+# Tag set used once MetricsConfig.max_tag_sets distinct sets have been seen.
+OVERFLOW_TAGS: TagSet = (("overflow", "true"),)
+
+# Tags on usage of Beskar's own summarization calls, kept apart from request series.
+SUMMARIZATION_TAGS: Dict[str, str] = {"purpose": "summarization"}
+_SUMMARIZATION_PAIRS = frozenset(SUMMARIZATION_TAGS.items())
+
+
+# Overflow set for summarization usage, so the cap never moves it into request series.
+_SUMMARIZATION_OVERFLOW_TAGS: TagSet = tuple(
+    sorted(OVERFLOW_TAGS + tuple(SUMMARIZATION_TAGS.items()))
+)
+
+
+def _is_summarization(tag_set: TagSet) -> bool:
+    return _SUMMARIZATION_PAIRS.issubset(tag_set)
+
+
+class _Shard:
+    """Per-thread accumulators. Only the owning thread writes to a shard."""
+
+    __slots__ = ("lock", "series", "latency", "windows", "events", "routing", "thinking")
+
+    def __init__(self, window_spans: Sequence[float] = ()) -> None:
+        # Uncontended except while summary() snapshots this shard.
+        self.lock = threading.Lock()
+        self.series: Dict[_SeriesKey, List[int]] = {}
+        # (kind, model) → microsecond histogram
+        self.latency: Dict[Tuple[str, Optional[str]], LogHistogram] = {}
+        self.windows = [RollingWindow(span) for span in window_spans]
+        # (kind, label) → count of pipeline decisions, e.g. preflight actions
+        self.events: Dict[Tuple[str, str], int] = {}
+        # (requested, routed) model → [calls, cost_usd, counterfactual_cost_usd]
+        self.routing: Dict[Tuple[Optional[str], Optional[str]], List[float]] = {}
+        # turn type → [calls, thinking calls, budget, fixed budget, thinking tokens, savings_usd]
+        self.thinking: Dict[str, List[float]] = {}
+
+    def merge(self, other: "_Shard") -> None:
+        """Add *other*'s accumulators into this shard."""
+        _add_lists(self.series, other.series)
+        for key, hist in other.latency.items():
+            mine = self.latency.get(key)
+            if mine is None:
+                self.latency[key] = hist.copy()
+            else:
+                mine.merge(hist)
+        for window, other_window in zip(self.windows, other.windows):
+            window.merge(other_window)
+        for key, n in other.events.items():
+            self.events[key] = self.events.get(key, 0) + n
+        _add_lists(self.routing, other.routing)
+        _add_lists(self.thinking, other.thinking)
+
+
+def _add_lists(target: Dict[Any, List[Any]], source: Dict[Any, List[Any]]) -> None:
+    for key, values in source.items():
+        total = target.get(key)
+        if total is None:
+            target[key] = list(values)
+        else:
+            for i, value in enumerate(values):
+                total[i] += value
+
+
+class _ThreadToken:
+    """Stored in a thread's local state; collected when the thread exits."""
+
+    __slots__ = ("__weakref__",)
+
+
+def _retire_shard(tracker_ref: "weakref.ref[MetricsTracker]", shard: _Shard) -> None:
+    tracker = tracker_ref()
+    if tracker is not None:
+        tracker._retire(shard)
+
+
+def _summarize_accumulators(
+    accumulators: Iterable[Tuple[Optional[str], List[int]]]
+) -> MetricsSummary:
+    calls = input_tokens = output_tokens = cache_creation = cache_read = 0
+    cost = savings = 0.0
+    for model, acc in accumulators:
+        usage = TokenUsage(
+            input_tokens=acc[_INPUT],
+            output_tokens=acc[_OUTPUT],
+            cache_creation_input_tokens=acc[_CACHE_CREATION],
+            cache_read_input_tokens=acc[_CACHE_READ],
+        )
+        calls += acc[_CALLS]
+        input_tokens += usage.input_tokens
+        output_tokens += usage.output_tokens
+        cache_creation += usage.cache_creation_input_tokens
+        cache_read += usage.cache_read_input_tokens
+        cost += estimate_cost_usd(usage, model)
+        savings += estimate_savings_usd(usage, model)
+
+    return _summary_from_totals(
+        [calls, input_tokens, output_tokens, cache_creation, cache_read], cost, savings
+    )
+
+
+def _summary_from_totals(counts: List[int], cost: float, savings: float) -> MetricsSummary:
+    denominator = counts[_INPUT] + counts[_CACHE_READ]
+    return MetricsSummary(
+        total_calls=counts[_CALLS],
+        total_input_tokens=counts[_INPUT],
+        total_output_tokens=counts[_OUTPUT],
+        total_cache_creation_tokens=counts[_CACHE_CREATION],
+        total_cache_read_tokens=counts[_CACHE_READ],
+        cache_hit_rate=counts[_CACHE_READ] / denominator if denominator > 0 else 0.0,
+        estimated_cost_usd=cost,
+        estimated_savings_usd=savings,
+    )
+
+
 class MetricsTracker:
+    """Accumulates usage per model (and optional tags) across calls.
+
+    Safe to share across threads: each thread writes to its own shard and
+    ``summary()`` merges all shards. When a thread exits, its shard is folded
+    into a shared one, so short-lived threads do not accumulate shards.
+    asyncio tasks on one event loop share that loop's shard, which is safe
+    because ``track()`` never awaits.
+    Costs are priced per model, so mixed-model sessions report exact totals.
+    """
+
     def __init__(self, config: Optional[MetricsConfig] = None) -> None:
         self._config = config
-        self._model: Optional[str] = None
-        self._total_calls = 0
-        self._total_input_tokens = 0
-        self._total_output_tokens = 0
-        self._total_cache_creation_tokens = 0
-        self._total_cache_read_tokens = 0
-
-    def track(self, raw: anthropic.types.Usage, model: Optional[str] = None) -> TokenUsage:
+        self._window_spans: Tuple[float, ...] = tuple(config.windows) if config else ()
+        self._journal = config.journal if config else None
+        self._local = threading.local()
+        # Accumulators of exited threads; replaced (never written) on each fold
+        self._retired = _Shard(self._window_spans)
+        self._shards: List[_Shard] = [self._retired]
+        self._shards_lock = threading.Lock()
+        self._tag_sets: Set[TagSet] = set()
+        self._max_tag_sets = (config or MetricsConfig()).max_tag_sets
+
+    def _resolve_tags(self, tags: Optional[Mapping[str, str]]) -> TagSet:
+        """Normalize *tags*, collapsing new sets beyond the bound into OVERFLOW_TAGS.
+
+        Summarization sets beyond the bound collapse into an overflow set
+        that keeps ``SUMMARIZATION_TAGS``.
+        """
+        if not tags:
+            return ()
+        tag_set = tuple(sorted((str(k), str(v)) for k, v in tags.items()))
+        if tag_set in self._tag_sets:
+            return tag_set
+        with self._shards_lock:
+            if tag_set in self._tag_sets:
+                return tag_set
+            if len(self._tag_sets) >= self._max_tag_sets:
+                if _is_summarization(tag_set):
+                    return _SUMMARIZATION_OVERFLOW_TAGS
+                return OVERFLOW_TAGS
+            self._tag_sets.add(tag_set)
+        return tag_set
+
+    def _shard(self) -> _Shard:
+        shard: Optional[_Shard] = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = _Shard(self._window_spans)
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            token = self._local.token = _ThreadToken()
+            weakref.finalize(token, _retire_shard, weakref.ref(self), shard)
+        return shard
+
+    def _retire(self, shard: _Shard) -> None:
+        # Fold an exited thread's shard into a new retired shard. Readers that
+        # already listed the old pair keep a consistent view.
+        with self._shards_lock:
+            if shard not in self._shards:
+                return
+            retired = _Shard(self._window_spans)
+            retired.merge(self._retired)
+            with shard.lock:
+                retired.merge(shard)
+            old = self._retired
+            self._retired = retired
+            self._shards = [retired] + [s for s in self._shards if s is not shard and s is not old]
+
+    def track(
+        self,
+        raw: anthropic.types.Usage,
+        model: Optional[str] = None,
+        tags: Optional[Mapping[str, str]] = None,
+    ) -> TokenUsage:
         usage = map_usage(raw)
-        if model is not None:
-            self._model = model
-        self._total_calls += 1
-        self._total_input_tokens += usage.input_tokens
-        self._total_output_tokens += usage.output_tokens
-        self._total_cache_creation_tokens += usage.cache_creation_input_tokens
-        self._total_cache_read_tokens += usage.cache_read_input_tokens
-        if self._config and self._config.on_usage:
-            self._config.on_usage(usage)
+        timestamp = time.time() if self._window_spans or self._journal else 0.0
+        tag_set = self._resolve_tags(tags)
+        self._record(usage, model, tag_set, 1, timestamp)
+        if self._journal is not None:
+            self._journal.append(usage, model, timestamp, tags=tag_set)
+        if self._config:
+            if self._config.on_usage:
+                self._config.on_usage(usage)
+            if self._config.sink is not None:
+                self._config.sink.submit(usage)
         return usage
 
+    def _record(
+        self,
+        usage: TokenUsage,
+        model: Optional[str],
+        tag_set: TagSet,
+        calls: int,
+        timestamp: float,
+    ) -> None:
+        shard = self._shard()
+        with shard.lock:
+            acc = shard.series.get((model, tag_set))
+            if acc is None:
+                acc = shard.series[(model, tag_set)] = [0, 0, 0, 0, 0]
+            acc[_CALLS] += calls
+            acc[_INPUT] += usage.input_tokens
+            acc[_OUTPUT] += usage.output_tokens
+            acc[_CACHE_CREATION] += usage.cache_creation_input_tokens
+            acc[_CACHE_READ] += usage.cache_read_input_tokens
+            if shard.windows and not _is_summarization(tag_set):
+                cost = estimate_cost_usd(usage, model)
+                savings = estimate_savings_usd(usage, model)
+                for window in shard.windows:
+                    window.add(usage, cost, savings, timestamp, calls)
+
+    def restore(self, journal: UsageJournal) -> int:
+        """Replay *journal* into this tracker's totals and windows.
+
+        Use after a restart, before new calls are tracked. Replayed records
+        are not re-appended to the journal or sent to callbacks, and keep the
+        tag set they were tracked under. Returns the number of calls restored.
+        """
+        restored = 0
+        for entry in journal.replay():
+            tag_set = self._resolve_tags(dict(entry.tags))
+            self._record(entry.usage, entry.model, tag_set, entry.calls, entry.timestamp)
+            restored += entry.calls
+        return restored
+
+    def window_summary(self, span_s: float, now: Optional[float] = None) -> MetricsSummary:
+        """Return totals for the trailing *span_s* seconds.
+
+        *span_s* must be one of ``MetricsConfig.windows``.
+        """
+        if span_s not in self._window_spans:
+            raise BeskarError(f"no rolling window configured for {span_s}s")
+        position = self._window_spans.index(span_s)
+        now = time.time() if now is None else now
+        with self._shards_lock:
+            shards = list(self._shards)
+        counts = [0, 0, 0, 0, 0]
+        cost = savings = 0.0
+        for shard in shards:
+            with shard.lock:
+                shard_counts, shard_cost, shard_savings = shard.windows[position].totals(now)
+            for i, value in enumerate(shard_counts):
+                counts[i] += value
+            cost += shard_cost
+            savings += shard_savings
+        return _summary_from_totals(counts, cost, savings)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Flush the configured sink, if any. Returns ``False`` on timeout."""
+        if self._config and self._config.sink is not None:
+            return self._config.sink.flush(timeout)
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Flush and stop the configured sink, if any."""
+        if self._config and self._config.sink is not None:
+            self._config.sink.close(timeout)
+
+    def _merged(self) -> Dict[_SeriesKey, List[int]]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        merged: Dict[_SeriesKey, List[int]] = {}
+        for shard in shards:
+            with shard.lock:
+                snapshot = [(key, list(acc)) for key, acc in shard.series.items()]
+            for key, acc in snapshot:
+                total = merged.get(key)
+                if total is None:
+                    merged[key] = acc
+                else:
+                    for i, value in enumerate(acc):
+                        total[i] += value
+        return merged
+
     def summary(self) -> MetricsSummary:
-        denominator = self._total_input_tokens + self._total_cache_read_tokens
-        cache_hit_rate = (
-            self._total_cache_read_tokens / denominator if denominator > 0 else 0.0
-        )
-        accumulated = TokenUsage(
-            input_tokens=self._total_input_tokens,
-            output_tokens=self._total_output_tokens,
-            cache_creation_input_tokens=self._total_cache_creation_tokens,
-            cache_read_input_tokens=self._total_cache_read_tokens,
+        """Totals of request traffic; Beskar's own summarization calls are excluded.
+
+        Those are tagged with ``SUMMARIZATION_TAGS`` and reported by
+        ``summary_for_tags(SUMMARIZATION_TAGS)`` instead.
+        """
+        return _summarize_accumulators(
+            (model, acc)
+            for (model, tag_set), acc in self._merged().items()
+            if not _is_summarization(tag_set)
         )
-        return MetricsSummary(
-            total_calls=self._total_calls,
-            total_input_tokens=self._total_input_tokens,
-            total_output_tokens=self._total_output_tokens,
-            total_cache_creation_tokens=self._total_cache_creation_tokens,
-            total_cache_read_tokens=self._total_cache_read_tokens,
-            cache_hit_rate=cache_hit_rate,
-            estimated_cost_usd=estimate_cost_usd(accumulated, self._model),
-            estimated_savings_usd=estimate_savings_usd(accumulated, self._model),
+
+    def record_latency(
+        self, kind: LatencyKind, seconds: float, model: Optional[str] = None
+    ) -> None:
+        """Record one latency sample of *kind* for *model*."""
+        shard = self._shard()
+        with shard.lock:
+            hist = shard.latency.get((kind, model))
+            if hist is None:
+                hist = shard.latency[(kind, model)] = LogHistogram()
+            hist.record(int(seconds * 1_000_000))
+
+    def record_event(self, kind: str, label: str) -> None:
+        """Count one pipeline decision *label* of *kind*, e.g. a preflight action."""
+        shard = self._shard()
+        with shard.lock:
+            key = (kind, label)
+            shard.events[key] = shard.events.get(key, 0) + 1
+
+    def event_counts(self, kind: str) -> Dict[str, int]:
+        """Return ``{label: count}`` for events of *kind* across all threads."""
+        with self._shards_lock:
+            shards = list(self._shards)
+        counts: Dict[str, int] = {}
+        for shard in shards:
+            with shard.lock:
+                for (event_kind, label), n in shard.events.items():
+                    if event_kind == kind:
+                        counts[label] = counts.get(label, 0) + n
+        return counts
+
+    def record_routing(
+        self, requested: Optional[str], routed: Optional[str], usage: TokenUsage
+    ) -> None:
+        """Record a call sent to *routed* instead of *requested*, priced both ways."""
+        cost = estimate_cost_usd(usage, routed)
+        counterfactual = estimate_cost_usd(usage, requested)
+        shard = self._shard()
+        with shard.lock:
+            acc = shard.routing.get((requested, routed))
+            if acc is None:
+                acc = shard.routing[(requested, routed)] = [0.0, 0.0, 0.0]
+            acc[0] += 1
+            acc[1] += cost
+            acc[2] += counterfactual
+
+    def routing_summary(self) -> Dict[Tuple[Optional[str], Optional[str]], RoutingSummary]:
+        """Return one summary per (requested, routed) model pair."""
+        with self._shards_lock:
+            shards = list(self._shards)
+        merged: Dict[Tuple[Optional[str], Optional[str]], List[float]] = {}
+        for shard in shards:
+            with shard.lock:
+                for key, acc in shard.routing.items():
+                    total = merged.setdefault(key, [0.0, 0.0, 0.0])
+                    for i, value in enumerate(acc):
+                        total[i] += value
+        return {
+            key: RoutingSummary(
+                calls=int(calls),
+                cost_usd=cost,
+                counterfactual_cost_usd=counterfactual,
+                savings_usd=counterfactual - cost,
+            )
+            for key, (calls, cost, counterfactual) in merged.items()
+        }
+
+    def record_thinking(
+        self,
+        turn: str,
+        budget: int,
+        fixed_budget: int,
+        thinking_tokens: int,
+        model: Optional[str] = None,
+    ) -> None:
+        """Record the thinking budget applied to one call of *turn* type."""
+        saved = max(fixed_budget - budget, 0)
+        savings = saved / 1_000_000 * _resolve_pricing(model)["output_per_m_tokens"]
+        shard = self._shard()
+        with shard.lock:
+            acc = shard.thinking.get(turn)
+            if acc is None:
+                acc = shard.thinking[turn] = [0.0] * 6
+            acc[0] += 1
+            acc[1] += 1 if budget > 0 else 0
+            acc[2] += budget
+            acc[3] += fixed_budget
+            acc[4] += thinking_tokens
+            acc[5] += savings
+
+    def thinking_summary(self) -> Dict[str, ThinkingSummary]:
+        """Return one summary per turn type."""
+        with self._shards_lock:
+            shards = list(self._shards)
+        merged: Dict[str, List[float]] = {}
+        for shard in shards:
+            with shard.lock:
+                for turn, acc in shard.thinking.items():
+                    total = merged.setdefault(turn, [0.0] * 6)
+                    for i, value in enumerate(acc):
+                        total[i] += value
+        return {
+            turn: ThinkingSummary(
+                calls=int(acc[0]),
+                thinking_calls=int(acc[1]),
+                budget_tokens=int(acc[2]),
+                fixed_budget_tokens=int(acc[3]),
+                thinking_tokens=int(acc[4]),
+                budget_tokens_saved=max(int(acc[3]) - int(acc[2]), 0),
+                budget_savings_usd=acc[5],
+            )
+            for turn, acc in merged.items()
+        }
+
+    def latency_histograms(self) -> Dict[Tuple[str, Optional[str]], LogHistogram]:
+        """Return merged copies of all latency histograms, keyed by (kind, model)."""
+        with self._shards_lock:
+            shards = list(self._shards)
+        merged: Dict[Tuple[str, Optional[str]], LogHistogram] = {}
+        for shard in shards:
+            with shard.lock:
+                for key, hist in shard.latency.items():
+                    total = merged.get(key)
+                    if total is None:
+                        merged[key] = hist.copy()
+                    else:
+                        total.merge(hist)
+        return merged
+
+    def latency_summary(self) -> Dict[str, Dict[Optional[str], LatencySummary]]:
+        """Return latency percentiles as ``{kind: {model: LatencySummary}}``."""
+        result: Dict[str, Dict[Optional[str], LatencySummary]] = {}
+        for (kind, model), hist in self.latency_histograms().items():
+            result.setdefault(kind, {})[model] = summarize_latency(hist)
+        return result
+
+    def summary_by_model(self) -> Dict[Optional[str], MetricsSummary]:
+        """Return one summary per model string passed to ``track()``.
+
+        Calls tracked without a model are keyed under ``None``. Like
+        ``summary()``, this excludes summarization calls.
+        """
+        grouped: Dict[Optional[str], List[Tuple[Optional[str], List[int]]]] = {}
+        for (model, tag_set), acc in self._merged().items():
+            if not _is_summarization(tag_set):
+                grouped.setdefault(model, []).append((model, acc))
+        return {model: _summarize_accumulators(accs) for model, accs in grouped.items()}
+
+    def summary_for_tags(self, tags: Mapping[str, str]) -> MetricsSummary:
+        """Return a summary of the series whose tags include all of *tags*."""
+        wanted = set(tags.items())
+        return _summarize_accumulators(
+            (model, acc)
+            for (model, tag_set), acc in self._merged().items()
+            if wanted.issubset(tag_set)
         )
 
+    def summary_by_series(self) -> Dict[Tuple[Optional[str], TagSet], MetricsSummary]:
+        """Return one summary per (model, tags) series, as used by exporters."""
+        return {
+            key: _summarize_accumulators([(key[0], acc)])
+            for key, acc in self._merged().items()
+        }
+
 
 def create_metrics_tracker(config: Optional[MetricsConfig] = None) -> MetricsTracker:
     return MetricsTracker(config)
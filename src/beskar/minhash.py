@@ -0,0 +1,131 @@
+"""MinHash module — near-duplicate detection for repeated conversation turns."""
+from __future__ import annotations
+
+import hashlib
+import random
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from .types import BeskarError, BeskarMessage
+
+_WORD = re.compile(r"\S+")
+_PRIME = (1 << 61) - 1
+
+Sketch = Tuple[int, ...]
+
+
+def _message_text(message: BeskarMessage) -> Optional[str]:
+    # Text of a message made only of text; None if it carries any other block
+    # (tool_use, tool_result, images…), which near-duplicate removal never drops.
+    content: Any = message["content"]
+    if isinstance(content, str):
+        return content
+    parts: List[str] = []
+    for block in content:
+        if not isinstance(block, dict) or block.get("type") != "text":
+            return None
+        parts.append(str(block.get("text", "")))
+    return "\n".join(parts)
+
+
+class MinHasher:
+    """MinHash sketches of message texts, with LSH banding for candidate lookup.
+
+    A text is shingled into overlapping ``shingle_words``-word sequences and
+    sketched with ``num_perm`` hash permutations; the fraction of equal
+    sketch positions estimates the Jaccard similarity of two texts' shingle
+    sets. Sketches are split into ``bands`` bands, and texts sharing any band
+    are candidate duplicates. Texts shorter than ``min_words`` words are not
+    sketched.
+
+    Sketches are cached by text, so a turn is sketched once per conversation;
+    ``BeskarClient`` keeps one hasher per client. The cache is cleared when
+    it reaches ``max_entries``.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_words: int = 3,
+        min_words: int = 8,
+        max_entries: int = 50_000,
+        seed: int = 1,
+    ) -> None:
+        if bands <= 0 or num_perm <= 0 or num_perm % bands:
+            raise BeskarError("num_perm must be a positive multiple of bands")
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)
+        ]
+        self._bands = bands
+        self._rows = num_perm // bands
+        self._shingle_words = shingle_words
+        self._min_words = max(min_words, shingle_words)
+        self._max_entries = max_entries
+        self._sketches: Dict[str, Optional[Sketch]] = {}
+
+    def sketch(self, text: str) -> Optional[Sketch]:
+        """MinHash sketch of *text*, or ``None`` if it is too short."""
+        if text in self._sketches:
+            return self._sketches[text]
+        words = _WORD.findall(text.lower())
+        result: Optional[Sketch] = None
+        if len(words) >= self._min_words:
+            n = self._shingle_words
+            hashes = {
+                int.from_bytes(
+                    hashlib.blake2b(" ".join(words[i : i + n]).encode("utf-8"), digest_size=8)
+                    .digest(),
+                    "little",
+                )
+                & _PRIME
+                for i in range(len(words) - n + 1)
+            }
+            result = tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self._perms)
+        if len(self._sketches) >= self._max_entries:
+            self._sketches.clear()
+        self._sketches[text] = result
+        return result
+
+    def bands(self, sketch: Sketch) -> List[Tuple[int, Sketch]]:
+        """LSH band keys of *sketch*: ``(band, rows)`` pairs."""
+        rows = self._rows
+        return [(band, sketch[band * rows : (band + 1) * rows]) for band in range(self._bands)]
+
+
+def similarity(a: Sketch, b: Sketch) -> float:
+    """Estimated Jaccard similarity of the texts behind two sketches."""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def drop_near_duplicates(
+    messages: List[BeskarMessage], threshold: float, hasher: Optional[MinHasher] = None
+) -> List[BeskarMessage]:
+    """Drop text-only turns that nearly repeat a later turn of the same role.
+
+    The most recent copy of a repeated turn is kept and earlier copies whose
+    estimated similarity to it is at least *threshold* are dropped. Messages
+    with tool_use, tool_result or other non-text blocks are always kept, so
+    tool pairs stay intact. Returns a new list.
+    """
+    hasher = hasher if hasher is not None else MinHasher()
+    buckets: Dict[Tuple[str, int, Sketch], List[Sketch]] = {}
+    keep = [True] * len(messages)
+    for i in range(len(messages) - 1, -1, -1):
+        text = _message_text(messages[i])
+        if text is None:
+            continue
+        sketch = hasher.sketch(text)
+        if sketch is None:
+            continue
+        role = messages[i]["role"]
+        keys = [(role, band, rows) for band, rows in hasher.bands(sketch)]
+        if any(
+            similarity(sketch, other) >= threshold for key in keys for other in buckets.get(key, ())
+        ):
+            keep[i] = False
+            continue
+        for key in keys:
+            buckets.setdefault(key, []).append(sketch)
+    return [message for message, kept in zip(messages, keep) if kept]
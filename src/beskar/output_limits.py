@@ -0,0 +1,58 @@
+"""Output limits module — right-sizes max_tokens from observed output lengths."""
+from __future__ import annotations
+
+import math
+import threading
+from typing import Dict, Hashable, Optional
+
+from .metrics import LogHistogram
+from .types import OutputLimitConfig
+
+
+class OutputLimiter:
+    """Per-route quantile sketches of output length, used to pick ``max_tokens``.
+
+    Output-token rate limits reserve a call's ``max_tokens`` up front, so a
+    limit sized to what the route actually produces lets more calls run in
+    the same budget. Each route keeps a ``LogHistogram`` of observed output
+    tokens; once it has ``min_samples`` entries, ``limit()`` returns its
+    ``quantile`` plus ``margin``, never above the caller's ``max_tokens``.
+    A response cut short is retried with ``retry_limit()``. The table is
+    cleared when it reaches ``max_routes``.
+    """
+
+    def __init__(self, config: OutputLimitConfig, max_routes: int = 1024) -> None:
+        self.config = config
+        self._max_routes = max_routes
+        self._routes: Dict[Hashable, LogHistogram] = {}
+        self._lock = threading.Lock()
+
+    def limit(self, route: Hashable, requested: int, reserved: int = 0) -> int:
+        """``max_tokens`` to send on *route*.
+
+        The limit stays at least ``min_max_tokens`` above *reserved* tokens,
+        e.g. a thinking budget (observed output already includes thinking).
+        """
+        config = self.config
+        with self._lock:
+            hist = self._routes.get(route)
+            if hist is None or hist.count < config.min_samples:
+                return requested
+            observed = hist.percentile(config.quantile)
+        limit = max(math.ceil(observed * (1.0 + config.margin)), reserved + config.min_max_tokens)
+        return min(limit, requested)
+
+    def retry_limit(self, current: int, requested: int) -> Optional[int]:
+        """Larger ``max_tokens`` for retrying a truncated call, or ``None`` if at the ceiling."""
+        if current >= requested:
+            return None
+        return min(math.ceil(current * self.config.retry_factor), requested)
+
+    def observe(self, route: Hashable, output_tokens: int) -> None:
+        with self._lock:
+            hist = self._routes.get(route)
+            if hist is None:
+                if len(self._routes) >= self._max_routes:
+                    self._routes.clear()
+                hist = self._routes[route] = LogHistogram(max_value=2**20)
+            hist.record(output_tokens)
@@ -0,0 +1,124 @@
+"""Preflight module — fits a request into the model's context window before sending."""
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, List, Optional
+
+from .compressor import (
+    ToolTokenCache,
+    collapse_tool_chains,
+    compress_tool_results,
+    repair_dedupe_references,
+)
+from .estimator import estimate_request_tokens
+from .metrics import resolve_model
+from .pruner import find_tool_pairs
+from .types import (
+    BeskarMessage,
+    CompressorConfig,
+    PreflightAction,
+    PreflightConfig,
+    PreflightError,
+)
+
+# Input + output token limit per model.
+CONTEXT_WINDOWS: Dict[str, int] = {
+    "claude-sonnet-4-20250514": 200_000,
+    "claude-haiku-4-5-20251001": 200_000,
+    "claude-opus-4-20250514": 200_000,
+}
+
+# Used for models missing from CONTEXT_WINDOWS.
+DEFAULT_CONTEXT_WINDOW = 200_000
+
+
+def context_window(model: Optional[str], config: PreflightConfig) -> int:
+    """Context window of *model*, unless ``config.context_window`` overrides it."""
+    if config.context_window is not None:
+        return config.context_window
+    return CONTEXT_WINDOWS.get(resolve_model(model or ""), DEFAULT_CONTEXT_WINDOW)
+
+
+@dataclass
+class PreflightResult:
+    messages: List[BeskarMessage]
+    estimated_tokens: int
+    budget: int
+    actions: List[PreflightAction]
+
+
+def _prune_to_budget(
+    messages: List[BeskarMessage], budget: int, estimator: Optional[Callable[[str], int]]
+) -> List[BeskarMessage]:
+    # Drop the oldest messages until the rest fit in *budget*, never splitting
+    # a tool pair; the last message is always kept.
+    tokens = [estimate_request_tokens([m], estimator=estimator) for m in messages]
+    last = len(messages) - 1
+    total = sum(tokens)
+    cut = 0
+    while total > budget and cut < last:
+        total -= tokens[cut]
+        cut += 1
+    for use_idx, result_idx in sorted(find_tool_pairs(messages).values()):
+        if 0 <= use_idx < cut <= result_idx:
+            if result_idx >= last:
+                cut = use_idx  # the newest pair cannot be split; keep it whole
+                break
+            cut = result_idx + 1
+    return list(messages[cut:])
+
+
+def run_preflight(
+    messages: List[BeskarMessage],
+    system: Any,
+    tools: Any,
+    model: Optional[str],
+    max_tokens: int,
+    config: PreflightConfig,
+    compressor: Optional[CompressorConfig] = None,
+    estimator: Optional[Callable[[str], int]] = None,
+    token_cache: Optional[ToolTokenCache] = None,
+) -> PreflightResult:
+    """Check the request against the context window and shrink it until it fits.
+
+    Each step of ``config.escalation`` runs only while the estimate is still
+    over budget; the steps taken are listed in the result. *compressor*
+    supplies the truncation, JSON and spill settings the ``"compress"`` and
+    ``"collapse"`` steps build on. Raises ``PreflightError`` if the request
+    is still too large after every step.
+    """
+    window = context_window(model, config)
+    budget = int(window * (1.0 - config.margin)) - max_tokens
+    fixed = estimate_request_tokens([], system, tools, estimator)
+    tokens = estimate_request_tokens(messages, system, tools, estimator)
+    base = compressor or CompressorConfig()
+    actions: List[PreflightAction] = []
+    for action in config.escalation:
+        if tokens <= budget:
+            break
+        if action == "compress":
+            limit = config.tool_result_tokens
+            if base.max_tool_result_tokens is not None:
+                limit = min(limit, base.max_tool_result_tokens)
+            messages = compress_tool_results(
+                messages, replace(base, max_tool_result_tokens=limit), estimator
+            )
+        elif action == "collapse":
+            target = replace(
+                base, collapse_after_turns=0, collapse_target_tokens=max(budget - fixed, 0)
+            )
+            messages = repair_dedupe_references(
+                collapse_tool_chains(messages, target, token_cache), messages, base
+            )
+        else:
+            messages = repair_dedupe_references(
+                _prune_to_budget(messages, budget - fixed, estimator), messages, base
+            )
+        actions.append(action)
+        tokens = estimate_request_tokens(messages, system, tools, estimator)
+    if tokens > budget:
+        raise PreflightError(
+            f"request needs about {tokens} input tokens but {model} allows {budget} "
+            f"({window} context window, {max_tokens} max_tokens, {config.margin:.0%} margin)"
+        )
+    return PreflightResult(messages, tokens, budget, actions)
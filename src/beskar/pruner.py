@@ -1,9 +1,22 @@
 """Pruner module — context window management for agentic loops."""
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple
+import heapq
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
 
-from .types import BeskarMessage, PrunerConfig
+from .minhash import MinHasher, drop_near_duplicates
+from .relevance import BM25Index
+from .types import BeskarMessage, PrunerConfig, estimate_many
+
+if TYPE_CHECKING:
+    from .summarizer import BackgroundSummarizer
+
+try:  # optional: vectorized importance scoring
+    import numpy
+
+    _np: Any = numpy
+except ImportError:
+    _np = None
 
 
 def _get_content_text(message: BeskarMessage) -> str:
@@ -58,6 +71,18 @@ def find_tool_pairs(messages: List[BeskarMessage]) -> Dict[str, Tuple[int, int]]
     return {k: (v[0], v[1]) for k, v in pairs.items()}
 
 
+def pair_safe_cut(messages: List[BeskarMessage], cut: int) -> int:
+    """Move *cut* back so that ``messages[cut:]`` splits no tool call pair."""
+    # Latest calls first, so moving the cut back re-checks the earlier ones
+    for use_idx, result_idx in sorted(find_tool_pairs(messages).values(), reverse=True):
+        if use_idx < 0 or result_idx < 0:
+            continue
+        # If assistant turn is before cut and tool_result is at/after cut, shift to preserve
+        if use_idx < cut <= result_idx:
+            cut = use_idx
+    return cut
+
+
 def _sliding_window(
     messages: List[BeskarMessage], max_turns: int
 ) -> List[BeskarMessage]:
@@ -68,54 +93,140 @@ def _sliding_window(
     if cut >= len(messages):
         cut = len(messages) - 1
 
-    pairs = find_tool_pairs(messages)
-    for use_idx, result_idx in pairs.values():
-        if use_idx < 0 or result_idx < 0:
-            continue
-        # If assistant turn is before cut and tool_result is at/after cut, shift to preserve
-        if use_idx < cut <= result_idx:
-            cut = use_idx
-
-    return list(messages[cut:])
+    return list(messages[pair_safe_cut(messages, cut) :])
 
 
 def _summarize(
-    messages: List[BeskarMessage], max_turns: int
+    messages: List[BeskarMessage],
+    max_turns: int,
+    summarizer: Optional["BackgroundSummarizer"] = None,
 ) -> List[BeskarMessage]:
-    """Drop oldest turns and prepend a placeholder summary message.
+    """Drop oldest turns and prepend a summary message.
 
-    NOTE: This is a V1 stub. It does NOT call an LLM to produce a real summary.
-    The dropped turns are replaced with a static string indicating how many turns
-    were removed. Real LLM-based summarization is planned for V2.
+    With a *summarizer*, the dropped prefix is replaced by an LLM summary
+    computed ahead of time in the background; see ``BackgroundSummarizer``.
+    Pruning never waits for it: until the summary is ready (or without a
+    summarizer) the dropped turns are replaced with a static placeholder
+    stating how many turns were removed.
     """
+    if summarizer is not None:
+        summarizer.prefetch(messages, max_turns)
     if max_turns >= len(messages):
         return list(messages)
 
-    retained = list(messages[len(messages) - max_turns :])
+    if summarizer is not None:
+        found = summarizer.ready(messages, max_turns)
+        if found is not None:
+            cut, text = found
+            summary: BeskarMessage = {
+                "role": "user",
+                "content": f"[Summary of the previous {cut} turns]\n{text}",
+            }
+            return [summary] + list(messages[cut:])
+
+    retained = list(messages[pair_safe_cut(messages, len(messages) - max_turns) :])
     n_summarized = len(messages) - len(retained)
-    summary: BeskarMessage = {
+    if n_summarized == 0:
+        return retained
+    summary = {
         "role": "user",
         "content": f"[Previous context: {n_summarized} turns summarized]",
     }
     return [summary] + retained
 
 
-def _score_message(message: BeskarMessage, index: int, total: int) -> float:
-    recency = (index / total) * 0.5 if total > 0 else 0.0
-    tool_bonus = 0.3 if _has_tool_use(message) else 0.0
-    text = _get_content_text(message)
-    length_score = min(len(text) / 5000, 0.2)
-    return recency + tool_bonus + length_score
+def _message_scores(
+    messages: List[BeskarMessage],
+    texts: List[str],
+    tokens: Optional[Sequence[int]],
+    relevance: Optional[List[float]],
+) -> Sequence[float]:
+    # score = recency (≤ 0.5) + tool-use bonus (0.3) + length (≤ 0.2) + relevance,
+    # computed column-wise; NumPy and the fallback produce identical floats.
+    total = len(messages)
+    tool = [_has_tool_use(m) for m in messages]
+    if tokens is None:
+        lengths: Sequence[int] = [len(t) for t in texts]
+        scale = 5000
+    else:
+        # 1250 tokens ≈ 5000 chars at the default 4 chars/token
+        lengths, scale = tokens, 1250
+    if _np is not None:
+        scores = (_np.arange(total) / total) * 0.5
+        scores = scores + _np.where(_np.array(tool, dtype=bool), 0.3, 0.0)
+        scores = scores + _np.minimum(_np.array(lengths, dtype=float) / scale, 0.2)
+        if relevance is not None:
+            scores = scores + _np.array(relevance, dtype=float)
+        return scores  # type: ignore[no-any-return]
+    result = [
+        (i / total) * 0.5 + (0.3 if tool[i] else 0.0) + min(lengths[i] / scale, 0.2)
+        for i in range(total)
+    ]
+    if relevance is not None:
+        result = [score + bonus for score, bonus in zip(result, relevance)]
+    return result
+
+
+def _relevance_scores(
+    texts: List[str], messages: List[BeskarMessage], index: BM25Index, weight: float
+) -> List[float]:
+    # BM25 relevance of each message to the latest user text, scaled to [0, weight].
+    doc_ids = index.add_all(texts)
+    query_idx = next(
+        (i for i in range(len(messages) - 1, -1, -1)
+         if messages[i]["role"] == "user" and texts[i]),
+        -1,
+    )
+    if query_idx < 0:
+        return [0.0] * len(texts)
+    raw = index.scores(texts[query_idx])
+    scores = [raw.get(doc_id, 0.0) for doc_id in doc_ids]
+    scores[query_idx] = 0.0  # the query matches itself best; scale by the rest
+    top = max(scores)
+    result = [weight * score / top for score in scores] if top > 0 else [0.0] * len(texts)
+    result[query_idx] = weight
+    return result
+
+
+def _lowest_units(unit_scores: Sequence[float], k: int) -> List[int]:
+    # The first k units in stable ascending order of score (ties by position),
+    # found by partial selection rather than a full sort.
+    n = len(unit_scores)
+    if k <= 0:
+        return []
+    if _np is not None:
+        scores = _np.asarray(unit_scores, dtype=float)
+        if k < n:
+            threshold = _np.partition(scores, k - 1)[k - 1]
+            below = _np.flatnonzero(scores < threshold)
+            ties = _np.flatnonzero(scores == threshold)[: k - len(below)]
+            chosen = _np.concatenate((below, ties))
+        else:
+            chosen = _np.arange(n)
+        order = chosen[_np.lexsort((chosen, scores[chosen]))]
+        return [int(u) for u in order]
+    return heapq.nsmallest(k, range(n), key=lambda u: (unit_scores[u], u))
 
 
 def _importance_prune(
-    messages: List[BeskarMessage], max_turns: int
+    messages: List[BeskarMessage],
+    max_turns: int,
+    estimator: Optional[Callable[[str], int]] = None,
+    relevance_index: Optional[BM25Index] = None,
+    relevance_weight: float = 0.0,
 ) -> List[BeskarMessage]:
     if max_turns >= len(messages):
         return list(messages)
 
     pairs = find_tool_pairs(messages)
     total = len(messages)
+    texts = [_get_content_text(m) for m in messages]
+    tokens = estimate_many(texts, estimator) if estimator is not None else None
+    relevance: Optional[List[float]] = None
+    if relevance_weight > 0:
+        index = relevance_index if relevance_index is not None else BM25Index()
+        relevance = _relevance_scores(texts, messages, index, relevance_weight)
+    scores = _message_scores(messages, texts, tokens, relevance)
 
     # Map each index to its pair id
     index_to_pair: Dict[int, str] = {}
@@ -125,59 +236,86 @@ def _importance_prune(
         if result_idx >= 0:
             index_to_pair[result_idx] = pid
 
-    # Build logical units (standalone or paired)
-    processed: set[int] = set()
-    units: List[Dict[str, Any]] = []
-
-    for i in range(len(messages)):
-        if i in processed:
+    # Logical units (standalone or paired) as parallel columns: first and
+    # second message index (second == first for standalone messages).
+    processed = bytearray(total)
+    firsts: List[int] = []
+    seconds: List[int] = []
+    for i in range(total):
+        if processed[i]:
             continue
         pair_id = index_to_pair.get(i)
-        if pair_id is not None:
-            use_idx, result_idx = pairs[pair_id]
-            pair_indices = [idx for idx in (use_idx, result_idx) if idx >= 0]
-            min_score = min(
-                _score_message(messages[idx], idx, total) for idx in pair_indices
-            )
-            units.append({"indices": pair_indices, "score": min_score})
-            processed.update(pair_indices)
-        else:
-            score = _score_message(messages[i], i, total)
-            units.append({"indices": [i], "score": score})
-            processed.add(i)
-
-    units.sort(key=lambda u: u["score"])
-
-    dropped: set[int] = set()
-    remaining = len(messages)
-
-    for unit in units:
+        if pair_id is None:
+            firsts.append(i)
+            seconds.append(i)
+            processed[i] = 1
+            continue
+        use_idx, result_idx = pairs[pair_id]
+        if use_idx < 0 or result_idx < 0:
+            use_idx = result_idx = max(use_idx, result_idx)
+        firsts.append(use_idx)
+        seconds.append(result_idx)
+        processed[use_idx] = processed[result_idx] = 1
+
+    # A paired unit scores as its least important member.
+    if _np is not None:
+        columns: Any = scores
+        unit_scores: Sequence[float] = _np.minimum(columns[firsts], columns[seconds])
+    else:
+        unit_scores = [min(scores[a], scores[b]) for a, b in zip(firsts, seconds)]
+
+    # Each unit drops at least one message, so at most total - max_turns go.
+    dropped: Set[int] = set()
+    remaining = total
+    for unit in _lowest_units(unit_scores, total - max_turns):
         if remaining <= max_turns:
             break
-        if remaining - len(unit["indices"]) < 1:
+        first, second = firsts[unit], seconds[unit]
+        size = 1 if first == second else 2
+        if remaining - size < 1:
             break
-        dropped.update(unit["indices"])
-        remaining -= len(unit["indices"])
+        dropped.add(first)
+        dropped.add(second)
+        remaining -= size
 
     return [msg for i, msg in enumerate(messages) if i not in dropped]
 
 
 def prune_messages(
-    messages: List[BeskarMessage], config: PrunerConfig
+    messages: List[BeskarMessage],
+    config: PrunerConfig,
+    estimator: Optional[Callable[[str], int]] = None,
+    summarizer: Optional["BackgroundSummarizer"] = None,
+    relevance_index: Optional[BM25Index] = None,
+    minhasher: Optional[MinHasher] = None,
 ) -> List[BeskarMessage]:
     """Prune the messages array to fit within the configured turn bound.
 
     Returns a new list — never mutates the input.
     Returns a copy if length is 0 or 1 (nothing to prune).
+
+    *estimator* switches the importance strategy's length signal from
+    characters to estimated tokens; all messages are counted in one batch.
+    *summarizer* gives the summarize strategy real LLM summaries.
+    *relevance_index* is the per-conversation BM25 index the importance
+    strategy uses when ``config.relevance_weight`` is set; without one, a
+    throwaway index is built for the call.
+    *minhasher* caches the sketches used when
+    ``config.near_duplicate_threshold`` is set.
     """
     if len(messages) <= 1:
         return list(messages)
 
+    if config.near_duplicate_threshold is not None:
+        messages = drop_near_duplicates(messages, config.near_duplicate_threshold, minhasher)
+
     max_turns = config.max_turns if config.max_turns is not None else len(messages)
 
     if config.strategy == "sliding-window":
         return _sliding_window(messages, max_turns)
     elif config.strategy == "summarize":
-        return _summarize(messages, max_turns)
+        return _summarize(messages, max_turns, summarizer)
     else:  # importance
-        return _importance_prune(messages, max_turns)
+        return _importance_prune(
+            messages, max_turns, estimator, relevance_index, config.relevance_weight
+        )
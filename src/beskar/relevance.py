@@ -0,0 +1,105 @@
+"""Relevance module — incremental BM25 index for relevance-scored pruning."""
+from __future__ import annotations
+
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Sequence
+
+_TERM = re.compile(r"[a-z0-9_]{2,}")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do for from has have how i if in is it its "
+    "me my no not of on or our so that the their them then there these this to "
+    "was we what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word terms of *text*, without stopwords and one-letter terms."""
+    return [t for t in _TERM.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index that grows one document at a time.
+
+    ``add()`` indexes a text once and returns its document id; adding a text
+    already present returns the existing id, so re-sending a conversation
+    only indexes the messages that are new. Adding a document costs
+    O(its terms), and ``scores()`` touches only the postings of the query's
+    terms.
+
+    Keep one index per conversation (``BeskarClient`` keeps one per client)
+    so the pruner can reuse it across requests. Once ``max_documents`` texts
+    are indexed, the index starts over empty before the next ``add_all()``
+    batch that would overflow it. Document ids are never reused, so ids
+    handed out before a reset can no longer match another text; they just
+    stop scoring.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, max_documents: int = 50000) -> None:
+        self.k1 = k1
+        self.b = b
+        self._max_documents = max_documents
+        self._ids: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._lengths: Dict[int, int] = {}
+        self._total_length = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, text: str) -> int:
+        """Index *text* if it is new and return its document id."""
+        return self.add_all([text])[0]
+
+    def add_all(self, texts: Sequence[str]) -> List[int]:
+        """Index each new text of *texts* and return their document ids, in order.
+
+        The batch is indexed under one lock, and a reset for ``max_documents``
+        happens only before it, so every returned id stays valid together.
+        """
+        with self._lock:
+            new = {text for text in texts if text not in self._ids}
+            if self._lengths and len(self._lengths) + len(new) > self._max_documents:
+                self._ids.clear()
+                self._postings.clear()
+                self._lengths.clear()
+                self._total_length = 0
+            return [self._add(text) for text in texts]
+
+    def _add(self, text: str) -> int:
+        doc_id = self._ids.get(text)
+        if doc_id is not None:
+            return doc_id
+        terms = tokenize(text)
+        doc_id = self._next_id
+        self._next_id += 1
+        for term, count in Counter(terms).items():
+            self._postings.setdefault(term, {})[doc_id] = count
+        self._lengths[doc_id] = len(terms)
+        self._total_length += len(terms)
+        self._ids[text] = doc_id
+        return doc_id
+
+    def scores(self, query: str) -> Dict[int, float]:
+        """BM25 score of every document sharing a term with *query*."""
+        with self._lock:
+            n_docs = len(self._lengths)
+            if n_docs == 0 or self._total_length == 0:
+                return {}
+            avg_length = self._total_length / n_docs
+            k1, b = self.k1, self.b
+            result: Dict[int, float] = {}
+            for term in set(tokenize(query)):
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                df = len(posting)
+                idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+                for doc_id, tf in posting.items():
+                    norm = k1 * (1.0 - b + b * self._lengths[doc_id] / avg_length)
+                    result[doc_id] = result.get(doc_id, 0.0) + idf * tf * (k1 + 1.0) / (tf + norm)
+            return result
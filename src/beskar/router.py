@@ -0,0 +1,114 @@
+"""Router module — sends each request to the cheapest adequate model."""
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from .metrics import resolve_model
+from .types import BeskarMessage, RoutingConfig
+
+# Demand levels per signal: 0 (light), 1 (medium), 2 (heavy).
+_LEVELS = 3
+
+
+def tool_chain_depth(messages: List[BeskarMessage]) -> int:
+    """Number of tool-calling assistant turns in the run ending the conversation."""
+    depth = 0
+    for msg in reversed(messages):
+        content: Any = msg.get("content")
+        if isinstance(content, str):
+            break
+        types = {b.get("type") for b in content if isinstance(b, dict)}
+        if "tool_use" in types:
+            depth += 1
+        elif "tool_result" not in types:
+            break
+    return depth
+
+
+def _level(value: int, medium: int, large: int) -> int:
+    return 2 if value >= large else 1 if value >= medium else 0
+
+
+class Router:
+    """Classifies requests from cheap signals through a precomputed decision table.
+
+    Each signal (estimated input tokens, tool-chain depth, ``max_tokens``) is
+    bucketed into a light, medium or heavy level by the ``RoutingConfig``
+    thresholds, and a system-prompt keyword match counts as heavy. The table
+    maps every combination of levels to a model index once, at construction,
+    so ``route()`` is a few comparisons and one tuple lookup. Keyword matches
+    are cached per system prompt.
+    """
+
+    def __init__(self, config: RoutingConfig, max_system_prompts: int = 256) -> None:
+        self.config = config
+        self._models = tuple(config.models)
+        self._positions = {resolve_model(model): i for i, model in enumerate(self._models)}
+        self._keywords = (
+            re.compile("|".join(re.escape(k) for k in config.escalate_keywords), re.IGNORECASE)
+            if config.escalate_keywords
+            else None
+        )
+        self._max_system_prompts = max_system_prompts
+        self._system_heavy: Dict[str, bool] = {}
+        top = len(self._models) - 1
+        # Index: ((size * 3 + depth) * 3 + output) * 2 + keyword. The heaviest
+        # signal decides; levels spread evenly over the configured models.
+        table: List[int] = []
+        for size in range(_LEVELS):
+            for depth in range(_LEVELS):
+                for output in range(_LEVELS):
+                    for keyword in (0, 1):
+                        demand = 2 if keyword else max(size, depth, output)
+                        table.append((demand * top + 1) // 2)
+        self._table: Tuple[int, ...] = tuple(table)
+
+    def _keyword_level(self, system: Any) -> int:
+        if self._keywords is None or not system:
+            return 0
+        if not isinstance(system, str):
+            system = "\n".join(
+                str(b.get("text", "")) for b in system if isinstance(b, dict)
+            )
+        heavy = self._system_heavy.get(system)
+        if heavy is None:
+            heavy = self._keywords.search(system) is not None
+            if len(self._system_heavy) >= self._max_system_prompts:
+                self._system_heavy.clear()
+            self._system_heavy[system] = heavy
+        return 1 if heavy else 0
+
+    def classify(self, input_tokens: int, tool_depth: int, max_tokens: int, system: Any) -> str:
+        """Model the signals call for, before capping at the requested model."""
+        config = self.config
+        index = (
+            (
+                _level(input_tokens, config.medium_input_tokens, config.large_input_tokens) * 3
+                + _level(tool_depth, config.medium_tool_depth, config.deep_tool_depth)
+            )
+            * 3
+            + _level(max_tokens, config.medium_max_tokens, config.large_max_tokens)
+        ) * 2 + self._keyword_level(system)
+        return self._models[self._table[index]]
+
+    def route(
+        self,
+        requested: Optional[str],
+        input_tokens: int,
+        tool_depth: int,
+        max_tokens: int,
+        system: Any,
+    ) -> Optional[str]:
+        """Model to send the request to.
+
+        Routing only ever moves down: a request is never sent to a model
+        listed after the requested one, and a requested model missing from
+        ``RoutingConfig.models`` is used unchanged. Aliases and canonical
+        names of the same model match.
+        """
+        ceiling = self._positions.get(resolve_model(requested or ""))
+        if ceiling is None:
+            return requested
+        chosen = self.classify(input_tokens, tool_depth, max_tokens, system)
+        return chosen if self._positions[resolve_model(chosen)] < ceiling else requested
@@ -0,0 +1,173 @@
+"""Sink module — batched, background delivery of TokenUsage records."""
+from __future__ import annotations
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Callable, List, Optional, Union
+
+from .types import BeskarError, SinkFullPolicy, TokenUsage
+
+logger = logging.getLogger("beskar")
+
+_STOP = object()
+
+
+class BatchingUsageSink:
+    """Queue usage records and hand them to *handler* in batches off-thread.
+
+    ``submit()`` only enqueues, so a slow handler (e.g. a database write) never
+    adds latency to ``messages.create()``. A background thread delivers a batch
+    once ``max_batch_size`` records are queued or ``max_latency_s`` has passed
+    since the first record of the batch, whichever comes first.
+
+    When the queue is full, ``full_policy="drop"`` discards the record and
+    increments ``dropped``; ``"block"`` waits up to ``block_timeout_s`` for
+    space (forever if ``None``) and then drops. Pending records are flushed by
+    ``close()``, which is also registered with ``atexit``; it gives up after
+    its timeout even if a stalled handler keeps the queue full, so a stuck
+    destination cannot hang interpreter shutdown.
+
+    Handler exceptions are logged to the ``beskar`` logger and counted in
+    ``errors``; they never stop the flusher.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[TokenUsage]], None],
+        max_batch_size: int = 100,
+        max_latency_s: float = 1.0,
+        max_queue_size: int = 10_000,
+        full_policy: SinkFullPolicy = "drop",
+        block_timeout_s: Optional[float] = None,
+    ) -> None:
+        if max_batch_size < 1:
+            raise BeskarError("max_batch_size must be at least 1")
+        self._handler = handler
+        self._max_batch_size = max_batch_size
+        self._max_latency_s = max_latency_s
+        self._full_policy = full_policy
+        self._block_timeout_s = block_timeout_s
+        self._queue: "queue.Queue[Union[TokenUsage, threading.Event, object]]" = queue.Queue(
+            maxsize=max_queue_size
+        )
+        self._closed = False
+        # Held from the closed check through the enqueue, so close() cannot
+        # stop the flusher between them and strand a record.
+        self._submit_lock = threading.Lock()
+        self._dropped_lock = threading.Lock()
+        self.dropped = 0
+        self.errors = 0
+        self._thread = threading.Thread(
+            target=self._run, name="beskar-usage-sink", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, usage: TokenUsage) -> None:
+        with self._submit_lock:
+            if self._closed:
+                self._count_dropped()
+                return
+            try:
+                if self._full_policy == "block":
+                    self._queue.put(usage, timeout=self._block_timeout_s)
+                else:
+                    self._queue.put_nowait(usage)
+            except queue.Full:
+                self._count_dropped()
+
+    def _count_dropped(self) -> None:
+        with self._dropped_lock:
+            self.dropped += 1
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Deliver everything queued so far. Returns ``False`` on timeout."""
+        if self._closed or not self._thread.is_alive():
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(self._remaining(deadline))
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Flush pending records and stop the background thread. Idempotent.
+
+        Returns after *timeout* seconds even if records are still queued.
+        """
+        if self._closed:
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # A submit blocked on a full queue holds the lock; past the timeout,
+        # close anyway and leave the flusher running to deliver its record.
+        locked = self._submit_lock.acquire(timeout=-1 if timeout is None else timeout)
+        self._closed = True
+        if locked:
+            self._submit_lock.release()
+        atexit.unregister(self.close)
+        if not locked:
+            self._warn_undelivered()
+            return
+        try:
+            self._queue.put(_STOP, timeout=self._remaining(deadline))
+        except queue.Full:
+            self._warn_undelivered()
+            return
+        self._thread.join(self._remaining(deadline))
+
+    @staticmethod
+    def _remaining(deadline: Optional[float]) -> Optional[float]:
+        return None if deadline is None else max(deadline - time.monotonic(), 0.0)
+
+    def _warn_undelivered(self) -> None:
+        logger.warning(
+            "beskar usage sink closed with %d records undelivered", self._queue.qsize()
+        )
+
+    def __enter__(self) -> "BatchingUsageSink":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def _deliver(self, batch: List[TokenUsage]) -> None:
+        if not batch:
+            return
+        try:
+            self._handler(batch)
+        except Exception:
+            self.errors += 1
+            logger.exception("beskar usage sink handler failed")
+
+    def _run(self) -> None:
+        batch: List[TokenUsage] = []
+        deadline: Optional[float] = None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._deliver(batch)
+                batch, deadline = [], None
+                continue
+
+            if isinstance(item, TokenUsage):
+                if not batch:
+                    deadline = time.monotonic() + self._max_latency_s
+                batch.append(item)
+                if len(batch) >= self._max_batch_size:
+                    self._deliver(batch)
+                    batch, deadline = [], None
+                continue
+
+            self._deliver(batch)
+            batch, deadline = [], None
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is _STOP:
+                return
@@ -0,0 +1,149 @@
+"""Spill module — keeps tool results the compressor discards, for on-demand recall."""
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+RECALL_TOOL_NAME = "beskar_recall"
+
+RECALL_TOOL: Dict[str, Any] = {
+    "name": RECALL_TOOL_NAME,
+    "description": (
+        "Retrieve the full, original result of an earlier tool call whose output "
+        "was truncated or collapsed to save context. Use it instead of running "
+        "the original tool again."
+    ),
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "tool_use_id": {
+                "type": "string",
+                "description": "The tool_use_id named in the truncation marker.",
+            }
+        },
+        "required": ["tool_use_id"],
+    },
+}
+
+_INDEX_FILE = "index"
+
+
+def spill_marker(tool_use_id: str) -> str:
+    """Context marker left where a spilled payload was cut."""
+    return f"[Full result stored — call {RECALL_TOOL_NAME} with tool_use_id {tool_use_id}]"
+
+
+def with_recall_tool(tools: Optional[List[Any]]) -> List[Any]:
+    """Return *tools* with the recall tool appended, unless it is already present."""
+    tools = list(tools or [])
+    if not any(isinstance(t, dict) and t.get("name") == RECALL_TOOL_NAME for t in tools):
+        tools.append(RECALL_TOOL)
+    return tools
+
+
+class SpillStore:
+    """Original tool result contents, keyed by ``tool_use_id``.
+
+    Recent payloads are held in an in-memory LRU bounded by
+    ``max_memory_bytes``. With a ``directory``, every payload is also written
+    through to a content-addressed store on disk (identical payloads share one
+    file) and read back with ``mmap``, so entries survive LRU eviction and
+    restarts. Without one, evicted payloads are gone.
+
+    Set it as ``CompressorConfig.spill``: the compressor stores what it
+    truncates or collapses and leaves a marker naming the ``tool_use_id``,
+    and ``BeskarClient`` adds ``RECALL_TOOL`` to the request's tools. Answer
+    the model's recall calls with ``recall()``.
+    """
+
+    def __init__(
+        self, directory: Optional[str] = None, max_memory_bytes: int = 16 * 1024 * 1024
+    ) -> None:
+        self.directory = directory
+        self._max_memory_bytes = max_memory_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._index: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        if directory is not None:
+            os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+            index_path = os.path.join(directory, _INDEX_FILE)
+            if os.path.exists(index_path):
+                with open(index_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        tool_use_id, _, digest = line.rstrip("\n").rpartition("\t")
+                        if tool_use_id and digest:
+                            self._index[tool_use_id] = digest
+
+    def __contains__(self, tool_use_id: object) -> bool:
+        with self._lock:
+            return tool_use_id in self._memory or tool_use_id in self._index
+
+    def _object_path(self, digest: str) -> str:
+        assert self.directory is not None
+        return os.path.join(self.directory, "objects", digest[:2], digest)
+
+    def _remember(self, tool_use_id: str, data: bytes) -> None:
+        self._memory[tool_use_id] = data
+        self._memory.move_to_end(tool_use_id)
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self._max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def put(self, tool_use_id: str, content: Any) -> None:
+        """Store *content* for *tool_use_id*. A no-op if the id is already stored."""
+        with self._lock:
+            if tool_use_id in self._memory or tool_use_id in self._index:
+                return
+            data = json.dumps(content, ensure_ascii=False).encode("utf-8")
+            if self.directory is not None:
+                digest = hashlib.blake2b(data, digest_size=20).hexdigest()
+                path = self._object_path(digest)
+                if not os.path.exists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    tmp_path = f"{path}.{os.getpid()}.tmp"
+                    with open(tmp_path, "wb") as f:
+                        f.write(data)
+                    os.replace(tmp_path, path)
+                with open(os.path.join(self.directory, _INDEX_FILE), "a", encoding="utf-8") as f:
+                    f.write(f"{tool_use_id}\t{digest}\n")
+                self._index[tool_use_id] = digest
+            self._remember(tool_use_id, data)
+
+    def get(self, tool_use_id: str) -> Optional[Any]:
+        """Return the stored content for *tool_use_id*, or ``None``."""
+        with self._lock:
+            data = self._memory.get(tool_use_id)
+            if data is not None:
+                self._memory.move_to_end(tool_use_id)
+            else:
+                digest = self._index.get(tool_use_id)
+                if digest is None:
+                    return None
+                try:
+                    with open(self._object_path(digest), "rb") as f:
+                        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                            data = mapped[:]
+                except (OSError, ValueError):
+                    return None
+                self._remember(tool_use_id, data)
+        return json.loads(data.decode("utf-8"))
+
+    def recall(self, tool_use: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer a ``beskar_recall`` ``tool_use`` block with a ``tool_result`` block."""
+        target = str((tool_use.get("input") or {}).get("tool_use_id", ""))
+        content = self.get(target)
+        if content is None:
+            return {
+                "type": "tool_result",
+                "tool_use_id": tool_use.get("id"),
+                "content": f"No stored result for tool_use_id {target}",
+                "is_error": True,
+            }
+        return {"type": "tool_result", "tool_use_id": tool_use.get("id"), "content": content}
@@ -0,0 +1,277 @@
+"""Streaming module — pass-through event streams that meter usage as it arrives."""
+from __future__ import annotations
+
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+import anthropic
+
+from .types import estimate_tokens
+
+
+class StreamUsage:
+    """Usage and timing gathered from a message stream's events as they pass.
+
+    ``message_start`` carries input and cache tokens and ``message_delta`` the
+    cumulative output tokens and stop reason; the first content delta marks
+    time to first token. Visible text is kept only to estimate thinking
+    tokens once the stream ends — events themselves are never held back.
+    """
+
+    def __init__(self) -> None:
+        self.first_token_at: Optional[float] = None
+        self.stop_reason: Optional[str] = None
+        self._start: Optional[anthropic.types.Usage] = None
+        self._delta: Optional[anthropic.types.MessageDeltaUsage] = None
+        self._thought = False
+        self._visible: Dict[int, List[str]] = {}
+
+    def observe(self, event: Any) -> None:
+        kind = getattr(event, "type", None)
+        if kind == "message_start":
+            self._start = event.message.usage
+        elif kind == "message_delta":
+            self._delta = event.usage
+            self.stop_reason = event.delta.stop_reason
+        elif kind == "content_block_start":
+            if event.content_block.type in ("thinking", "redacted_thinking"):
+                self._thought = True
+        elif kind == "content_block_delta":
+            if self.first_token_at is None:
+                self.first_token_at = time.perf_counter()
+            delta = event.delta
+            if delta.type == "text_delta":
+                self._visible.setdefault(event.index, []).append(delta.text)
+            elif delta.type == "input_json_delta":
+                self._visible.setdefault(event.index, []).append(delta.partial_json)
+
+    @property
+    def complete(self) -> bool:
+        """Whether the stream reached its final ``message_delta``."""
+        return self.stop_reason is not None
+
+    @property
+    def usage(self) -> Optional[anthropic.types.Usage]:
+        """Usage reported so far, or ``None`` before ``message_start``."""
+        start = self._start
+        if start is None:
+            return None
+        delta = self._delta
+        if delta is None:
+            return start
+        return anthropic.types.Usage(
+            input_tokens=delta.input_tokens if delta.input_tokens is not None else start.input_tokens,
+            output_tokens=delta.output_tokens,
+            cache_creation_input_tokens=(
+                delta.cache_creation_input_tokens
+                if delta.cache_creation_input_tokens is not None
+                else start.cache_creation_input_tokens
+            ),
+            cache_read_input_tokens=(
+                delta.cache_read_input_tokens
+                if delta.cache_read_input_tokens is not None
+                else start.cache_read_input_tokens
+            ),
+        )
+
+    def thinking_tokens(self, estimator: Optional[Callable[[str], int]] = None) -> int:
+        """Estimated thinking tokens, as ``thinking.thinking_tokens`` does for a response."""
+        usage = self.usage
+        if usage is None or not self._thought:
+            return 0
+        estimate = estimator or estimate_tokens
+        visible = sum(estimate("".join(parts)) for parts in self._visible.values())
+        return max(usage.output_tokens - visible, 0)
+
+
+class MeteredStream:
+    """Iterates an SDK event stream unchanged, feeding each event to ``StreamUsage``.
+
+    *on_done* is called once with the gathered usage when the stream is
+    exhausted or closed, including on leaving a ``with`` block early. Other
+    attributes (``response``, ``request_id``…) come from the wrapped stream.
+    """
+
+    def __init__(self, stream: Any, on_done: Callable[[StreamUsage], None]) -> None:
+        self._stream = stream
+        self._events: Iterator[Any] = iter(stream)
+        self._on_done: Optional[Callable[[StreamUsage], None]] = on_done
+        self.usage = StreamUsage()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+    def __iter__(self) -> Iterator[Any]:
+        return self
+
+    def __next__(self) -> Any:
+        try:
+            event = next(self._events)
+        except StopIteration:
+            self._finish()
+            raise
+        self.usage.observe(event)
+        return event
+
+    def __enter__(self) -> MeteredStream:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._finish()
+
+    def _finish(self) -> None:
+        on_done, self._on_done = self._on_done, None
+        if on_done is not None:
+            on_done(self.usage)
+
+
+class MeteredMessageStream(MeteredStream):
+    """``anthropic.lib.streaming.MessageStream`` whose helpers read events through the meter."""
+
+    @property
+    def text_stream(self) -> Iterator[str]:
+        return self._text()
+
+    def _text(self) -> Iterator[str]:
+        for event in self:
+            if event.type == "text":
+                yield event.text
+
+    def until_done(self) -> None:
+        for _ in self:
+            pass
+
+    def get_final_message(self) -> anthropic.types.Message:
+        self.until_done()
+        message: anthropic.types.Message = self._stream.get_final_message()
+        return message
+
+    def get_final_text(self) -> str:
+        self.until_done()
+        text: str = self._stream.get_final_text()
+        return text
+
+
+class MeteredStreamManager:
+    """Context manager around the SDK's ``MessageStreamManager``.
+
+    The request is sent on entry, as with the SDK; *on_done* receives the
+    time it was sent and the stream's usage.
+    """
+
+    def __init__(self, manager: Any, on_done: Callable[[float, StreamUsage], None]) -> None:
+        self._manager = manager
+        self._on_done = on_done
+        self._stream: Optional[MeteredMessageStream] = None
+
+    def __enter__(self) -> MeteredMessageStream:
+        sent = time.perf_counter()
+        stream = self._manager.__enter__()
+        self._stream = MeteredMessageStream(stream, lambda usage: self._on_done(sent, usage))
+        return self._stream
+
+    def __exit__(self, *exc: Any) -> None:
+        try:
+            self._manager.__exit__(*exc)
+        finally:
+            if self._stream is not None:
+                self._stream._finish()
+
+
+class AsyncMeteredStream:
+    """Async counterpart of ``MeteredStream``."""
+
+    def __init__(self, stream: Any, on_done: Callable[[StreamUsage], None]) -> None:
+        self._stream = stream
+        self._events: AsyncIterator[Any] = stream.__aiter__()
+        self._on_done: Optional[Callable[[StreamUsage], None]] = on_done
+        self.usage = StreamUsage()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+    def __aiter__(self) -> AsyncIterator[Any]:
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            event = await self._events.__anext__()
+        except StopAsyncIteration:
+            self._finish()
+            raise
+        self.usage.observe(event)
+        return event
+
+    async def __aenter__(self) -> AsyncMeteredStream:
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        try:
+            await self._stream.close()
+        finally:
+            self._finish()
+
+    def _finish(self) -> None:
+        on_done, self._on_done = self._on_done, None
+        if on_done is not None:
+            on_done(self.usage)
+
+
+class AsyncMeteredMessageStream(AsyncMeteredStream):
+    """Async counterpart of ``MeteredMessageStream``."""
+
+    @property
+    def text_stream(self) -> AsyncIterator[str]:
+        return self._text()
+
+    async def _text(self) -> AsyncIterator[str]:
+        async for event in self:
+            if event.type == "text":
+                yield event.text
+
+    async def until_done(self) -> None:
+        async for _ in self:
+            pass
+
+    async def get_final_message(self) -> anthropic.types.Message:
+        await self.until_done()
+        message: anthropic.types.Message = await self._stream.get_final_message()
+        return message
+
+    async def get_final_text(self) -> str:
+        await self.until_done()
+        text: str = await self._stream.get_final_text()
+        return text
+
+
+class AsyncMeteredStreamManager:
+    """Async counterpart of ``MeteredStreamManager``."""
+
+    def __init__(self, manager: Any, on_done: Callable[[float, StreamUsage], None]) -> None:
+        self._manager = manager
+        self._on_done = on_done
+        self._stream: Optional[AsyncMeteredMessageStream] = None
+
+    async def __aenter__(self) -> AsyncMeteredMessageStream:
+        sent = time.perf_counter()
+        stream = await self._manager.__aenter__()
+        self._stream = AsyncMeteredMessageStream(
+            stream, lambda usage: self._on_done(sent, usage)
+        )
+        return self._stream
+
+    async def __aexit__(self, *exc: Any) -> None:
+        try:
+            await self._manager.__aexit__(*exc)
+        finally:
+            if self._stream is not None:
+                self._stream._finish()
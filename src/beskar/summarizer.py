@@ -0,0 +1,275 @@
+"""Summarizer module — LLM summaries of pruned history, computed ahead of time."""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+
+from .pruner import pair_safe_cut
+from .types import BeskarMessage
+
+logger = logging.getLogger("beskar")
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You compress the earlier part of an agent conversation so it can be dropped "
+    "from context. Summarize the transcript below: the task, decisions made, facts "
+    "and identifiers discovered, tool calls and their key results, and open "
+    "questions. Be concise and specific; omit pleasantries."
+)
+
+MERGE_SYSTEM_PROMPT = (
+    "You merge consecutive summaries of an agent conversation, oldest first, into "
+    "one summary. Keep every fact, identifier, decision and open question that "
+    "still matters; drop repetition. Be concise and specific."
+)
+
+
+def render_transcript(messages: List[BeskarMessage], max_block_chars: int = 2000) -> str:
+    """Render *messages* as plain text for a summarization prompt."""
+    lines: List[str] = []
+    for msg in messages:
+        role = msg.get("role", "user")
+        content: Any = msg.get("content", "")
+        if isinstance(content, str):
+            lines.append(f"{role}: {content[:max_block_chars]}")
+            continue
+        for block in content:
+            if not isinstance(block, dict):
+                continue
+            block_type = block.get("type")
+            if block_type == "text":
+                lines.append(f"{role}: {str(block.get('text', ''))[:max_block_chars]}")
+            elif block_type == "tool_use":
+                args = json.dumps(block.get("input", {}), default=str)[:max_block_chars]
+                lines.append(f"{role} called {block.get('name')}({args})")
+            elif block_type == "tool_result":
+                result: Any = block.get("content", "")
+                if not isinstance(result, str):
+                    result = "".join(
+                        b.get("text", "")
+                        for b in result
+                        if isinstance(b, dict) and b.get("type") == "text"
+                    )
+                lines.append(f"tool result: {result[:max_block_chars]}")
+    return "\n".join(lines)
+
+
+class SummaryCache:
+    """Bounded LRU of summary texts keyed by content hash, persistable as JSON.
+
+    Keys are derived from the summarized content only, so an entry stays
+    valid across requests, clients and restarts. ``save()`` writes the
+    cache atomically and ``SummaryCache.load()`` restores it; a missing file
+    loads as an empty cache.
+    """
+
+    def __init__(self, max_entries: int = 4096) -> None:
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+            return text
+
+    def put(self, key: str, text: str) -> None:
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            data = json.dumps(dict(self._entries), ensure_ascii=False)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, max_entries: int = 4096) -> "SummaryCache":
+        cache = cls(max_entries)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for key, text in json.load(f).items():
+                    cache.put(str(key), str(text))
+        return cache
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _prefix_key(messages: List[BeskarMessage], cut: int) -> bytes:
+    data = json.dumps(messages[:cut], sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class BackgroundSummarizer:
+    """Summarizes the history prefix that pruning will drop, off the request path.
+
+    Cuts are aligned to multiples of ``step`` messages, so one summary stays
+    valid while the conversation grows by up to ``step`` messages, then moved
+    back where needed so the kept messages split no tool call pair. Once the
+    history is within ``step`` messages of ``max_turns``, ``prefetch()``
+    submits the summary for the current cut and for the next one to a worker
+    thread; ``ready()`` returns a finished summary without blocking, or
+    ``None`` while it is still being computed. Beyond ``max_jobs``, the
+    oldest job is dropped and cancelled if it has not started.
+
+    Summaries are hierarchical. The prefix is split into ``step``-message
+    chunks, each summarized once, and aligned runs of 2, 4, 8… chunks are
+    merged into higher-level summaries, like a binary counter. A prefix is
+    covered by at most log2(chunks) of these nodes, joined oldest first. Every
+    node is memoized in *cache* under a hash of its content, so each prune
+    only summarizes the newly dropped chunk plus the merges it completes.
+
+    *summarize* receives a chunk of messages and returns its summary text;
+    *merge* combines consecutive summaries (by default, by summarizing them
+    as messages). ``BeskarClient`` supplies both, calling
+    ``PrunerConfig.summary_model``.
+    """
+
+    def __init__(
+        self,
+        summarize: Callable[[List[BeskarMessage]], str],
+        step: int = 4,
+        max_jobs: int = 16,
+        cache: Optional[SummaryCache] = None,
+        merge: Optional[Callable[[List[str]], str]] = None,
+    ) -> None:
+        self._summarize = summarize
+        self._merge = merge or self._merge_as_messages
+        self.cache = cache if cache is not None else SummaryCache()
+        self._step = max(step, 1)
+        self._max_jobs = max_jobs
+        self._jobs: "OrderedDict[bytes, Future[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="beskar-summarizer")
+
+    def _cut(self, required: int) -> int:
+        step = self._step
+        return -(-required // step) * step
+
+    def _merge_as_messages(self, summaries: List[str]) -> str:
+        return self._summarize([{"role": "user", "content": text} for text in summaries])
+
+    def _node_key(self, keys: List[str], start: int, size: int) -> str:
+        if size == 1:
+            return keys[start]
+        half = size // 2
+        left = self._node_key(keys, start, half)
+        right = self._node_key(keys, start + half, half)
+        return _digest(f"{left}+{right}".encode("ascii"))
+
+    def _node(
+        self, chunks: List[List[BeskarMessage]], keys: List[str], start: int, size: int
+    ) -> str:
+        # Summary of chunks[start:start + size], where size is a power of two.
+        key = self._node_key(keys, start, size)
+        text = self.cache.get(key)
+        if text is None:
+            if size == 1:
+                text = self._summarize(chunks[start])
+            else:
+                half = size // 2
+                text = self._merge(
+                    [
+                        self._node(chunks, keys, start, half),
+                        self._node(chunks, keys, start + half, half),
+                    ]
+                )
+            self.cache.put(key, text)
+        return text
+
+    def summarize_prefix(self, prefix: List[BeskarMessage]) -> str:
+        """Summarize *prefix* hierarchically, reusing cached chunk and merge summaries."""
+        step = self._step
+        chunks = [prefix[i : i + step] for i in range(0, len(prefix), step)]
+        keys = [
+            _digest(json.dumps(chunk, sort_keys=True, default=str).encode("utf-8"))
+            for chunk in chunks
+        ]
+        parts: List[str] = []
+        start = 0
+        remaining = len(chunks)
+        while remaining:
+            size = 1 << (remaining.bit_length() - 1)
+            parts.append(self._node(chunks, keys, start, size))
+            start += size
+            remaining -= size
+        return "\n\n".join(parts)
+
+    def _run(self, prefix: List[BeskarMessage]) -> str:
+        try:
+            return self.summarize_prefix(prefix)
+        except Exception:
+            logger.exception("beskar background summarization failed")
+            raise
+
+    def _submit(self, messages: List[BeskarMessage], cut: int) -> None:
+        key = _prefix_key(messages, cut)
+        with self._lock:
+            if key in self._jobs:
+                return
+            self._jobs[key] = self._executor.submit(self._run, list(messages[:cut]))
+            while len(self._jobs) > self._max_jobs:
+                _, evicted = self._jobs.popitem(last=False)
+                evicted.cancel()  # a no-op once running; saves the call if still queued
+
+    def prefetch(self, messages: List[BeskarMessage], max_turns: int) -> None:
+        """Start summaries that pruning *messages* to *max_turns* needs now or soon."""
+        n = len(messages)
+        required = n - max_turns
+        if required <= -self._step:
+            return  # not near the limit yet
+        cut = self._cut(max(required, 1))
+        for target in (cut, cut + self._step):
+            if target < n:
+                target = pair_safe_cut(messages, target)
+                if target > 0:
+                    self._submit(messages, target)
+
+    def ready(
+        self, messages: List[BeskarMessage], max_turns: int
+    ) -> Optional[Tuple[int, str]]:
+        """Return ``(cut, summary)`` if the summary pruning needs is finished."""
+        required = len(messages) - max_turns
+        if required <= 0:
+            return None
+        cut = self._cut(required)
+        if cut >= len(messages):
+            return None
+        cut = pair_safe_cut(messages, cut)
+        if cut <= 0:
+            return None
+        with self._lock:
+            job = self._jobs.get(_prefix_key(messages, cut))
+        if job is None or not job.done() or job.exception() is not None:
+            return None
+        return cut, job.result()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Block until every submitted summary has finished."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            try:
+                job.result(timeout)
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
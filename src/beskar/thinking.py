@@ -0,0 +1,189 @@
+"""Thinking module — per-call extended-thinking budgets."""
+from __future__ import annotations
+
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import anthropic
+
+from .metrics import LogHistogram
+from .types import BeskarMessage, ThinkingConfig, TurnType, estimate_tokens
+
+# Smallest budget_tokens the API accepts.
+MIN_BUDGET_TOKENS = 1024
+
+
+def _text_of(content: Any) -> str:
+    # Text of a message's content, including text inside tool results.
+    if isinstance(content, str):
+        return content
+    parts: List[str] = []
+    for block in content:
+        if not isinstance(block, dict):
+            continue
+        if block.get("type") == "text":
+            parts.append(str(block.get("text", "")))
+        elif block.get("type") == "tool_result":
+            parts.append(_text_of(block.get("content", "")))
+    return "\n".join(parts)
+
+
+def _sampling_allows_thinking(params: Dict[str, Any]) -> bool:
+    # The API rejects thinking with a temperature other than 1, any top_k,
+    # or a top_p below 0.95.
+    temperature = params.get("temperature")
+    top_p = params.get("top_p")
+    return (
+        (temperature is None or temperature == 1)
+        and params.get("top_k") is None
+        and (top_p is None or top_p >= 0.95)
+    )
+
+
+def _has_block(message: BeskarMessage, block_type: str) -> bool:
+    content: Any = message.get("content")
+    return not isinstance(content, str) and any(
+        isinstance(b, dict) and b.get("type") == block_type for b in content
+    )
+
+
+def turn_type(messages: List[BeskarMessage]) -> TurnType:
+    """``"digestion"`` when the latest message returns tool results, else ``"planning"``."""
+    if messages and messages[-1].get("role") == "user":
+        if _has_block(messages[-1], "tool_result"):
+            return "digestion"
+    return "planning"
+
+
+def thinking_tokens(
+    response: anthropic.types.Message, estimator: Optional[Callable[[str], int]] = None
+) -> int:
+    """Estimated thinking tokens billed in *response*.
+
+    Thinking is billed as output but the text returned may be summarized, so
+    this is output tokens less the estimated size of the visible blocks.
+    """
+    estimate = estimator or estimate_tokens
+    visible = 0
+    thought = False
+    for block in response.content:
+        if isinstance(
+            block, (anthropic.types.ThinkingBlock, anthropic.types.RedactedThinkingBlock)
+        ):
+            thought = True
+        elif isinstance(block, anthropic.types.TextBlock):
+            visible += estimate(block.text)
+        elif isinstance(block, anthropic.types.ToolUseBlock):
+            visible += estimate(str(block.input))
+    return max(response.usage.output_tokens - visible, 0) if thought else 0
+
+
+class ThinkingController:
+    """Decides ``thinking`` per call from turn type, triggers and observed usage.
+
+    Planning turns get ``planning_budget`` and tool-result digestion turns get
+    ``digestion_budget`` (``0`` turns thinking off); a ``triggers`` match in
+    the latest user message raises either to ``planning_budget``. Once
+    ``min_samples`` calls of the same model and turn type have been observed,
+    the budget is lowered to their ``quantile`` of thinking usage plus
+    ``margin``, never below the API minimum.
+
+    The API requires one thinking mode for a whole tool-use loop, so a
+    digestion turn keeps thinking on (at least at the minimum budget) when
+    the assistant turn that called the tools thought, and off when it did not.
+    """
+
+    def __init__(
+        self, config: ThinkingConfig, estimator: Optional[Callable[[str], int]] = None
+    ) -> None:
+        self.config = config
+        self._estimator = estimator
+        self._triggers = (
+            re.compile("|".join(f"(?:{p})" for p in config.triggers), re.IGNORECASE)
+            if config.triggers
+            else None
+        )
+        self._usage: Dict[Tuple[Optional[str], TurnType], LogHistogram] = {}
+        self._lock = threading.Lock()
+
+    def budget(self, model: Optional[str], turn: TurnType, triggered: bool = False) -> int:
+        """Thinking budget for a call, before request constraints; ``0`` means off."""
+        config = self.config
+        if turn == "planning" or triggered:
+            base = config.planning_budget
+        else:
+            base = config.digestion_budget
+        if base <= 0:
+            return 0
+        with self._lock:
+            hist = self._usage.get((model, turn))
+            if hist is not None and hist.count >= config.min_samples:
+                observed = int(hist.percentile(config.quantile) * (1.0 + config.margin))
+                base = min(base, observed)
+        return max(base, MIN_BUDGET_TOKENS)
+
+    def apply(
+        self, params: Dict[str, Any], messages: List[BeskarMessage], model: Optional[str]
+    ) -> Tuple[Optional[Dict[str, Any]], TurnType, int]:
+        """Decide thinking for a call and merge it with the user's ``thinking``.
+
+        Returns ``(thinking, turn, budget)``: the ``thinking`` param to send
+        (``None`` to omit it), the turn type and the budget applied. A user
+        ``thinking`` of type ``"enabled"`` caps the budget and keeps its other
+        keys; any other user-specified type is passed through unchanged.
+        Thinking is left unset when the call forces a tool or sets sampling
+        params thinking does not allow (``temperature`` other than 1,
+        ``top_k``, or ``top_p`` below 0.95).
+        """
+        user: Optional[Dict[str, Any]] = params.get("thinking")
+        turn = turn_type(messages)
+        if user is not None and user.get("type") != "enabled":
+            return user, turn, int(user.get("budget_tokens", 0) or 0)
+
+        budget: int
+        latest = messages[-1] if messages else None
+        triggered = bool(
+            self._triggers is not None
+            and latest is not None
+            and latest.get("role") == "user"
+            and self._triggers.search(_text_of(latest.get("content", "")))
+        )
+        if turn == "digestion":
+            caller = next(
+                (m for m in reversed(messages) if m.get("role") == "assistant"), None
+            )
+            if caller is None or not _has_block(caller, "thinking"):
+                budget = 0  # the loop started without thinking
+            else:
+                budget = max(self.budget(model, turn, triggered), MIN_BUDGET_TOKENS)
+        else:
+            budget = self.budget(model, turn, triggered)
+        if budget and user is not None:
+            budget = min(budget, int(user.get("budget_tokens", budget)))
+        max_tokens = int(params.get("max_tokens", 0))
+        budget = min(budget, max_tokens - 1)
+        tool_choice = params.get("tool_choice")
+        if (
+            budget < MIN_BUDGET_TOKENS
+            or (isinstance(tool_choice, dict) and tool_choice.get("type") in ("any", "tool"))
+            or not _sampling_allows_thinking(params)
+        ):
+            return None, turn, 0
+        return {**(user or {}), "type": "enabled", "budget_tokens": budget}, turn, budget
+
+    def observe(
+        self, model: Optional[str], turn: TurnType, response: anthropic.types.Message
+    ) -> int:
+        """Record the thinking usage of *response*; returns the tokens counted."""
+        used = thinking_tokens(response, self._estimator)
+        self.record(model, turn, used)
+        return used
+
+    def record(self, model: Optional[str], turn: TurnType, used: int) -> None:
+        """Record *used* thinking tokens, e.g. counted from a stream's events."""
+        with self._lock:
+            hist = self._usage.get((model, turn))
+            if hist is None:
+                hist = self._usage[(model, turn)] = LogHistogram(max_value=2**20)
+            hist.record(used)
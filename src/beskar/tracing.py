@@ -0,0 +1,97 @@
+"""Tracing module — optional OpenTelemetry-compatible spans around pipeline stages."""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from .types import TracingConfig
+
+AttributeValue = Union[str, bool, int, float]
+
+
+class _NoOpSpan:
+    """Span stand-in used when tracing is disabled. Records nothing."""
+
+    def is_recording(self) -> bool:
+        return False
+
+    def set_attribute(self, key: str, value: AttributeValue) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoOpSpan()
+
+
+class NoOpTracer:
+    """Tracer that never records. Used when no tracer is configured."""
+
+    @contextmanager
+    def start_as_current_span(self, name: str) -> Iterator[Any]:
+        yield _NOOP_SPAN
+
+
+@dataclass
+class FinishedSpan:
+    name: str
+    attributes: Dict[str, AttributeValue] = field(default_factory=dict)
+    parent: Optional[str] = None
+
+
+class _InMemorySpan:
+    def __init__(self, record: FinishedSpan) -> None:
+        self._record = record
+
+    def is_recording(self) -> bool:
+        return True
+
+    def set_attribute(self, key: str, value: AttributeValue) -> None:
+        self._record.attributes[key] = value
+
+
+class InMemoryTracer:
+    """Tracer that keeps finished spans in a list — intended for tests.
+
+    Exposes the subset of the OpenTelemetry tracer API that Beskar uses
+    (``start_as_current_span``) plus ``get_finished_spans()`` mirroring the
+    OpenTelemetry ``InMemorySpanExporter``.
+    """
+
+    def __init__(self) -> None:
+        self._finished: List[FinishedSpan] = []
+        self._stack: List[FinishedSpan] = []
+
+    @contextmanager
+    def start_as_current_span(self, name: str) -> Iterator[Any]:
+        parent = self._stack[-1].name if self._stack else None
+        record = FinishedSpan(name=name, parent=parent)
+        self._stack.append(record)
+        try:
+            yield _InMemorySpan(record)
+        finally:
+            self._stack.pop()
+            self._finished.append(record)
+
+    def get_finished_spans(self) -> List[FinishedSpan]:
+        return list(self._finished)
+
+    def clear(self) -> None:
+        self._finished.clear()
+
+
+def resolve_tracer(config: Optional[TracingConfig]) -> Any:
+    """Return the tracer to use for *config*.
+
+    ``None`` config → :class:`NoOpTracer`. A config without an explicit tracer
+    uses the global OpenTelemetry tracer when ``opentelemetry-api`` is
+    installed, and the no-op tracer otherwise.
+    """
+    if config is None:
+        return NoOpTracer()
+    if config.tracer is not None:
+        return config.tracer
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return NoOpTracer()
+    return trace.get_tracer("beskar")
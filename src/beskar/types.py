@@ -2,15 +2,45 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Callable, Literal, Optional
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    Protocol,
+    Sequence,
+    Tuple,
+)
 
 from anthropic.types import MessageParam
 
+if TYPE_CHECKING:
+    from .journal import UsageJournal
+    from .spill import SpillStore
+    from .summarizer import SummaryCache
+
 # Direct alias — SDK type changes surface as mypy errors automatically
 BeskarMessage = MessageParam
 
 PrunerStrategy = Literal["sliding-window", "summarize", "importance"]
 
+SinkFullPolicy = Literal["drop", "block"]
+
+# "api": API round-trip, "ttft": time to first streamed token,
+# "overhead": Beskar's own pre-call pipeline time.
+LatencyKind = Literal["api", "ttft", "overhead"]
+
+TruncationStrategy = Literal["head", "tail", "head-tail"]
+
+# "planning": the model decides what to do next; "digestion": it reads tool results.
+TurnType = Literal["planning", "digestion"]
+
+# Steps the preflight stage may take to fit a request in the context window.
+PreflightAction = Literal["compress", "collapse", "prune"]
+
 
 class BeskarError(Exception):
     """Base exception for all Beskar-specific errors."""
@@ -24,11 +54,40 @@ class CompressorError(BeskarError):
     """Raised when the compressor encounters an unrecoverable state."""
 
 
+class PreflightError(BeskarError):
+    """Raised when a request cannot be made to fit the model's context window."""
+
+
 def estimate_tokens(text: str) -> int:
     """Estimate token count using 4-chars-per-token heuristic."""
     return len(text) // 4
 
 
+class TokenEstimator(Protocol):
+    """Pluggable token counter, e.g. ``beskar.tokenizer.BPEEstimator``.
+
+    Any ``Callable[[str], int]`` works where an estimator is accepted;
+    implementing ``estimate_many`` lets modules count all blocks of a request
+    in one batched call.
+    """
+
+    def __call__(self, text: str) -> int: ...
+
+    def estimate_many(self, texts: Sequence[str]) -> List[int]: ...
+
+
+def estimate_many(
+    texts: Sequence[str], estimator: Optional[Callable[[str], int]] = None
+) -> List[int]:
+    """Estimate each of *texts*, using the estimator's batch path when it has one."""
+    if estimator is None:
+        return [len(text) // 4 for text in texts]
+    batch = getattr(estimator, "estimate_many", None)
+    if batch is not None:
+        return list(batch(texts))
+    return [estimator(text) for text in texts]
+
+
 @dataclass
 class CacheBreakpoint:
     position: int
@@ -45,22 +104,230 @@ class PrunerConfig:
     """Configuration for the context pruner.
 
     Attributes:
-        strategy: Pruning strategy. ``"summarize"`` is a V1 stub that inserts a
-            placeholder string — it does NOT call an LLM. Use ``"sliding-window"``
-            or ``"importance"`` for production workloads.
+        strategy: Pruning strategy. ``"summarize"`` replaces dropped turns with
+            a summary message — an LLM summary when ``summary_model`` is set,
+            otherwise a placeholder string.
         max_turns: Maximum number of turns to retain. ``None`` means no limit.
-        summary_model: Reserved for V2 — will specify the model used for
-            LLM-based summarization. Currently unused.
+        summary_model: Model used by the ``"summarize"`` strategy. Summaries
+            are computed in a background thread ahead of need and swapped in
+            once ready; the placeholder is used until then.
+        summary_max_tokens: ``max_tokens`` for each summarization call.
+        summary_step: Dropped prefixes are aligned to multiples of this many
+            messages, so one summary serves that many turns of growth and the
+            next one can be prepared in advance. It is also the chunk size of
+            the hierarchical summaries.
+        summary_cache: Memo of chunk and merged summaries, keyed by content
+            hash. Pass a ``beskar.summarizer.SummaryCache`` (e.g. from
+            ``SummaryCache.load()``) to share or persist it; by default each
+            client keeps its own in memory.
+        relevance_weight: Weight of lexical relevance in the ``"importance"``
+            strategy. Each turn's BM25 score against the latest user message is
+            scaled to ``[0, relevance_weight]`` and added to its score (recency
+            contributes up to 0.5). ``0`` disables relevance scoring.
+        near_duplicate_threshold: When set, a pre-pass before any strategy drops
+            text-only turns whose estimated Jaccard similarity (MinHash over
+            3-word shingles) to a later turn of the same role is at least this
+            value, keeping the latest copy. Turns with tool blocks are never
+            dropped. ``None`` disables it; ``0.8``–``0.9`` suits retry loops.
     """
     strategy: PrunerStrategy = "sliding-window"
     max_turns: Optional[int] = None
     summary_model: Optional[str] = None
+    summary_max_tokens: int = 1024
+    summary_step: int = 4
+    summary_cache: Optional["SummaryCache"] = field(default=None, repr=False)
+    relevance_weight: float = 0.0
+    near_duplicate_threshold: Optional[float] = None
+
+
+@dataclass
+class JsonCompressionConfig:
+    """Structure-aware compression for tool results that parse as JSON.
+
+    Field paths are dot-separated object keys, e.g. ``"items.name"``; arrays
+    are transparent, so a path applies to every element. A path ending at a
+    container selects its whole subtree.
+
+    Attributes:
+        allow_fields: Tool name → paths to keep. Everything else is dropped
+            from results of that tool.
+        deny_fields: Tool name → paths to drop from results of that tool.
+        drop_empty: Drop object members whose value is null, ``""``, ``[]``
+            or ``{}`` (after filtering).
+        array_head: Items kept from the start of a long array once the result
+            is over budget.
+        array_tail: Items kept from the end of a long array once the result
+            is over budget.
+        max_string_chars: Length at which string leaves are shortened once
+            the result is over budget.
+    """
+    allow_fields: Dict[str, List[str]] = field(default_factory=dict)
+    deny_fields: Dict[str, List[str]] = field(default_factory=dict)
+    drop_empty: bool = True
+    array_head: int = 5
+    array_tail: int = 2
+    max_string_chars: int = 200
 
 
 @dataclass
 class CompressorConfig:
+    """Configuration for the tool result compressor.
+
+    Attributes:
+        max_tool_result_tokens: Truncate tool results estimated above this many
+            tokens. ``None`` disables truncation.
+        collapse_after_turns: Collapse tool chains older than this many turns.
+            With ``collapse_target_tokens`` set, this is instead the minimum
+            age a chain must reach before it may be collapsed.
+        collapse_target_tokens: Collapse by size instead of age: while the
+            estimated history exceeds this many tokens, collapse the old
+            tool chains with the highest ``tokens × age`` first, so large
+            stale payloads go before small ones. ``None`` disables it.
+        truncation: Which part of an oversized result to keep — ``"head"``
+            (the default), ``"tail"`` (best for logs and test output), or
+            ``"head-tail"``, which keeps both ends around an elision marker.
+        truncate_at_lines: Snap cut points to line boundaries so no partial
+            line is kept. Falls back to a character cut when the kept part
+            has no line break.
+        json: Compress JSON tool results structurally instead of cutting
+            them as text, so they stay valid JSON. ``None`` disables it.
+        compact_logs: Compact repetitive text results (build output, scanner
+            logs) that are over ``max_tool_result_tokens`` before truncating
+            them: runs of lines that differ only in numbers, hex or
+            timestamps are collapsed into ``line ×N``, while unique and
+            error-like lines are kept in place.
+        log_tools: Names of the tools whose results are logs. When set,
+            ``compact_logs`` applies only to their results and also folds
+            non-adjacent repeats into their first occurrence; when ``None``,
+            it applies to every tool but folds only adjacent runs.
+        dedupe_tool_results: Replace a ``tool_result`` whose content exactly
+            repeats an earlier one in the history with a short reference to
+            the earlier ``tool_use_id``.
+        spill: Store the original content of every truncated or collapsed
+            tool result here so the model can recall it (see
+            ``beskar.spill.SpillStore``).
+    """
     max_tool_result_tokens: Optional[int] = None
     collapse_after_turns: Optional[int] = None
+    collapse_target_tokens: Optional[int] = None
+    truncation: TruncationStrategy = "head"
+    truncate_at_lines: bool = False
+    json: Optional[JsonCompressionConfig] = None
+    compact_logs: bool = False
+    log_tools: Optional[List[str]] = None
+    dedupe_tool_results: bool = False
+    spill: Optional["SpillStore"] = field(default=None, repr=False)
+
+
+@dataclass
+class PreflightConfig:
+    """Context-window check run after the pipeline, before the API call.
+
+    The request's input tokens are estimated with ``BeskarConfig.token_estimator``
+    and compared with the model's context window, less ``max_tokens`` and a
+    safety margin. A request that does not fit is shrunk by each step of
+    ``escalation`` in turn until it does; if it still does not fit,
+    ``PreflightError`` is raised instead of sending it.
+
+    Attributes:
+        context_window: Input limit in tokens. ``None`` looks the model up in
+            ``beskar.preflight.CONTEXT_WINDOWS``.
+        margin: Fraction of the window kept free for estimation error.
+        escalation: Steps to try, in order. ``"compress"`` truncates every tool
+            result to ``tool_result_tokens``; ``"collapse"`` collapses the
+            largest, oldest tool chains until the history fits; ``"prune"``
+            drops the oldest turns, keeping tool pairs together.
+        tool_result_tokens: Per-result limit used by the ``"compress"`` step.
+    """
+    context_window: Optional[int] = None
+    margin: float = 0.05
+    escalation: Tuple[PreflightAction, ...] = ("compress", "collapse", "prune")
+    tool_result_tokens: int = 2000
+
+
+@dataclass
+class RoutingConfig:
+    """Routes each request to the cheapest model its signals call for.
+
+    Every signal is bucketed into a light, medium or heavy level; the heaviest
+    level picks the model, spread evenly over ``models`` (light → first,
+    heavy → last). A request is only ever routed down from the model it
+    asked for, never up.
+
+    Attributes:
+        models: Candidate models, cheapest and least capable first.
+        medium_input_tokens: Estimated input tokens from which a request is
+            medium; ``large_input_tokens`` makes it heavy.
+        medium_tool_depth: Consecutive tool-calling turns ending the
+            conversation from which a request is medium; ``deep_tool_depth``
+            makes it heavy.
+        medium_max_tokens: ``max_tokens`` from which a request is medium;
+            ``large_max_tokens`` makes it heavy.
+        escalate_keywords: Case-insensitive system-prompt keywords that make a
+            request heavy, e.g. ``("architecture", "security review")``.
+    """
+    models: Tuple[str, ...] = ("claude-haiku-4-5", "claude-sonnet-4-6", "claude-opus-4-6")
+    medium_input_tokens: int = 8_000
+    large_input_tokens: int = 64_000
+    medium_tool_depth: int = 3
+    deep_tool_depth: int = 10
+    medium_max_tokens: int = 2_048
+    large_max_tokens: int = 8_192
+    escalate_keywords: Tuple[str, ...] = ()
+
+
+@dataclass
+class ThinkingConfig:
+    """Per-call extended-thinking budgets, replacing one global setting.
+
+    Attributes:
+        planning_budget: ``budget_tokens`` for planning turns — any turn whose
+            latest message is not a tool result.
+        digestion_budget: ``budget_tokens`` for turns that digest tool
+            results. ``0`` turns thinking off for them, unless the tool loop
+            began with thinking (the API requires one mode per loop).
+        triggers: Regular expressions, matched case-insensitively against the
+            latest user message (tool result text included), that give a turn
+            ``planning_budget``, e.g. ``(r"\btraceback\b", "think (hard|carefully)")``.
+        fixed_budget: The global budget this replaces; savings are reported
+            against it.
+        min_samples: Calls of one model and turn type to observe before their
+            thinking usage starts lowering the budget.
+        quantile: Percentile (0–100) of observed thinking usage to budget for.
+        margin: Headroom added to that percentile, as a fraction.
+    """
+    planning_budget: int = 8_192
+    digestion_budget: int = 0
+    triggers: Tuple[str, ...] = ()
+    fixed_budget: int = 8_192
+    min_samples: int = 20
+    quantile: float = 90.0
+    margin: float = 0.25
+
+
+@dataclass
+class OutputLimitConfig:
+    """Adaptive ``max_tokens`` from the output lengths each route produces.
+
+    A route is a model, the call's ``beskar_tags`` and its turn type. The
+    caller's ``max_tokens`` stays the ceiling.
+
+    Attributes:
+        quantile: Percentile (0–100) of a route's observed output tokens to allow.
+        margin: Headroom added to that percentile, as a fraction.
+        min_samples: Responses to observe on a route before its limit adapts.
+        min_max_tokens: Lower bound on an adapted limit.
+        retry_factor: A response that stops on ``max_tokens`` below the
+            caller's limit is retried with the limit multiplied by this,
+            capped at the caller's.
+        max_retries: Retries per call.
+    """
+    quantile: float = 99.0
+    margin: float = 0.2
+    min_samples: int = 20
+    min_max_tokens: int = 256
+    retry_factor: float = 2.0
+    max_retries: int = 3
 
 
 @dataclass
@@ -71,11 +338,60 @@ class TokenUsage:
     cache_read_input_tokens: int
 
 
+class UsageSink(Protocol):
+    """Destination for per-call usage records, e.g. ``beskar.sink.BatchingUsageSink``."""
+
+    def submit(self, usage: TokenUsage) -> None: ...
+
+    def flush(self, timeout: Optional[float] = None) -> bool: ...
+
+    def close(self, timeout: Optional[float] = None) -> None: ...
+
+
 @dataclass
 class MetricsConfig:
+    """Configuration for the metrics tracker.
+
+    Attributes:
+        on_usage: Called inline from ``track()`` with each call's usage. Keep
+            it fast — it adds directly to request latency.
+        sink: Receives each call's usage without blocking the request path.
+            Use this instead of ``on_usage`` for slow consumers.
+        tags: Tags applied to every call from this client. Per-call tags can
+            be passed as ``beskar_tags={...}`` to ``messages.create()``.
+        max_tag_sets: Bound on distinct tag sets tracked. Further sets are
+            folded into a single ``overflow="true"`` series (summarization
+            usage into its own, still tagged ``purpose="summarization"``) so
+            exporters never see unbounded label cardinality.
+
+        windows: Sliding-window spans in seconds, e.g. ``(60, 900, 3600)``,
+            queryable with ``MetricsTracker.window_summary()``. Each window
+            is a fixed-size ring buffer. Like ``summary()``, windows count
+            request traffic only, not background summarization calls.
+        journal: Append-only usage journal (``beskar.journal.UsageJournal``)
+            written on every call. Reload it with ``MetricsTracker.restore()``.
+    """
     on_usage: Optional[Callable[[TokenUsage], None]] = field(
         default=None, repr=False
     )
+    sink: Optional[UsageSink] = field(default=None, repr=False)
+    tags: Dict[str, str] = field(default_factory=dict)
+    max_tag_sets: int = 64
+    windows: Tuple[float, ...] = ()
+    journal: Optional["UsageJournal"] = field(default=None, repr=False)
+
+
+@dataclass
+class TracingConfig:
+    """Configuration for per-stage tracing spans.
+
+    Attributes:
+        tracer: Any object exposing ``start_as_current_span(name)`` — an
+            OpenTelemetry ``Tracer`` or :class:`beskar.tracing.InMemoryTracer`.
+            ``None`` uses the global OpenTelemetry tracer when
+            ``opentelemetry-api`` is installed, and a no-op tracer otherwise.
+    """
+    tracer: Optional[Any] = field(default=None, repr=False)
 
 
 @dataclass
@@ -85,6 +401,15 @@ class BeskarConfig:
     pruner: Optional[PrunerConfig] = None
     compressor: Optional[CompressorConfig] = None
     metrics: Optional[MetricsConfig] = None
+    tracing: Optional[TracingConfig] = None
+    preflight: Optional[PreflightConfig] = None
+    routing: Optional[RoutingConfig] = None
+    thinking: Optional[ThinkingConfig] = None
+    output_limits: Optional[OutputLimitConfig] = None
+    # Replaces estimate_tokens() in the pruner, cache and compressor stages —
+    # any Callable[[str], int] or TokenEstimator, e.g. tokenizer.BPEEstimator or
+    # estimator.CalibratedEstimator (which the client keeps calibrated).
+    token_estimator: Optional[Callable[[str], int]] = field(default=None, repr=False)
 
 
 @dataclass
@@ -97,3 +422,43 @@ class MetricsSummary:
     cache_hit_rate: float = 0.0
     estimated_cost_usd: float = 0.0
     estimated_savings_usd: float = 0.0
+
+
+@dataclass
+class RoutingSummary:
+    """Calls routed from one requested model to another, with what they cost.
+
+    ``counterfactual_cost_usd`` prices the same usage at the requested model.
+    """
+    calls: int = 0
+    cost_usd: float = 0.0
+    counterfactual_cost_usd: float = 0.0
+    savings_usd: float = 0.0
+
+
+@dataclass
+class ThinkingSummary:
+    """Thinking budgets applied to one turn type, against ``fixed_budget``.
+
+    ``budget_savings_usd`` prices the budget tokens saved as output tokens —
+    an upper bound, since a call rarely spends its whole budget.
+    """
+    calls: int = 0
+    thinking_calls: int = 0
+    budget_tokens: int = 0
+    fixed_budget_tokens: int = 0
+    thinking_tokens: int = 0
+    budget_tokens_saved: int = 0
+    budget_savings_usd: float = 0.0
+
+
+@dataclass
+class LatencySummary:
+    count: int = 0
+    mean_ms: float = 0.0
+    min_ms: float = 0.0
+    max_ms: float = 0.0
+    p50_ms: float = 0.0
+    p90_ms: float = 0.0
+    p99_ms: float = 0.0
+    p999_ms: float = 0.0
@@ -0,0 +1,90 @@
+"""Window module — fixed-memory sliding-window usage aggregates."""
+from __future__ import annotations
+
+from array import array
+from typing import List, Tuple
+
+from .types import BeskarError, TokenUsage
+
+# Integer slot arrays, in this order.
+CALLS, INPUT, OUTPUT, CACHE_CREATION, CACHE_READ = range(5)
+
+
+class RollingWindow:
+    """Usage totals over the trailing ``span_s`` seconds, in a ring of time slots.
+
+    Each slot covers ``span_s / slots`` seconds. A slot is reset lazily the
+    first time it is reused for a newer interval, so memory stays fixed at
+    ``slots`` entries per field no matter how many calls are recorded.
+    Totals are exact to one slot of granularity at the trailing edge.
+    """
+
+    def __init__(self, span_s: float, slots: int = 60) -> None:
+        if span_s <= 0 or slots < 1:
+            raise BeskarError("RollingWindow needs a positive span and at least one slot")
+        self.span_s = span_s
+        self._slots = slots
+        self._resolution = span_s / slots
+        self._epochs = array("q", [-1]) * slots
+        self._counts = [array("q", [0]) * slots for _ in range(5)]
+        self._cost = array("d", [0.0]) * slots
+        self._savings = array("d", [0.0]) * slots
+
+    def add(
+        self,
+        usage: TokenUsage,
+        cost_usd: float,
+        savings_usd: float,
+        now: float,
+        calls: int = 1,
+    ) -> None:
+        epoch = int(now // self._resolution)
+        i = epoch % self._slots
+        if self._epochs[i] != epoch:
+            if self._epochs[i] > epoch:
+                return  # older than anything the ring still holds
+            self._epochs[i] = epoch
+            for field in self._counts:
+                field[i] = 0
+            self._cost[i] = 0.0
+            self._savings[i] = 0.0
+        counts = self._counts
+        counts[CALLS][i] += calls
+        counts[INPUT][i] += usage.input_tokens
+        counts[OUTPUT][i] += usage.output_tokens
+        counts[CACHE_CREATION][i] += usage.cache_creation_input_tokens
+        counts[CACHE_READ][i] += usage.cache_read_input_tokens
+        self._cost[i] += cost_usd
+        self._savings[i] += savings_usd
+
+    def merge(self, other: "RollingWindow") -> None:
+        """Add *other*'s slots into this window; both must have the same span and slots."""
+        if other.span_s != self.span_s or other._slots != self._slots:
+            raise BeskarError("cannot merge rolling windows with different spans")
+        for i, epoch in enumerate(other._epochs):
+            if epoch < 0 or self._epochs[i] > epoch:
+                continue
+            if self._epochs[i] != epoch:
+                self._epochs[i] = epoch
+                for field in self._counts:
+                    field[i] = 0
+                self._cost[i] = 0.0
+                self._savings[i] = 0.0
+            for mine, theirs in zip(self._counts, other._counts):
+                mine[i] += theirs[i]
+            self._cost[i] += other._cost[i]
+            self._savings[i] += other._savings[i]
+
+    def totals(self, now: float) -> Tuple[List[int], float, float]:
+        """Return ``(counts, cost_usd, savings_usd)`` for slots inside the window."""
+        current = int(now // self._resolution)
+        oldest = current - self._slots
+        counts = [0, 0, 0, 0, 0]
+        cost = savings = 0.0
+        for i, epoch in enumerate(self._epochs):
+            if oldest < epoch <= current:
+                for f in range(5):
+                    counts[f] += self._counts[f][i]
+                cost += self._cost[i]
+                savings += self._savings[i]
+        return counts, cost, savings
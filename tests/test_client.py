@@ -1,12 +1,28 @@
 """Tests for beskar.client.BeskarClient."""
 from __future__ import annotations
 
-from unittest.mock import MagicMock, patch
+import asyncio
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Iterator, List
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-
-from beskar import BeskarClient
-from beskar.types import BeskarConfig, CacheConfig, CompressorConfig, MetricsConfig, PrunerConfig
+from anthropic.types import TextBlock
+
+from beskar import AsyncBeskarClient, BeskarClient, PreflightError
+from beskar.spill import RECALL_TOOL_NAME, SpillStore
+from beskar.types import (
+    BeskarConfig,
+    CacheConfig,
+    CompressorConfig,
+    JsonCompressionConfig,
+    MetricsConfig,
+    OutputLimitConfig,
+    PreflightConfig,
+    PrunerConfig,
+    RoutingConfig,
+    ThinkingConfig,
+)
 
 
 def _make_usage(**kwargs: object) -> MagicMock:
@@ -104,6 +120,16 @@ def test_metrics_enabled_reflects_usage(mock_sdk: MagicMock) -> None:
     assert summary.total_output_tokens == 75
 
 
+def test_metrics_records_latency(mock_sdk: MagicMock) -> None:
+    client = BeskarClient(BeskarConfig(metrics=MetricsConfig()))
+    client.messages.create(**BASE_PARAMS)
+    client.messages.create(**BASE_PARAMS)
+
+    latency = client.metrics.latency()
+    assert latency["api"]["claude-sonnet-4-6"].count == 2
+    assert latency["overhead"]["claude-sonnet-4-6"].count == 2
+
+
 # --- Test: on_usage callback invoked ---
 
 
@@ -153,3 +179,378 @@ def test_metrics_disabled_summary_zeroes(mock_sdk: MagicMock) -> None:
     client.messages.create(**BASE_PARAMS)
     summary = client.metrics.summary()
     assert summary.total_calls == 0
+
+
+def test_beskar_tags_tracked_and_not_forwarded(mock_sdk: MagicMock) -> None:
+    client = BeskarClient(BeskarConfig(metrics=MetricsConfig(tags={"env": "prod"})))
+    client.messages.create(**BASE_PARAMS, beskar_tags={"agent": "recon"})
+
+    assert "beskar_tags" not in mock_sdk.call_args.kwargs
+    series = client._tracker.summary_by_series()
+    assert list(series) == [("claude-sonnet-4-6", (("agent", "recon"), ("env", "prod")))]
+
+
+# --- Test: JSON compression filters by the tool that produced the result ---
+
+
+def test_json_compression_uses_tool_name(mock_sdk: MagicMock) -> None:
+    messages = [
+        {"role": "user", "content": "look it up"},
+        {
+            "role": "assistant",
+            "content": [{"type": "tool_use", "id": "t1", "name": "lookup", "input": {}}],
+        },
+        {
+            "role": "user",
+            "content": [
+                {"type": "tool_result", "tool_use_id": "t1", "content": '{"a": 1, "b": 2}'}
+            ],
+        },
+    ]
+    json_config = JsonCompressionConfig(deny_fields={"lookup": ["b"]})
+    client = BeskarClient(BeskarConfig(compressor=CompressorConfig(json=json_config)))
+    client.messages.create(**{**BASE_PARAMS, "messages": messages})
+
+    sent = mock_sdk.call_args.kwargs["messages"]
+    assert sent[2]["content"][0]["content"] == '{"a":1}'
+
+
+# --- Test: a spill store adds the recall tool to the request ---
+
+
+def test_spill_store_injects_recall_tool(mock_sdk: MagicMock) -> None:
+    config = BeskarConfig(compressor=CompressorConfig(spill=SpillStore()))
+    client = BeskarClient(config)
+    client.messages.create(**BASE_PARAMS, tools=[{"name": "search", "input_schema": {}}])
+
+    tools = mock_sdk.call_args.kwargs["tools"]
+    assert [t["name"] for t in tools] == ["search", RECALL_TOOL_NAME]
+
+
+def test_recalled_payload_reaches_api_intact(mock_sdk: MagicMock) -> None:
+    store = SpillStore()
+    config = BeskarConfig(
+        compressor=CompressorConfig(
+            max_tool_result_tokens=10, spill=store, dedupe_tool_results=True
+        )
+    )
+    client = BeskarClient(config)
+    payload = "line of build output\n" * 20
+    messages = [
+        {"role": "user", "content": "build it"},
+        {
+            "role": "assistant",
+            "content": [{"type": "tool_use", "id": "t1", "name": "build", "input": {}}],
+        },
+        {"role": "user", "content": [{"type": "tool_result", "tool_use_id": "t1", "content": payload}]},
+    ]
+    client.messages.create(**{**BASE_PARAMS, "messages": messages})
+    assert store.get("t1") == payload
+
+    recall_use = {
+        "type": "tool_use",
+        "id": "r1",
+        "name": RECALL_TOOL_NAME,
+        "input": {"tool_use_id": "t1"},
+    }
+    messages += [
+        {"role": "assistant", "content": [recall_use]},
+        {"role": "user", "content": [store.recall(recall_use)]},
+    ]
+    client.messages.create(**{**BASE_PARAMS, "messages": messages})
+
+    sent = mock_sdk.call_args.kwargs["messages"]
+    assert sent[-1]["content"][0] == {"type": "tool_result", "tool_use_id": "r1", "content": payload}
+    assert sent[2]["content"][0]["content"] != payload  # the original is still truncated
+
+
+# --- Test: summarize strategy runs summaries in the background and tracks them apart ---
+
+
+def test_background_summarization_tracked_separately(mock_sdk: MagicMock) -> None:
+    summary_response = _make_response(_make_usage(input_tokens=40, output_tokens=10))
+    summary_response.content = [TextBlock(type="text", text="earlier work")]
+
+    def create(**kwargs: object) -> MagicMock:
+        if kwargs.get("model") == "claude-haiku-4-5":
+            return summary_response
+        return _make_response()
+
+    mock_sdk.side_effect = create
+    pruner = PrunerConfig(
+        strategy="summarize", max_turns=4, summary_model="claude-haiku-4-5", summary_step=2
+    )
+    client = BeskarClient(BeskarConfig(pruner=pruner, metrics=MetricsConfig()))
+    messages = [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"m{i}"} for i in range(7)
+    ]
+    client.messages.create(**{**BASE_PARAMS, "messages": messages})
+    assert client._summarizer is not None
+    client._summarizer.wait()
+    client.messages.create(**{**BASE_PARAMS, "messages": messages})
+    client.close()
+
+    sent = mock_sdk.call_args.kwargs["messages"]
+    assert sent[0]["content"] == "[Summary of the previous 4 turns]\nearlier work"
+    # cut 4: two chunks and their merge; cut 6: one more chunk
+    assert client.metrics.summarization().total_calls == 4
+    assert client.metrics.summary().total_calls == 2
+    assert client.metrics.summary().total_input_tokens == 200
+
+
+# --- Test: preflight shrinks oversized requests and reports what it did ---
+
+
+def test_preflight_prunes_and_reports_action(mock_sdk: MagicMock) -> None:
+    messages = [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": "p" * 400} for i in range(9)
+    ]
+    preflight = PreflightConfig(context_window=1200, margin=0.0)
+    client = BeskarClient(BeskarConfig(preflight=preflight, metrics=MetricsConfig()))
+    client.messages.create(**{**BASE_PARAMS, "messages": [{"role": "user", "content": "hi"}]})
+    client.messages.create(**{**BASE_PARAMS, "messages": messages})
+
+    sent = mock_sdk.call_args.kwargs["messages"]
+    assert sent[-1] == messages[-1]
+    assert len(sent) == 1
+    assert client.metrics.preflight() == {"fits": 1, "prune": 1}
+
+
+def test_preflight_rejects_without_calling_api(mock_sdk: MagicMock) -> None:
+    preflight = PreflightConfig(context_window=1200)
+    client = BeskarClient(BeskarConfig(preflight=preflight, metrics=MetricsConfig()))
+    with pytest.raises(PreflightError):
+        client.messages.create(
+            **{**BASE_PARAMS, "messages": [{"role": "user", "content": "q" * 20000}]}
+        )
+    mock_sdk.assert_not_called()
+    assert client.metrics.preflight() == {"rejected": 1}
+
+
+# --- Test: routing sends light requests to a cheaper model and tracks the difference ---
+
+
+def test_routing_downgrades_and_records_counterfactual(mock_sdk: MagicMock) -> None:
+    client = BeskarClient(BeskarConfig(routing=RoutingConfig(), metrics=MetricsConfig()))
+    client.messages.create(**{**BASE_PARAMS, "model": "claude-opus-4-6"})
+
+    assert mock_sdk.call_args.kwargs["model"] == "claude-haiku-4-5"
+    routed = client.metrics.routing()[("claude-opus-4-6", "claude-haiku-4-5")]
+    assert routed.calls == 1
+    assert routed.counterfactual_cost_usd > routed.cost_usd
+    assert routed.savings_usd == routed.counterfactual_cost_usd - routed.cost_usd
+    assert client._tracker.summary_by_model().keys() == {"claude-haiku-4-5"}
+
+
+# --- Test: the thinking controller sets budgets per call and tracks savings ---
+
+
+def test_thinking_controller_sets_budget_per_turn(mock_sdk: MagicMock) -> None:
+    config = BeskarConfig(
+        thinking=ThinkingConfig(planning_budget=4096, fixed_budget=8192),
+        metrics=MetricsConfig(),
+    )
+    client = BeskarClient(config)
+    client.messages.create(**{**BASE_PARAMS, "max_tokens": 10_000})
+    assert mock_sdk.call_args.kwargs["thinking"] == {"type": "enabled", "budget_tokens": 4096}
+
+    digestion = [
+        {"role": "user", "content": "run it"},
+        {
+            "role": "assistant",
+            "content": [{"type": "tool_use", "id": "t1", "name": "run", "input": {}}],
+        },
+        {
+            "role": "user",
+            "content": [{"type": "tool_result", "tool_use_id": "t1", "content": "ok"}],
+        },
+    ]
+    global_thinking = {"type": "enabled", "budget_tokens": 8192}
+    client.messages.create(
+        **{**BASE_PARAMS, "max_tokens": 10_000, "messages": digestion, "thinking": global_thinking}
+    )
+    assert "thinking" not in mock_sdk.call_args.kwargs
+
+    summary = client.metrics.thinking()
+    assert summary["planning"].budget_tokens_saved == 8192 - 4096
+    assert summary["digestion"].thinking_calls == 0
+    assert summary["digestion"].budget_tokens_saved == 8192
+
+
+# --- Test: adaptive max_tokens lowers the limit and retries truncated responses ---
+
+
+def test_output_limits_adapt_and_retry(mock_sdk: MagicMock) -> None:
+    limits = OutputLimitConfig(min_samples=3, margin=0.0, min_max_tokens=64)
+    client = BeskarClient(BeskarConfig(output_limits=limits, metrics=MetricsConfig()))
+    for _ in range(3):
+        client.messages.create(**BASE_PARAMS)
+    assert mock_sdk.call_args.kwargs["max_tokens"] == 1024
+
+    client.messages.create(**BASE_PARAMS)
+    assert mock_sdk.call_args.kwargs["max_tokens"] == 64  # p99 of 50 output tokens
+
+    cut_short = _make_response(_make_usage(output_tokens=64))
+    cut_short.stop_reason = "max_tokens"
+    mock_sdk.side_effect = [cut_short, _make_response(_make_usage(output_tokens=90))]
+    mock_sdk.reset_mock()
+    client.messages.create(**BASE_PARAMS)
+    assert [c.kwargs["max_tokens"] for c in mock_sdk.call_args_list] == [64, 128]
+    assert client.metrics.output_limits() == {"default": 3, "adapted": 2, "retried": 1}
+    assert client.metrics.summary().total_calls == 6
+
+
+# --- Test: streaming passes events through and meters them ---
+
+
+def _stream_events(input_tokens: int = 300, output_tokens: int = 42) -> List[Any]:
+    usage = SimpleNamespace(
+        input_tokens=input_tokens,
+        output_tokens=1,
+        cache_creation_input_tokens=0,
+        cache_read_input_tokens=0,
+    )
+    delta_usage = SimpleNamespace(
+        input_tokens=None,
+        output_tokens=output_tokens,
+        cache_creation_input_tokens=None,
+        cache_read_input_tokens=None,
+    )
+    return [
+        SimpleNamespace(type="message_start", message=SimpleNamespace(usage=usage)),
+        SimpleNamespace(
+            type="content_block_start", index=0, content_block=SimpleNamespace(type="text")
+        ),
+        SimpleNamespace(
+            type="content_block_delta",
+            index=0,
+            delta=SimpleNamespace(type="text_delta", text="Hello"),
+        ),
+        SimpleNamespace(type="text", text="Hello"),
+        SimpleNamespace(
+            type="message_delta",
+            delta=SimpleNamespace(stop_reason="end_turn"),
+            usage=delta_usage,
+        ),
+        SimpleNamespace(type="message_stop"),
+    ]
+
+
+class _FakeStream:
+    def __init__(self, events: List[Any]) -> None:
+        self.events = events
+        self.closed = False
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.events)
+
+    def close(self) -> None:
+        self.closed = True
+
+    def get_final_text(self) -> str:
+        return "Hello"
+
+
+def test_create_stream_passes_events_and_records_usage(mock_sdk: MagicMock) -> None:
+    events = _stream_events()
+    mock_sdk.return_value = _FakeStream(events)
+    messages = [{"role": "user", "content": f"msg{i}"} for i in range(5)]
+    client = BeskarClient(
+        BeskarConfig(
+            pruner=PrunerConfig(strategy="sliding-window", max_turns=3),
+            metrics=MetricsConfig(),
+        )
+    )
+    stream = client.messages.create(**{**BASE_PARAMS, "messages": messages}, stream=True)
+
+    assert mock_sdk.call_args.kwargs["stream"] is True
+    assert len(mock_sdk.call_args.kwargs["messages"]) == 3
+    assert client.metrics.summary().total_calls == 0  # nothing recorded mid-stream
+    assert list(stream) == events
+
+    summary = client.metrics.summary()
+    assert summary.total_calls == 1
+    assert summary.total_input_tokens == 300
+    assert summary.total_output_tokens == 42
+    latency = client.metrics.latency()
+    assert latency["ttft"]["claude-sonnet-4-6"].count == 1
+    assert latency["api"]["claude-sonnet-4-6"].count == 1
+
+
+def test_create_stream_closed_early_records_once(mock_sdk: MagicMock) -> None:
+    fake = _FakeStream(_stream_events())
+    mock_sdk.return_value = fake
+    limits = OutputLimitConfig(min_samples=1)
+    client = BeskarClient(BeskarConfig(output_limits=limits, metrics=MetricsConfig()))
+    with client.messages.create(**BASE_PARAMS, stream=True) as stream:
+        next(stream)
+    stream.close()
+
+    assert fake.closed
+    summary = client.metrics.summary()
+    assert summary.total_calls == 1
+    assert summary.total_output_tokens == 1  # as of message_start
+    # An unfinished stream does not teach the output limiter
+    assert client._output_limiter is not None
+    assert client._output_limiter.limit(("claude-sonnet-4-6", (), "planning"), 1024) == 1024
+
+
+def test_messages_stream_context_manager() -> None:
+    with patch("anthropic.Anthropic") as MockAnthropic:
+        manager = MagicMock()
+        manager.__enter__.return_value = _FakeStream(_stream_events(output_tokens=7))
+        MockAnthropic.return_value.messages.stream.return_value = manager
+        client = BeskarClient(BeskarConfig(metrics=MetricsConfig()))
+        with client.messages.stream(**BASE_PARAMS, beskar_tags={"team": "search"}) as stream:
+            assert list(stream.text_stream) == ["Hello"]
+            assert stream.get_final_text() == "Hello"
+
+    kwargs = MockAnthropic.return_value.messages.stream.call_args.kwargs
+    assert "beskar_tags" not in kwargs and "stream" not in kwargs
+    manager.__exit__.assert_called_once()
+    summary = client.metrics.summary()
+    assert summary.total_calls == 1
+    assert summary.total_output_tokens == 7
+    assert client.metrics.latency()["ttft"]["claude-sonnet-4-6"].count == 1
+
+
+# --- Test: the async client runs the same pipeline ---
+
+
+class _FakeAsyncStream:
+    def __init__(self, events: List[Any]) -> None:
+        self.events = events
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        for event in self.events:
+            yield event
+
+    async def close(self) -> None:
+        pass
+
+
+def test_async_client_create_and_stream() -> None:
+    events = _stream_events()
+    with patch("anthropic.Anthropic"), patch("anthropic.AsyncAnthropic") as MockAsync:
+        create = AsyncMock(side_effect=[_make_response(), _FakeAsyncStream(events)])
+        MockAsync.return_value.messages.create = create
+        client = AsyncBeskarClient(
+            BeskarConfig(
+                pruner=PrunerConfig(strategy="sliding-window", max_turns=1),
+                metrics=MetricsConfig(),
+            )
+        )
+        messages = [{"role": "user", "content": f"msg{i}"} for i in range(3)]
+
+        async def run() -> List[Any]:
+            await client.messages.create(**{**BASE_PARAMS, "messages": messages})
+            stream = await client.messages.create(**BASE_PARAMS, stream=True)
+            return [event async for event in stream]
+
+        assert asyncio.run(run()) == events
+
+    assert len(create.call_args_list[0].kwargs["messages"]) == 1
+    assert create.call_args_list[1].kwargs["stream"] is True
+    summary = client.metrics.summary()
+    assert summary.total_calls == 2
+    assert summary.total_output_tokens == 50 + 42
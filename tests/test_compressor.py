@@ -1,10 +1,19 @@
 """Tests for beskar.compressor."""
 from __future__ import annotations
 
+import json
+
 import pytest
 
-from beskar.compressor import collapse_tool_chains, compress_tool_result
-from beskar.types import CompressorConfig
+from beskar.compressor import (
+    ToolTokenCache,
+    collapse_tool_chains,
+    compact_log,
+    compress_tool_result,
+    dedupe_tool_results,
+    tool_use_names,
+)
+from beskar.types import CompressorConfig, JsonCompressionConfig
 
 
 # --- compress_tool_result ---
@@ -70,6 +79,199 @@ def test_compress_array_below_limit_unchanged() -> None:
     assert result is block
 
 
+def test_compress_tail_keeps_end() -> None:
+    block = _make_block("a" * 100 + "b" * 100)
+    config = CompressorConfig(max_tool_result_tokens=10, truncation="tail")
+    result = compress_tool_result(block, config)
+    assert result["content"] == "[truncated]\n" + "b" * 40
+
+
+def test_compress_head_tail_elides_middle() -> None:
+    block = _make_block("h" * 50 + "m" * 100 + "t" * 50)
+    config = CompressorConfig(max_tool_result_tokens=10, truncation="head-tail")
+    result = compress_tool_result(block, config)
+    assert result["content"] == "h" * 20 + "\n[... 160 characters truncated ...]\n" + "t" * 20
+
+
+def test_compress_at_lines_drops_partial_lines() -> None:
+    lines = "".join(f"line {i:03d}\n" for i in range(50))  # 9 chars per line
+    config = CompressorConfig(max_tool_result_tokens=10, truncate_at_lines=True)
+    head = compress_tool_result(_make_block(lines), config)["content"]
+    assert head == "line 000\nline 001\nline 002\nline 003\n[truncated]"
+    config.truncation = "tail"
+    tail = compress_tool_result(_make_block(lines), config)["content"]
+    assert tail == "[truncated]\nline 046\nline 047\nline 048\nline 049\n"
+
+
+def test_compress_at_lines_falls_back_to_char_cut() -> None:
+    config = CompressorConfig(max_tool_result_tokens=10, truncate_at_lines=True)
+    result = compress_tool_result(_make_block("x" * 200), config)
+    assert result["content"] == "x" * 40 + "\n[truncated]"
+
+
+def test_compress_strategies_span_many_text_blocks() -> None:
+    content = [{"type": "text", "text": f"{i:02d}" * 5} for i in range(20)]  # 200 chars
+    config = CompressorConfig(max_tool_result_tokens=5, truncation="head-tail")
+    result = compress_tool_result(_make_block(content), config)
+    (text_block,) = result["content"]
+    assert text_block["text"] == (
+        "0000000000" + "\n[... 180 characters truncated ...]\n" + "1919191919"
+    )
+
+
+# --- JSON mode ---
+
+
+def _json_config(**kwargs: object) -> CompressorConfig:
+    budget = kwargs.pop("max_tool_result_tokens", None)
+    return CompressorConfig(
+        max_tool_result_tokens=budget,  # type: ignore[arg-type]
+        json=JsonCompressionConfig(**kwargs),  # type: ignore[arg-type]
+    )
+
+
+def test_json_minifies_and_drops_empty_values() -> None:
+    payload = {"id": 1, "note": None, "tags": [], "meta": {"x": ""}, "ok": False}
+    block = _make_block(json.dumps(payload, indent=2))
+    result = compress_tool_result(block, _json_config())
+    assert result["content"] == '{"id":1,"ok":false}'
+
+
+def test_json_allow_and_deny_paths_per_tool() -> None:
+    payload = {"items": [{"name": "a", "secret": 1, "size": 2}], "debug": {"trace": "..."}}
+    config = _json_config(
+        allow_fields={"search": ["items.name", "items.size"]},
+        deny_fields={"fetch": ["debug", "items.secret"]},
+    )
+    block = _make_block(json.dumps(payload))
+    allowed = compress_tool_result(block, config, tool_name="search")
+    assert json.loads(allowed["content"]) == {"items": [{"name": "a", "size": 2}]}
+    denied = compress_tool_result(block, config, tool_name="fetch")
+    assert json.loads(denied["content"]) == {"items": [{"name": "a", "size": 2}]}
+    untouched = compress_tool_result(block, config, tool_name="other")
+    assert json.loads(untouched["content"]) == payload
+
+
+def test_json_over_budget_samples_arrays_and_shortens_strings() -> None:
+    payload = {"rows": [{"id": i, "body": "x" * 500} for i in range(100)]}
+    config = _json_config(max_tool_result_tokens=300)
+    result = compress_tool_result(_make_block(json.dumps(payload)), config)
+    assert len(result["content"]) // 4 <= 300
+    rows = json.loads(result["content"])["rows"]
+    assert rows[0]["id"] == 0 and rows[-1]["id"] == 99
+    markers = [r for r in rows if isinstance(r, str)]
+    assert markers == [f"... {100 - (len(rows) - 1)} more items ..."]
+    assert "more chars" in rows[0]["body"]
+
+
+def test_json_array_marker_is_not_shortened() -> None:
+    payload = {"rows": [f"row {i} " + "y" * 50 for i in range(40)]}
+    config = _json_config(max_tool_result_tokens=5)  # down to the 16-char floor
+    rows = json.loads(compress_tool_result(_make_block(json.dumps(payload)), config)["content"])[
+        "rows"
+    ]
+    assert f"... {40 - (len(rows) - 1)} more items ..." in rows
+
+
+def test_json_stays_valid_when_budget_unreachable() -> None:
+    payload = {f"key{i}": i for i in range(200)}
+    config = _json_config(max_tool_result_tokens=5)
+    result = compress_tool_result(_make_block(json.dumps(payload)), config)
+    assert json.loads(result["content"]) == payload
+
+
+def test_json_mode_falls_back_to_text_truncation() -> None:
+    config = _json_config(max_tool_result_tokens=10)
+    result = compress_tool_result(_make_block("{not json" + "x" * 200), config)
+    assert result["content"].endswith("\n[truncated]")
+
+
+def test_json_mode_array_content() -> None:
+    content = [{"type": "text", "text": json.dumps({"a": 1, "b": None})}]
+    result = compress_tool_result(_make_block(content), _json_config())
+    assert result["content"] == [{"type": "text", "text": '{"a":1}'}]
+
+
+def test_tool_use_names_maps_ids() -> None:
+    messages = [
+        {"role": "user", "content": "go"},
+        {
+            "role": "assistant",
+            "content": [
+                {"type": "text", "text": "calling"},
+                {"type": "tool_use", "id": "t1", "name": "search", "input": {}},
+            ],
+        },
+    ]
+    assert tool_use_names(messages) == {"t1": "search"}
+
+
+# --- log compaction ---
+
+
+def test_compact_log_collapses_runs_and_near_duplicates() -> None:
+    log = "\n".join(
+        [
+            "building",
+            *(f"[{i:02d}:00:00] downloaded chunk {i} of 40 (0x{i:04x})" for i in range(40)),
+            "warning: deprecated api",
+            "warning: deprecated api",
+            "done",
+        ]
+    )
+    assert compact_log([log]).split("\n") == [
+        "building",
+        "[00:00:00] downloaded chunk 0 of 40 (0x0000) ×40",
+        "warning: deprecated api ×2",
+        "done",
+    ]
+
+
+def test_compact_log_folds_non_consecutive_repeats_but_keeps_errors() -> None:
+    lines = ["poll 1", "tick", "poll 2", "ERROR: disk 3 full", "poll 3", "ERROR: disk 4 full"]
+    assert compact_log(["\n".join(lines)]).split("\n") == [
+        "poll 1 ×3",
+        "tick",
+        "ERROR: disk 3 full",
+        "ERROR: disk 4 full",
+    ]
+
+
+def test_compact_log_keeps_final_progress_state_and_spans_blocks() -> None:
+    texts = ["step 1\n 10%\r 50%\r100%\nst", "ep 2\n"]
+    assert compact_log(texts) == "step 1 ×2\n100%"
+
+
+def test_compact_logs_mode_compacts_before_truncating() -> None:
+    log = "\n".join(f"line {i}" for i in range(500)) + "\nFAILED: test_x"
+    config = CompressorConfig(max_tool_result_tokens=100, compact_logs=True)
+    result = compress_tool_result(_make_block(log), config)
+    assert result["content"] == "line 0 ×500\nFAILED: test_x"
+
+
+def test_compact_logs_leaves_results_under_budget() -> None:
+    source = "def f(x):\n    if x:\n        return None\n    y = 1\n    return None\n"
+    config = CompressorConfig(max_tool_result_tokens=1000, compact_logs=True)
+    block = _make_block(source)
+    assert compress_tool_result(block, config) is block
+    assert compress_tool_result(block, CompressorConfig(compact_logs=True)) is block
+
+
+def test_compact_logs_folds_non_adjacent_repeats_only_for_log_tools() -> None:
+    log = "\n".join(["poll 1", "tick", "poll 2"] * 100)
+    block = _make_block(log)
+    unnamed = CompressorConfig(max_tool_result_tokens=100, compact_logs=True)
+    assert compress_tool_result(block, unnamed)["content"].endswith("[truncated]")
+
+    named = CompressorConfig(max_tool_result_tokens=100, compact_logs=True, log_tools=["tail"])
+    assert compress_tool_result(block, named, tool_name="tail")["content"] == (
+        "poll 1 ×200\ntick ×100"
+    )
+    assert compress_tool_result(block, named, tool_name="read_file")["content"].endswith(
+        "[truncated]"
+    )
+
+
 # --- collapse_tool_chains ---
 
 
@@ -116,7 +318,7 @@ def test_collapse_pair_beyond_threshold_collapsed() -> None:
     assert result[0]["role"] == "assistant"
 
 
-def test_collapse_multi_tool_turn_not_collapsed() -> None:
+def test_collapse_multi_tool_turn_collapsed() -> None:
     messages = [
         {
             "role": "assistant",
@@ -136,7 +338,122 @@ def test_collapse_multi_tool_turn_not_collapsed() -> None:
         {"role": "user", "content": "ok"},
     ]
     result = collapse_tool_chains(messages, CompressorConfig(collapse_after_turns=1))
-    assert len(result) == 4
+    assert len(result) == 3
+    assert result[0] == {
+        "role": "assistant",
+        "content": "[Tools: tool1, tool2 \u2014 results collapsed after 4 turns]",
+    }
+
+
+def test_collapse_partial_keeps_fresh_calls() -> None:
+    messages = [
+        {
+            "role": "assistant",
+            "content": [
+                {"type": "text", "text": "checking"},
+                {"type": "tool_use", "id": "t1", "name": "old", "input": {}},
+                {"type": "tool_use", "id": "t2", "name": "slow", "input": {}},
+            ],
+        },
+        {
+            "role": "user",
+            "content": [{"type": "tool_result", "tool_use_id": "t1", "content": "r1"}],
+        },
+        {"role": "assistant", "content": "waiting"},
+        {
+            "role": "user",
+            "content": [{"type": "tool_result", "tool_use_id": "t2", "content": "r2"}],
+        },
+    ]
+    result = collapse_tool_chains(messages, CompressorConfig(collapse_after_turns=1))
+    assert len(result) == 3
+    assert result[0]["content"] == [
+        {"type": "text", "text": "[Tool: old \u2014 result collapsed after 4 turns]"},
+        {"type": "text", "text": "checking"},
+        {"type": "tool_use", "id": "t2", "name": "slow", "input": {}},
+    ]
+    assert result[2] is messages[3]
+
+
+def test_collapse_keeps_other_blocks_of_result_message() -> None:
+    messages = [
+        *_make_pair("t1", "search"),
+        {"role": "assistant", "content": "next"},
+        {"role": "user", "content": "follow"},
+    ]
+    messages[1] = {
+        "role": "user",
+        "content": [*messages[1]["content"], {"type": "text", "text": "also this"}],
+    }
+    result = collapse_tool_chains(messages, CompressorConfig(collapse_after_turns=1))
+    assert result[1] == {"role": "user", "content": [{"type": "text", "text": "also this"}]}
+
+
+def test_collapse_scales_linearly_on_long_histories() -> None:
+    messages: list = []
+    for i in range(5000):
+        messages += _make_pair(f"t{i}", "tool")
+    result = collapse_tool_chains(messages, CompressorConfig(collapse_after_turns=10))
+    assert len(result) == 5000 + 6
+
+
+def _sized_pair(tool_id: str, chars: int) -> list:
+    pair = _make_pair(tool_id, tool_id)
+    pair[1]["content"][0]["content"] = "x" * chars
+    return pair
+
+
+def test_collapse_by_size_takes_costliest_oldest_first() -> None:
+    messages = [
+        *_sized_pair("small_old", 40),
+        *_sized_pair("big", 4000),
+        *_sized_pair("medium", 800),
+        *_sized_pair("latest", 4000),
+    ]
+    config = CompressorConfig(collapse_target_tokens=1300)
+    result = collapse_tool_chains(messages, config)
+    texts = [m["content"] for m in result if isinstance(m["content"], str)]
+    assert texts == ["[Tool: big \u2014 result collapsed after 6 turns]"]
+    assert result[0] is messages[0]
+    assert result[-1] is messages[-1]  # the newest result is never collapsed
+
+
+def test_collapse_by_size_noop_under_target() -> None:
+    messages = [*_sized_pair("a", 400), *_sized_pair("b", 400)]
+    result = collapse_tool_chains(messages, CompressorConfig(collapse_target_tokens=10_000))
+    assert result == messages
+
+
+def test_collapse_by_size_respects_minimum_age() -> None:
+    messages = [*_sized_pair("a", 4000), *_sized_pair("b", 4000), *_sized_pair("c", 40)]
+    config = CompressorConfig(collapse_target_tokens=100, collapse_after_turns=2)
+    result = collapse_tool_chains(messages, config)
+    # "b" is the costliest by tokens × age but its result is only 2 messages old
+    assert result[0]["content"] == "[Tool: a \u2014 result collapsed after 6 turns]"
+    assert result[1:] == messages[2:]
+
+
+def test_tool_token_cache_estimates_each_block_once() -> None:
+    calls: list = []
+
+    def estimator(text: str) -> int:
+        calls.append(text)
+        return len(text)
+
+    cache = ToolTokenCache(estimator)
+    messages = [*_sized_pair("a", 50), {"role": "user", "content": "hi"}]
+    assert cache.history_tokens(messages) == len("{}") + 50 + 2
+    calls.clear()
+    cache.history_tokens(messages)
+    assert calls == ["hi"]
+
+
+def test_tool_token_cache_re_estimates_rewritten_results() -> None:
+    cache = ToolTokenCache(len)
+    messages = _sized_pair("a", 50)
+    assert cache.block_tokens(messages[1]["content"][0]) == 50
+    deduped = {**messages[1]["content"][0], "content": "[Same result as tool_use_id z]"}
+    assert cache.block_tokens(deduped) == len(deduped["content"])
 
 
 def test_collapse_does_not_mutate_input() -> None:
@@ -169,3 +486,42 @@ def test_collapse_message_contains_tool_name() -> None:
     result = collapse_tool_chains(messages, CompressorConfig(collapse_after_turns=1))
     assert "specialTool" in result[0]["content"]
     assert result[0]["role"] == "assistant"
+
+
+# --- dedupe_tool_results ---
+
+
+def _tool_turn(tool_id: str, result: object) -> list:
+    return [
+        {
+            "role": "assistant",
+            "content": [{"type": "tool_use", "id": tool_id, "name": "read", "input": {}}],
+        },
+        {"role": "user", "content": [_make_block(result, tool_use_id=tool_id)]},
+    ]
+
+
+def test_dedupe_replaces_later_duplicates_with_reference() -> None:
+    payload = "file contents " * 20
+    messages = [*_tool_turn("t1", payload), *_tool_turn("t2", "other"), *_tool_turn("t3", payload)]
+    result = dedupe_tool_results(messages, CompressorConfig(dedupe_tool_results=True))
+    assert result[1] is messages[1]
+    assert result[3] is messages[3]
+    block = result[5]["content"][0]
+    assert block["tool_use_id"] == "t3"
+    assert block["content"] == "[Same result as tool_use_id t1]"
+    assert messages[5]["content"][0]["content"] == payload
+
+
+def test_dedupe_hashes_list_content_and_skips_short_payloads() -> None:
+    blocks = [{"type": "text", "text": "x" * 100}]
+    messages = [*_tool_turn("t1", blocks), *_tool_turn("t2", list(blocks))]
+    messages += [*_tool_turn("t3", "ok"), *_tool_turn("t4", "ok")]
+    result = dedupe_tool_results(messages, CompressorConfig(dedupe_tool_results=True))
+    assert result[3]["content"][0]["content"] == "[Same result as tool_use_id t1]"
+    assert result[7] is messages[7]
+
+
+def test_dedupe_disabled_returns_input() -> None:
+    messages = [*_tool_turn("t1", "same" * 50), *_tool_turn("t2", "same" * 50)]
+    assert dedupe_tool_results(messages, CompressorConfig()) is messages
@@ -0,0 +1,165 @@
+"""Tests for beskar.estimator — self-calibrating token estimation."""
+from __future__ import annotations
+
+import random
+from unittest.mock import MagicMock, patch
+
+from beskar import BeskarClient
+from beskar.cache import structure_cache
+from beskar.compressor import compress_tool_result
+from beskar.estimator import (
+    IMAGE_BLOCK_TOKENS,
+    CalibratedEstimator,
+    classify,
+    estimate_request_tokens,
+    request_features,
+)
+from beskar.types import BeskarConfig, CacheConfig, CompressorConfig, estimate_tokens
+
+
+# --- classify ---
+
+
+def test_classify_prose() -> None:
+    assert classify("The quick brown fox jumps over the lazy dog.") == [44, 0, 0, 0]
+
+
+def test_classify_json() -> None:
+    assert classify('{"a": [1, 2, 3]}')[2] == 16
+
+
+def test_classify_code() -> None:
+    code = "def f(x):\n    return {x: [1, 2]}\n"
+    assert classify(code)[1] == len(code)
+
+
+def test_classify_cjk_counted_per_char() -> None:
+    counts = classify("日本語 text")
+    assert counts[3] == 3
+    assert counts[0] == 5
+
+
+def test_request_features_covers_system_tools_and_blocks() -> None:
+    messages = [
+        {"role": "user", "content": "hello"},
+        {
+            "role": "assistant",
+            "content": [{"type": "tool_use", "id": "t", "name": "f", "input": {"q": 1}}],
+        },
+        {
+            "role": "user",
+            "content": [{"type": "tool_result", "tool_use_id": "t", "content": "done"}],
+        },
+    ]
+    features = request_features(messages, system="sys", tools=[{"name": "f"}])
+    assert features[0] == len("hello") + len("done") + len("sys")
+    assert features[2] == len('{"q": 1}') + len('{"name": "f"}')
+
+
+def test_estimate_request_tokens_counts_system_and_messages() -> None:
+    messages = [{"role": "user", "content": "a" * 40}]
+    assert estimate_request_tokens(messages, system="b" * 40) == 20
+
+
+# --- CalibratedEstimator ---
+
+
+def test_default_matches_heuristic_for_prose() -> None:
+    text = "plain english words " * 50
+    assert CalibratedEstimator()(text) == estimate_tokens(text)
+
+
+def test_observe_converges_to_true_ratios() -> None:
+    rng = random.Random(0)
+    true_ratios = [1 / 4.5, 1 / 2.5, 1 / 2.0, 1.6]
+    est = CalibratedEstimator()
+    for _ in range(300):
+        counts = [rng.randint(0, 20_000) for _ in range(4)]
+        actual = int(sum(c * w for c, w in zip(counts, true_ratios)))
+        est.observe(counts, actual)
+
+    ratios = est.ratios()
+    assert abs(ratios["prose"] - 4.5) < 0.1
+    assert abs(ratios["code"] - 2.5) < 0.1
+    assert abs(ratios["json"] - 2.0) < 0.1
+    assert abs(ratios["cjk"] - 1 / 1.6) < 0.05
+    assert est.observations == 300
+
+
+def test_observe_fits_per_request_overhead() -> None:
+    rng = random.Random(0)
+    est = CalibratedEstimator()
+    for _ in range(300):
+        chars = rng.randint(500, 20_000)
+        est.observe([chars, 0, 0, 0], chars // 4 + 400)
+
+    assert abs(est.ratios()["prose"] - 4.0) < 0.1
+    assert abs(est.overhead_tokens - 400) < 20
+    assert abs(est("word " * 200) - 250) <= 5  # overhead is not added to text
+
+
+def test_observe_request_discounts_image_blocks() -> None:
+    rng = random.Random(0)
+    est = CalibratedEstimator()
+    for _ in range(300):
+        text = "word " * rng.randint(100, 4000)
+        image = {"type": "image", "source": {"type": "base64", "data": "AAAA" * 5000}}
+        messages = [{"role": "user", "content": [image, {"type": "text", "text": text}]}]
+        est.observe_request(messages, None, None, len(text) // 4 + IMAGE_BLOCK_TOKENS)
+
+    assert request_features(messages) == [len(text), 0, 0, 0]
+    assert abs(est.ratios()["prose"] - 4.0) < 0.1
+
+
+def test_observe_ignores_empty_observations() -> None:
+    est = CalibratedEstimator()
+    before = est.ratios()
+    est.observe([0, 0, 0, 0], 100)
+    est.observe([100, 0, 0, 0], 0)
+    assert est.ratios() == before
+    assert est.observations == 0
+
+
+def test_observe_keeps_ratios_in_bounds() -> None:
+    est = CalibratedEstimator(max_tokens_per_char=2.0)
+    est.observe([10, 0, 0, 0], 10_000)
+    assert est.ratios()["prose"] >= 0.5
+
+
+# --- Module integration ---
+
+
+def test_structure_cache_uses_estimator() -> None:
+    req = {"messages": [], "system": "short"}
+    result = structure_cache(req, CacheConfig(min_token_threshold=10), lambda text: 10_000)
+    assert len(result.breakpoints) == 1
+
+
+def test_compress_scales_truncation_to_estimated_ratio() -> None:
+    block = {"type": "tool_result", "tool_use_id": "t", "content": "x" * 1000}
+    # 2 chars per token → 10-token budget keeps 20 chars
+    result = compress_tool_result(
+        block, CompressorConfig(max_tool_result_tokens=10), lambda text: len(text) // 2
+    )
+    assert result["content"] == "x" * 20 + "\n[truncated]"
+
+
+def test_client_feeds_calibrated_estimator() -> None:
+    est = CalibratedEstimator()
+    with patch("anthropic.Anthropic") as MockAnthropic:
+        response = MagicMock()
+        response.usage.input_tokens = 90
+        response.usage.cache_creation_input_tokens = 0
+        response.usage.cache_read_input_tokens = 10
+        MockAnthropic.return_value.messages.create.return_value = response
+
+        client = BeskarClient(BeskarConfig(token_estimator=est))
+        client.messages.create(
+            model="claude-sonnet-4-6",
+            max_tokens=10,
+            messages=[{"role": "user", "content": "word " * 100}],
+        )
+
+    assert est.observations == 1
+    # 500 prose chars billed as 100 tokens → ratio moves toward 5 chars/token
+    assert est.ratios()["prose"] > 4.0
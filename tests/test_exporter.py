@@ -0,0 +1,112 @@
+"""Tests for beskar.exporter — OpenMetrics exposition."""
+from __future__ import annotations
+
+import urllib.request
+from unittest.mock import MagicMock
+
+import pytest
+
+from beskar.exporter import (
+    CONTENT_TYPE,
+    OpenMetricsExporter,
+    PrometheusCollector,
+    render_openmetrics,
+    start_http_server,
+)
+from beskar.metrics import create_metrics_tracker
+from beskar.types import MetricsConfig
+
+
+def _make_raw(input_tokens: int = 100, output_tokens: int = 50, cache_read: int = 0) -> MagicMock:
+    raw = MagicMock()
+    raw.input_tokens = input_tokens
+    raw.output_tokens = output_tokens
+    raw.cache_creation_input_tokens = 0
+    raw.cache_read_input_tokens = cache_read
+    return raw
+
+
+def test_render_counters_per_model_and_tags() -> None:
+    tracker = create_metrics_tracker()
+    tracker.track(_make_raw(input_tokens=10), model="claude-haiku-4-5", tags={"agent": "recon"})
+    tracker.track(_make_raw(input_tokens=5), model="claude-haiku-4-5", tags={"agent": "recon"})
+    tracker.track(_make_raw(input_tokens=7))
+
+    text = render_openmetrics(tracker)
+    assert "# TYPE beskar_calls counter" in text
+    assert 'beskar_calls_total{model="claude-haiku-4-5",agent="recon"} 2' in text
+    assert 'beskar_input_tokens_total{model="claude-haiku-4-5",agent="recon"} 15' in text
+    assert 'beskar_input_tokens_total{model="unknown"} 7' in text
+    assert text.endswith("# EOF\n")
+
+
+def test_render_latency_histogram_is_cumulative() -> None:
+    tracker = create_metrics_tracker()
+    tracker.record_latency("api", 0.002, model="m")
+    tracker.record_latency("api", 0.2, model="m")
+    tracker.record_latency("api", 3.0, model="m")
+
+    text = render_openmetrics(tracker, latency_buckets=(0.01, 1.0))
+    assert 'beskar_latency_seconds_bucket{kind="api",model="m",le="0.01"} 1' in text
+    assert 'beskar_latency_seconds_bucket{kind="api",model="m",le="1.0"} 2' in text
+    assert 'beskar_latency_seconds_bucket{kind="api",model="m",le="+Inf"} 3' in text
+    assert 'beskar_latency_seconds_count{kind="api",model="m"} 3' in text
+
+
+def test_label_values_escaped_and_names_sanitized() -> None:
+    tracker = create_metrics_tracker()
+    tracker.track(_make_raw(), model="m", tags={"team-name": 'a"b'})
+    text = render_openmetrics(tracker)
+    assert 'team_name="a\\"b"' in text
+
+
+def test_tag_sets_bounded_by_config() -> None:
+    tracker = create_metrics_tracker(MetricsConfig(max_tag_sets=2))
+    for i in range(5):
+        tracker.track(_make_raw(), model="m", tags={"run": str(i)})
+
+    series = tracker.summary_by_series()
+    assert len(series) == 3
+    assert series[("m", (("overflow", "true"),))].total_calls == 3
+
+
+def test_exporter_caches_within_interval() -> None:
+    tracker = create_metrics_tracker()
+    exporter = OpenMetricsExporter(tracker, min_interval_s=60)
+    first = exporter.render()
+    tracker.track(_make_raw(), model="m")
+    assert exporter.render() is first
+
+
+def test_http_server_serves_metrics() -> None:
+    tracker = create_metrics_tracker()
+    tracker.track(_make_raw(), model="m")
+    server = start_http_server(tracker, port=0, addr="127.0.0.1", min_interval_s=0)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as resp:
+            assert resp.headers["Content-Type"] == CONTENT_TYPE
+            body = resp.read().decode("utf-8")
+        assert 'beskar_calls_total{model="m"} 1' in body
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_prometheus_collector_registers() -> None:
+    prometheus_client = pytest.importorskip("prometheus_client")
+
+    tracker = create_metrics_tracker()
+    tracker.track(_make_raw(input_tokens=9), model="m", tags={"agent": "x"})
+    tracker.track(_make_raw(input_tokens=1), model="n")
+    tracker.record_latency("api", 0.05, model="m")
+
+    registry = prometheus_client.CollectorRegistry()
+    registry.register(PrometheusCollector(tracker))
+    assert registry.get_sample_value(
+        "beskar_input_tokens_total", {"model": "m", "agent": "x"}
+    ) == 9
+    assert registry.get_sample_value("beskar_input_tokens_total", {"model": "n", "agent": ""}) == 1
+    assert registry.get_sample_value(
+        "beskar_latency_seconds_count", {"kind": "api", "model": "m"}
+    ) == 1
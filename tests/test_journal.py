@@ -0,0 +1,146 @@
+"""Tests for beskar.journal.UsageJournal."""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from beskar.journal import UsageJournal
+from beskar.metrics import SUMMARIZATION_TAGS, create_metrics_tracker
+from beskar.types import BeskarError, MetricsConfig, TokenUsage
+
+
+def _usage(input_tokens: int = 10) -> TokenUsage:
+    return TokenUsage(
+        input_tokens=input_tokens,
+        output_tokens=2,
+        cache_creation_input_tokens=3,
+        cache_read_input_tokens=4,
+    )
+
+
+def test_append_and_replay(tmp_path: Path) -> None:
+    path = str(tmp_path / "usage.bkj")
+    with UsageJournal(path) as journal:
+        journal.append(_usage(10), model="claude-haiku-4-5", timestamp=1.0)
+        journal.append(_usage(20), timestamp=2.0)
+        entries = list(journal.replay())
+
+    assert [e.usage.input_tokens for e in entries] == [10, 20]
+    assert entries[0].model == "claude-haiku-4-5"
+    assert entries[1].model is None
+    assert entries[0].usage.cache_read_input_tokens == 4
+
+
+def test_reopen_continues_model_table(tmp_path: Path) -> None:
+    path = str(tmp_path / "usage.bkj")
+    with UsageJournal(path) as journal:
+        journal.append(_usage(), model="a", timestamp=1.0)
+    with UsageJournal(path) as journal:
+        journal.append(_usage(), model="b", timestamp=2.0)
+        journal.append(_usage(), model="a", timestamp=3.0)
+        models = [e.model for e in journal.replay()]
+    assert models == ["a", "b", "a"]
+
+
+def test_truncated_tail_discarded(tmp_path: Path) -> None:
+    path = str(tmp_path / "usage.bkj")
+    with UsageJournal(path) as journal:
+        journal.append(_usage(1), timestamp=1.0)
+        journal.append(_usage(2), timestamp=2.0)
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 5)
+
+    with UsageJournal(path) as journal:
+        journal.append(_usage(3), timestamp=3.0)
+        assert [e.usage.input_tokens for e in journal.replay()] == [1, 3]
+
+
+def test_rejects_foreign_file(tmp_path: Path) -> None:
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a journal")
+    with pytest.raises(BeskarError):
+        UsageJournal(str(path))
+
+
+def test_compact_rolls_up_old_records(tmp_path: Path) -> None:
+    path = str(tmp_path / "usage.bkj")
+    with UsageJournal(path) as journal:
+        for ts in (10.0, 20.0, 30.0):
+            journal.append(_usage(10), model="m", timestamp=ts)
+        journal.append(_usage(10), model="n", timestamp=40.0)
+        journal.append(_usage(99), model="m", timestamp=5000.0)
+
+        removed = journal.compact(older_than_s=1000, bucket_s=3600, now=5500.0)
+        entries = list(journal.replay())
+        journal.append(_usage(1), model="n", timestamp=6000.0)
+        after_append = list(journal.replay())
+
+    assert removed == 2
+    by_model = {(e.model, e.timestamp): e for e in entries}
+    assert by_model[("m", 0.0)].calls == 3
+    assert by_model[("m", 0.0)].usage.input_tokens == 30
+    assert by_model[("n", 0.0)].calls == 1
+    assert by_model[("m", 5000.0)].usage.input_tokens == 99
+    assert after_append[-1].model == "n"
+
+
+def test_tracker_writes_journal_and_restores(tmp_path: Path) -> None:
+    path = str(tmp_path / "usage.bkj")
+    raw = MagicMock(input_tokens=50, output_tokens=5,
+                    cache_creation_input_tokens=0, cache_read_input_tokens=0)
+
+    journal = UsageJournal(path)
+    tracker = create_metrics_tracker(MetricsConfig(journal=journal))
+    tracker.track(raw, model="claude-haiku-4-5")
+    tracker.track(raw, model="claude-haiku-4-5")
+    journal.close()
+
+    with UsageJournal(path) as reopened:
+        restored_tracker = create_metrics_tracker(MetricsConfig(windows=(3600,)))
+        assert restored_tracker.restore(reopened) == 2
+
+    s = restored_tracker.summary()
+    assert s.total_calls == 2
+    assert s.total_input_tokens == 100
+    assert restored_tracker.summary_by_model()["claude-haiku-4-5"].total_calls == 2
+    assert restored_tracker.window_summary(3600).total_calls == 2
+
+
+def test_tag_sets_survive_reopen_and_compaction(tmp_path: Path) -> None:
+    path = str(tmp_path / "usage.bkj")
+    tags = (("feature", "search"), ("tenant", "a"))
+    with UsageJournal(path) as journal:
+        journal.append(_usage(10), model="m", timestamp=10.0, tags=tags)
+        journal.append(_usage(20), model="m", timestamp=20.0)
+    with UsageJournal(path) as journal:
+        journal.append(_usage(30), model="m", timestamp=30.0, tags=tags)
+        journal.compact(older_than_s=1000, bucket_s=3600, now=5500.0)
+        entries = list(journal.replay())
+
+    by_tags = {e.tags: e for e in entries}
+    assert by_tags[tags].calls == 2
+    assert by_tags[tags].usage.input_tokens == 40
+    assert by_tags[()].usage.input_tokens == 20
+
+
+def test_restore_keeps_tag_sets(tmp_path: Path) -> None:
+    path = str(tmp_path / "usage.bkj")
+    raw = MagicMock(input_tokens=50, output_tokens=5,
+                    cache_creation_input_tokens=0, cache_read_input_tokens=0)
+
+    journal = UsageJournal(path)
+    tracker = create_metrics_tracker(MetricsConfig(journal=journal))
+    tracker.track(raw, model="m", tags={"tenant": "a"})
+    tracker.track(raw, model="m", tags=dict(SUMMARIZATION_TAGS))
+    journal.close()
+
+    with UsageJournal(path) as reopened:
+        restored = create_metrics_tracker(MetricsConfig(windows=(3600,)))
+        assert restored.restore(reopened) == 2
+
+    assert restored.summary().total_calls == 1
+    assert restored.summary_for_tags({"tenant": "a"}).total_calls == 1
+    assert restored.window_summary(3600).total_calls == 1
@@ -1,18 +1,21 @@
 """Tests for beskar.metrics."""
 from __future__ import annotations
 
+import threading
 from unittest.mock import MagicMock
 
 import pytest
 
 from beskar.metrics import (
     PRICING,
+    SUMMARIZATION_TAGS,
+    LogHistogram,
     create_metrics_tracker,
     estimate_cost_usd,
     estimate_savings_usd,
     map_usage,
 )
-from beskar.types import MetricsConfig, TokenUsage
+from beskar.types import BeskarError, MetricsConfig, TokenUsage
 
 
 def _make_raw(
@@ -154,3 +157,200 @@ def test_on_usage_callback_invoked() -> None:
 def test_no_config_track_completes_without_error() -> None:
     tracker = create_metrics_tracker(None)
     tracker.track(_make_raw())  # should not raise
+
+
+# --- Per-model accumulation ---
+
+
+def test_summary_prices_each_model_separately() -> None:
+    tracker = create_metrics_tracker()
+    tracker.track(_make_raw(input_tokens=1_000_000, output_tokens=0), model="claude-opus-4-6")
+    tracker.track(_make_raw(input_tokens=1_000_000, output_tokens=0), model="claude-haiku-4-5")
+
+    s = tracker.summary()
+    assert s.total_input_tokens == 2_000_000
+    assert abs(s.estimated_cost_usd - (15.00 + 0.80)) < 1e-9
+
+
+def test_summary_by_model_splits_totals() -> None:
+    tracker = create_metrics_tracker()
+    tracker.track(_make_raw(input_tokens=10), model="claude-haiku-4-5")
+    tracker.track(_make_raw(input_tokens=20), model="claude-haiku-4-5")
+    tracker.track(_make_raw(input_tokens=5))
+
+    by_model = tracker.summary_by_model()
+    assert by_model["claude-haiku-4-5"].total_calls == 2
+    assert by_model["claude-haiku-4-5"].total_input_tokens == 30
+    assert by_model[None].total_input_tokens == 5
+
+
+# --- Concurrency ---
+
+
+def test_concurrent_track_loses_no_updates() -> None:
+    import threading
+
+    tracker = create_metrics_tracker()
+    raw = _make_raw(input_tokens=3, output_tokens=2, cache_read=1)
+    n_threads, per_thread = 16, 500
+
+    def worker(i: int) -> None:
+        model = "claude-haiku-4-5" if i % 2 else "claude-sonnet-4-6"
+        for _ in range(per_thread):
+            tracker.track(raw, model=model)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    s = tracker.summary()
+    total = n_threads * per_thread
+    assert s.total_calls == total
+    assert s.total_input_tokens == 3 * total
+    assert s.total_output_tokens == 2 * total
+    assert s.total_cache_read_tokens == total
+    assert tracker.summary_by_model()["claude-haiku-4-5"].total_calls == total // 2
+
+
+def test_exited_threads_fold_their_shards() -> None:
+    tracker = create_metrics_tracker(MetricsConfig(windows=(60,)))
+    raw = _make_raw(input_tokens=3, output_tokens=2)
+
+    def worker() -> None:
+        tracker.track(raw, model="claude-haiku-4-5")
+        tracker.record_latency("api", 0.01, "claude-haiku-4-5")
+
+    for _ in range(200):
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+    tracker.track(raw, model="claude-haiku-4-5")
+
+    assert len(tracker._shards) <= 3  # retired, this thread's, at most one still exiting
+    assert tracker.summary().total_calls == 201
+    assert tracker.window_summary(60).total_input_tokens == 3 * 201
+    assert tracker.latency_summary()["api"]["claude-haiku-4-5"].count == 200
+
+
+# --- LogHistogram ---
+
+
+def test_histogram_exact_for_small_values() -> None:
+    hist = LogHistogram()
+    for v in range(1, 11):
+        hist.record(v)
+    assert hist.count == 10
+    assert hist.percentile(50) == 5.0
+    assert hist.percentile(100) == 10.0
+    assert hist.min == 1 and hist.max == 10
+
+
+def test_histogram_relative_error_bounded() -> None:
+    hist = LogHistogram()
+    for v in range(1, 100_001):
+        hist.record(v)
+    for q, expected in ((50, 50_000), (90, 90_000), (99, 99_000), (99.9, 99_900)):
+        assert abs(hist.percentile(q) - expected) / expected < 2**-5
+
+
+def test_histogram_empty_percentile_zero() -> None:
+    assert LogHistogram().percentile(99) == 0.0
+    assert LogHistogram().mean == 0.0
+
+
+def test_histogram_clamps_out_of_range() -> None:
+    hist = LogHistogram(max_value=1000)
+    hist.record(-5)
+    hist.record(10**9)
+    assert hist.min == 0
+    assert hist.max == 1000
+
+
+def test_histogram_merge_matches_combined() -> None:
+    a, b, combined = LogHistogram(), LogHistogram(), LogHistogram()
+    for v in range(0, 5000, 3):
+        a.record(v)
+        combined.record(v)
+    for v in range(7, 90_000, 11):
+        b.record(v)
+        combined.record(v)
+    a.merge(b)
+    assert a.count == combined.count
+    assert a.total == combined.total
+    assert a.percentile(99) == combined.percentile(99)
+
+
+def test_histogram_merge_incompatible_raises() -> None:
+    with pytest.raises(BeskarError):
+        LogHistogram(sub_bucket_bits=5).merge(LogHistogram(sub_bucket_bits=6))
+
+
+def test_histogram_bytes_round_trip() -> None:
+    hist = LogHistogram()
+    for v in (3, 300, 30_000, 3_000_000):
+        hist.record(v)
+    restored = LogHistogram.from_bytes(hist.to_bytes())
+    assert restored.count == 4
+    assert restored.min == 3 and restored.max == 3_000_000
+    assert restored.percentile(75) == hist.percentile(75)
+
+
+def test_histogram_from_bytes_rejects_garbage() -> None:
+    with pytest.raises(BeskarError):
+        LogHistogram.from_bytes(b"nope")
+
+
+# --- Latency tracking ---
+
+
+def test_latency_summary_by_kind_and_model() -> None:
+    tracker = create_metrics_tracker()
+    for ms in (10, 20, 30, 40):
+        tracker.record_latency("api", ms / 1000, model="claude-haiku-4-5")
+    tracker.record_latency("overhead", 0.0005)
+
+    latency = tracker.latency_summary()
+    api = latency["api"]["claude-haiku-4-5"]
+    assert api.count == 4
+    assert abs(api.mean_ms - 25.0) < 1e-9
+    assert abs(api.p50_ms - 20.0) / 20.0 < 2**-5
+    assert latency["overhead"][None].count == 1
+
+
+def test_event_counts_merge_across_threads() -> None:
+    tracker = create_metrics_tracker()
+    tracker.record_event("preflight", "fits")
+    worker = threading.Thread(target=tracker.record_event, args=("preflight", "fits"))
+    worker.start()
+    worker.join()
+    tracker.record_event("preflight", "prune")
+    tracker.record_event("other", "fits")
+    assert tracker.event_counts("preflight") == {"fits": 2, "prune": 1}
+    assert tracker.event_counts("missing") == {}
+
+
+def test_summary_excludes_summarization_series() -> None:
+    tracker = create_metrics_tracker(MetricsConfig(windows=(60,)))
+    tracker.track(_make_raw(input_tokens=100), model="claude-sonnet-4-6")
+    tracker.track(
+        _make_raw(input_tokens=7),
+        model="claude-haiku-4-5",
+        tags={"team": "a", **SUMMARIZATION_TAGS},
+    )
+    assert tracker.summary().total_input_tokens == 100
+    assert tracker.summary_by_model().keys() == {"claude-sonnet-4-6"}
+    assert tracker.window_summary(60).total_calls == 1
+    assert tracker.summary_for_tags(SUMMARIZATION_TAGS).total_input_tokens == 7
+
+
+def test_summarization_usage_stays_apart_once_tag_sets_overflow() -> None:
+    tracker = create_metrics_tracker(MetricsConfig(max_tag_sets=2))
+    tracker.track(_make_raw(input_tokens=1000), tags={"team": "a"})
+    tracker.track(_make_raw(input_tokens=1), tags={"team": "b"})
+    tracker.track(_make_raw(input_tokens=1), tags={"team": "c"})
+    tracker.track(_make_raw(input_tokens=5), tags={"team": "a", **SUMMARIZATION_TAGS})
+    assert tracker.summary().total_input_tokens == 1002
+    assert tracker.summary_for_tags(SUMMARIZATION_TAGS).total_input_tokens == 5
+    assert tracker.summary_for_tags({"overflow": "true"}).total_input_tokens == 6
@@ -0,0 +1,105 @@
+"""Tests for beskar.minhash — near-duplicate turn removal."""
+from __future__ import annotations
+
+from typing import List
+
+import pytest
+
+from beskar.minhash import MinHasher, drop_near_duplicates, similarity
+from beskar.pruner import find_tool_pairs, prune_messages
+from beskar.types import BeskarError, BeskarMessage, PrunerConfig
+
+RETRY = (
+    "The build failed again with the same linker error in module {n}. "
+    "Let me try again with a clean checkout and the verbose flag enabled."
+)
+
+
+def _sketch(hasher: MinHasher, text: str):  # type: ignore[no-untyped-def]
+    sketch = hasher.sketch(text)
+    assert sketch is not None
+    return sketch
+
+
+def test_similarity_tracks_overlap() -> None:
+    hasher = MinHasher()
+    base = _sketch(hasher, RETRY.format(n="a"))
+    near = _sketch(hasher, RETRY.format(n="b"))
+    other = _sketch(hasher, "Deployed the frontend to staging and the smoke tests all pass cleanly now.")
+    assert similarity(base, base) == 1.0
+    assert similarity(base, near) > 0.5
+    assert similarity(base, other) < 0.2
+
+
+def test_short_texts_are_not_sketched() -> None:
+    assert MinHasher().sketch("let me try again") is None
+
+
+def test_sketches_are_cached() -> None:
+    hasher = MinHasher()
+    text = RETRY.format(n="a")
+    assert hasher.sketch(text) is hasher.sketch(text)
+
+
+def test_num_perm_must_split_into_bands() -> None:
+    with pytest.raises(BeskarError):
+        MinHasher(num_perm=10, bands=4)
+    with pytest.raises(BeskarError):
+        MinHasher(bands=0)
+
+
+def test_drops_earlier_copies_and_keeps_latest() -> None:
+    messages: List[BeskarMessage] = [
+        {"role": "user", "content": "fix the build"},
+        {"role": "assistant", "content": RETRY.format(n="a")},
+        {"role": "user", "content": "go on"},
+        {"role": "assistant", "content": RETRY.format(n="a")},
+        {"role": "user", "content": "go on"},
+        {"role": "assistant", "content": [{"type": "text", "text": RETRY.format(n="a")}]},
+    ]
+    result = drop_near_duplicates(messages, 0.9)
+    assert result == [messages[0], messages[2], messages[4], messages[5]]
+
+
+def test_same_text_in_other_role_is_kept() -> None:
+    messages: List[BeskarMessage] = [
+        {"role": "user", "content": RETRY.format(n="a")},
+        {"role": "assistant", "content": RETRY.format(n="a")},
+    ]
+    assert drop_near_duplicates(messages, 0.9) == messages
+
+
+def test_tool_turns_are_never_dropped() -> None:
+    error = RETRY.format(n="a")
+    messages: List[BeskarMessage] = []
+    for i in range(3):
+        messages.append(
+            {
+                "role": "assistant",
+                "content": [
+                    {"type": "text", "text": error},
+                    {"type": "tool_use", "id": f"t{i}", "name": "build", "input": {}},
+                ],
+            }
+        )
+        messages.append(
+            {
+                "role": "user",
+                "content": [{"type": "tool_result", "tool_use_id": f"t{i}", "content": error}],
+            }
+        )
+    result = drop_near_duplicates(messages, 0.5)
+    assert result == messages
+    assert all(-1 not in pair for pair in find_tool_pairs(result).values())
+
+
+def test_pruner_runs_pre_pass_before_strategy() -> None:
+    messages: List[BeskarMessage] = [
+        {"role": "assistant", "content": RETRY.format(n="a")},
+        {"role": "user", "content": "ok"},
+        {"role": "assistant", "content": RETRY.format(n="a")},
+        {"role": "user", "content": "ok"},
+    ]
+    config = PrunerConfig(near_duplicate_threshold=0.9)
+    assert prune_messages(messages, config) == messages[1:]
+    assert prune_messages(messages, PrunerConfig()) == messages
@@ -0,0 +1,52 @@
+"""Tests for beskar.output_limits — adaptive max_tokens."""
+from __future__ import annotations
+
+from beskar.output_limits import OutputLimiter
+from beskar.types import OutputLimitConfig
+
+
+def _limiter(**kwargs: object) -> OutputLimiter:
+    return OutputLimiter(OutputLimitConfig(min_samples=10, **kwargs))  # type: ignore[arg-type]
+
+
+def test_keeps_requested_until_enough_samples() -> None:
+    limiter = _limiter()
+    for _ in range(9):
+        limiter.observe("r", 300)
+    assert limiter.limit("r", 4096) == 4096
+    limiter.observe("r", 300)
+    assert 350 <= limiter.limit("r", 4096) <= 380  # p99 of 300 plus 20%
+
+
+def test_limit_tracks_high_quantile_per_route() -> None:
+    limiter = _limiter(margin=0.0)
+    for i in range(100):
+        limiter.observe("long", 1000 + i * 10)
+        limiter.observe("short", 50)
+    assert 1900 <= limiter.limit("long", 8192) <= 2100
+    assert limiter.limit("short", 8192) == 256  # min_max_tokens
+    assert limiter.limit("unseen", 8192) == 8192
+
+
+def test_limit_never_exceeds_request_and_respects_reserved() -> None:
+    limiter = _limiter()
+    for _ in range(10):
+        limiter.observe("r", 5000)
+    assert limiter.limit("r", 2000) == 2000
+    assert limiter.limit("r", 20_000, reserved=8000) == 8256
+
+
+def test_retry_limit_grows_to_ceiling() -> None:
+    limiter = _limiter()
+    assert limiter.retry_limit(500, 4096) == 1000
+    assert limiter.retry_limit(3000, 4096) == 4096
+    assert limiter.retry_limit(4096, 4096) is None
+
+
+def test_route_table_is_bounded() -> None:
+    limiter = OutputLimiter(OutputLimitConfig(min_samples=1), max_routes=2)
+    limiter.observe("a", 100)
+    limiter.observe("b", 100)
+    limiter.observe("c", 100)
+    assert limiter.limit("a", 4096) == 4096
+    assert limiter.limit("c", 4096) < 4096
@@ -0,0 +1,140 @@
+"""Tests for beskar.preflight — context-window check before sending."""
+from __future__ import annotations
+
+from typing import List
+
+import pytest
+
+from beskar.compressor import dedupe_tool_results
+from beskar.metrics import resolve_model
+from beskar.preflight import context_window, run_preflight
+from beskar.pruner import find_tool_pairs
+from beskar.types import BeskarMessage, CompressorConfig, PreflightConfig, PreflightError
+
+
+def _tool_turn(tool_id: str, output: str) -> List[BeskarMessage]:
+    return [
+        {
+            "role": "assistant",
+            "content": [{"type": "tool_use", "id": tool_id, "name": "read", "input": {}}],
+        },
+        {
+            "role": "user",
+            "content": [{"type": "tool_result", "tool_use_id": tool_id, "content": output}],
+        },
+    ]
+
+
+def _run(
+    messages: List[BeskarMessage], config: PreflightConfig, max_tokens: int = 100
+):  # type: ignore[no-untyped-def]
+    return run_preflight(messages, "system", None, "claude-sonnet-4-6", max_tokens, config)
+
+
+def test_context_window_lookup_and_override() -> None:
+    assert context_window("claude-haiku-4-5", PreflightConfig()) == 200_000
+    assert context_window("unknown-model", PreflightConfig()) == 200_000
+    assert resolve_model("claude-haiku-4-5") == "claude-haiku-4-5-20251001"
+    assert resolve_model("unknown-model") == "unknown-model"
+    assert context_window("claude-haiku-4-5", PreflightConfig(context_window=8000)) == 8000
+
+
+def test_request_that_fits_is_untouched() -> None:
+    messages: List[BeskarMessage] = [{"role": "user", "content": "hi"}]
+    result = _run(messages, PreflightConfig(context_window=1000))
+    assert result.actions == []
+    assert result.messages is messages
+    assert result.budget == 1000 - 50 - 100
+
+
+def test_compress_step_truncates_tool_results() -> None:
+    messages = _tool_turn("t1", "x" * 8000) + [{"role": "user", "content": "next"}]
+    config = PreflightConfig(context_window=2000, margin=0.0, tool_result_tokens=500)
+    result = _run(messages, config)
+    assert result.actions == ["compress"]
+    assert result.estimated_tokens <= result.budget
+    assert result.messages[1]["content"][0]["content"].endswith("[truncated]")
+
+
+def test_collapse_step_runs_when_compression_is_not_enough() -> None:
+    messages: List[BeskarMessage] = []
+    for i in range(6):
+        messages += _tool_turn(f"t{i}", "y" * 1600)
+    messages.append({"role": "user", "content": "continue"})
+    config = PreflightConfig(context_window=1500, margin=0.0, tool_result_tokens=400)
+    result = _run(messages, config)
+    assert result.actions == ["compress", "collapse"]
+    assert result.estimated_tokens <= result.budget
+
+
+def test_prune_step_keeps_tool_pairs_whole() -> None:
+    messages: List[BeskarMessage] = []
+    for i in range(10):
+        messages.append({"role": "user", "content": "z" * 400})
+        messages += _tool_turn(f"t{i}", "ok")
+    messages.append({"role": "user", "content": "latest"})
+    config = PreflightConfig(context_window=800, margin=0.0, escalation=("prune",))
+    result = _run(messages, config)
+    assert result.actions == ["prune"]
+    assert result.messages[-1] == messages[-1]
+    assert len(result.messages) < len(messages)
+    assert all(-1 not in pair for pair in find_tool_pairs(result.messages).values())
+
+
+def test_escalation_keeps_dedupe_references_valid() -> None:
+    messages: List[BeskarMessage] = []
+    for i in range(3):
+        messages += _tool_turn(f"t{i}", "same output " * 200)
+    messages[0]["content"][0]["input"] = {"query": "z" * 2000}
+    messages.append({"role": "user", "content": "continue"})
+    compressor = CompressorConfig(dedupe_tool_results=True)
+    deduped = dedupe_tool_results(messages, compressor)
+    assert "t0" in deduped[3]["content"][0]["content"]
+
+    for escalation in (("collapse",), ("prune",)):
+        config = PreflightConfig(context_window=1100, margin=0.0, escalation=escalation)
+        result = run_preflight(deduped, None, None, None, 100, config, compressor)
+        assert result.actions == list(escalation)
+        results = {
+            b["tool_use_id"]: b["content"]
+            for m in result.messages
+            if isinstance(m["content"], list)
+            for b in m["content"]
+            if b.get("type") == "tool_result"
+        }
+        assert "t0" not in results
+        assert results["t1"] == "same output " * 200
+        assert results["t2"] == "[Same result as tool_use_id t1]"
+
+
+def test_compress_respects_tighter_compressor_limit() -> None:
+    messages = _tool_turn("t1", "x" * 8400)
+    config = PreflightConfig(context_window=2000, margin=0.0, tool_result_tokens=1500)
+    result = run_preflight(
+        messages, None, None, None, 0, config, CompressorConfig(max_tool_result_tokens=100)
+    )
+    assert len(result.messages[1]["content"][0]["content"]) < 1000
+
+
+def test_image_data_is_not_counted_as_text() -> None:
+    image = {
+        "type": "image",
+        "source": {"type": "base64", "media_type": "image/png", "data": "A" * 700_000},
+    }
+    messages: List[BeskarMessage] = [
+        {"role": "user", "content": [image, {"type": "text", "text": "what is this?"}]},
+        {
+            "role": "assistant",
+            "content": [{"type": "tool_use", "id": "t1", "name": "screenshot", "input": {}}],
+        },
+        {"role": "user", "content": [{"type": "tool_result", "tool_use_id": "t1", "content": [image]}]},
+    ]
+    result = _run(messages, PreflightConfig())
+    assert result.actions == []
+    assert result.estimated_tokens < 5_000
+
+
+def test_raises_when_nothing_helps() -> None:
+    messages: List[BeskarMessage] = [{"role": "user", "content": "w" * 40000}]
+    with pytest.raises(PreflightError, match="context window"):
+        _run(messages, PreflightConfig(context_window=4000))
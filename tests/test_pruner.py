@@ -1,8 +1,12 @@
 """Tests for beskar.pruner — context window management."""
 from __future__ import annotations
 
+import random
 from typing import Any, List
 
+import pytest
+
+from beskar import pruner
 from beskar.pruner import find_tool_pairs, prune_messages
 from beskar.types import BeskarMessage, PrunerConfig
 
@@ -257,3 +261,85 @@ def test_prune_messages_uses_length_as_default_when_max_turns_omitted() -> None:
     msgs = [make_user("a"), make_user("b"), make_user("c")]
     result = prune_messages(msgs, PrunerConfig(strategy="sliding-window"))
     assert len(result) == 3
+
+
+# --- importance: column scoring and partial selection ---
+
+
+def _reference_importance(msgs: List[BeskarMessage], max_turns: int) -> List[BeskarMessage]:
+    # Per-unit scoring and a full stable sort, as the pruner originally did.
+    def text(m: BeskarMessage) -> str:
+        content: Any = m["content"]
+        if isinstance(content, str):
+            return content
+        return "".join(b.get("text", "") for b in content if b.get("type") == "text")
+
+    def score(i: int) -> float:
+        content: Any = msgs[i]["content"]
+        tool = not isinstance(content, str) and any(b.get("type") == "tool_use" for b in content)
+        return (i / len(msgs)) * 0.5 + (0.3 if tool else 0.0) + min(len(text(msgs[i])) / 5000, 0.2)
+
+    if max_turns >= len(msgs):
+        return list(msgs)
+    pairs = find_tool_pairs(msgs)
+    owner = {idx: pid for pid, p in pairs.items() for idx in p if idx >= 0}
+    seen: set = set()
+    units = []
+    for i in range(len(msgs)):
+        if i in seen:
+            continue
+        indices = [idx for idx in pairs[owner[i]] if idx >= 0] if i in owner else [i]
+        units.append((min(score(idx) for idx in indices), indices))
+        seen.update(indices)
+    units.sort(key=lambda u: u[0])
+    dropped: set = set()
+    remaining = len(msgs)
+    for _, indices in units:
+        if remaining <= max_turns or remaining - len(indices) < 1:
+            break
+        dropped.update(indices)
+        remaining -= len(indices)
+    return [m for i, m in enumerate(msgs) if i not in dropped]
+
+
+def _random_conversation(rng: random.Random, n: int) -> List[BeskarMessage]:
+    msgs: List[BeskarMessage] = []
+    while len(msgs) < n:
+        roll = rng.random()
+        if roll < 0.3:
+            tool_id = f"t{len(msgs)}"
+            msgs.append(make_tool_use(tool_id))
+            msgs.append(make_tool_result(tool_id))
+        elif roll < 0.65:
+            msgs.append(make_user("u" * rng.randrange(1, 8000)))
+        else:
+            msgs.append(make_assistant("a" * rng.randrange(1, 8000)))
+    return msgs
+
+
+def _check_matches_reference() -> None:
+    rng = random.Random(7)
+    for n in (5, 40, 300):
+        msgs = _random_conversation(rng, n)
+        for max_turns in (0, 1, n // 3, n - 1):
+            assert importance(msgs, max_turns) == _reference_importance(msgs, max_turns)
+
+
+def test_importance_fallback_matches_full_sort(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(pruner, "_np", None)
+    _check_matches_reference()
+
+
+def test_importance_numpy_matches_full_sort(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(pruner, "_np", pytest.importorskip("numpy"))
+    _check_matches_reference()
+
+
+def test_lowest_units_breaks_ties_by_position(monkeypatch: pytest.MonkeyPatch) -> None:
+    scores = [0.5, 0.1, 0.5, 0.1, 0.5, 0.9]
+    monkeypatch.setattr(pruner, "_np", None)
+    assert pruner._lowest_units(scores, 4) == [1, 3, 0, 2]
+    numpy = pytest.importorskip("numpy")
+    monkeypatch.setattr(pruner, "_np", numpy)
+    assert pruner._lowest_units(scores, 4) == [1, 3, 0, 2]
+    assert pruner._lowest_units(scores, 6) == [1, 3, 0, 2, 4, 5]
@@ -0,0 +1,100 @@
+"""Tests for beskar.relevance — BM25 relevance scoring for importance pruning."""
+from __future__ import annotations
+
+from typing import List
+
+from beskar.pruner import prune_messages
+from beskar.relevance import BM25Index, tokenize
+from beskar.types import BeskarMessage, PrunerConfig
+
+
+def test_tokenize_drops_stopwords_and_single_letters() -> None:
+    assert tokenize("What is the Parser_v2 doing in a loop?") == ["parser_v2", "doing", "loop"]
+
+
+def test_add_is_idempotent_per_text() -> None:
+    index = BM25Index()
+    first = index.add("database migration failed")
+    assert index.add("database migration failed") == first
+    assert index.add("frontend styles") != first
+    assert len(index) == 2
+
+
+def test_scores_rank_matching_documents() -> None:
+    index = BM25Index()
+    db = index.add("the database migration failed on the users table")
+    css = index.add("updated the button colours in the stylesheet")
+    mixed = index.add("database connection pool and stylesheet cleanup")
+    scores = index.scores("why did the database migration fail")
+    assert css not in scores
+    assert scores[db] > scores[mixed] > 0
+
+
+def test_rare_terms_weigh_more() -> None:
+    index = BM25Index()
+    common = [index.add(f"request log entry {i}") for i in range(5)]
+    rare = index.add("request with checksum mismatch")
+    scores = index.scores("request checksum")
+    assert scores[rare] > max(scores[d] for d in common)
+
+
+def test_index_resets_when_full() -> None:
+    index = BM25Index(max_documents=2)
+    index.add("alpha")
+    index.add("beta")
+    gamma = index.add("gamma")
+    assert gamma not in (0, 1)
+    assert len(index) == 1
+    assert index.scores("alpha") == {}
+    assert list(index.scores("gamma")) == [gamma]
+
+
+def test_add_all_resets_only_between_batches() -> None:
+    index = BM25Index(max_documents=3)
+    index.add("stale entry")
+    ids = index.add_all(["alpha report", "beta report", "gamma report"])
+    assert len(set(ids)) == 3
+    assert len(index) == 3
+    assert set(index.scores("report")) == set(ids)
+
+
+# --- pruner integration ---
+
+
+def _conversation() -> List[BeskarMessage]:
+    topics = [
+        "set up the kafka consumer group",
+        "fix the flaky login test",
+        "rename the css variables",
+        "tune the postgres vacuum settings",
+        "update the changelog",
+        "bump the docker base image",
+    ]
+    messages: List[BeskarMessage] = []
+    for topic in topics:
+        messages.append({"role": "user", "content": topic})
+        messages.append({"role": "assistant", "content": f"done: {topic}"})
+    messages.append({"role": "user", "content": "the kafka consumer group is lagging again"})
+    return messages
+
+
+def test_relevance_keeps_related_turns() -> None:
+    messages = _conversation()
+    plain = prune_messages(messages, PrunerConfig(strategy="importance", max_turns=5))
+    relevant = prune_messages(
+        messages, PrunerConfig(strategy="importance", max_turns=5, relevance_weight=0.6)
+    )
+    assert not any("set up the kafka" in str(m["content"]) for m in plain)
+    assert any("set up the kafka" in str(m["content"]) for m in relevant)
+    assert relevant[-1] == messages[-1]
+
+
+def test_shared_index_only_indexes_new_messages() -> None:
+    index = BM25Index()
+    config = PrunerConfig(strategy="importance", max_turns=5, relevance_weight=0.6)
+    messages = _conversation()
+    prune_messages(messages, config, relevance_index=index)
+    indexed = len(index)
+    messages.append({"role": "assistant", "content": "checking consumer offsets"})
+    prune_messages(messages, config, relevance_index=index)
+    assert len(index) == indexed + 1
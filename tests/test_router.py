@@ -0,0 +1,70 @@
+"""Tests for beskar.router — model routing."""
+from __future__ import annotations
+
+from typing import List
+
+from beskar.router import Router, tool_chain_depth
+from beskar.types import BeskarMessage, RoutingConfig
+
+HAIKU, SONNET, OPUS = "claude-haiku-4-5", "claude-sonnet-4-6", "claude-opus-4-6"
+
+
+def _tool_round(tool_id: str) -> List[BeskarMessage]:
+    return [
+        {
+            "role": "assistant",
+            "content": [{"type": "tool_use", "id": tool_id, "name": "fn", "input": {}}],
+        },
+        {
+            "role": "user",
+            "content": [{"type": "tool_result", "tool_use_id": tool_id, "content": "ok"}],
+        },
+    ]
+
+
+def test_tool_chain_depth_counts_trailing_rounds() -> None:
+    messages: List[BeskarMessage] = _tool_round("a") + [{"role": "user", "content": "next"}]
+    assert tool_chain_depth(messages) == 0
+    messages += _tool_round("b") + _tool_round("c")
+    assert tool_chain_depth(messages) == 2
+
+
+def test_heaviest_signal_picks_the_model() -> None:
+    router = Router(RoutingConfig())
+    assert router.classify(100, 0, 512, None) == HAIKU
+    assert router.classify(10_000, 0, 512, None) == SONNET
+    assert router.classify(100, 4, 512, None) == SONNET
+    assert router.classify(100, 0, 4096, None) == SONNET
+    assert router.classify(100_000, 0, 512, None) == OPUS
+    assert router.classify(100, 12, 512, None) == OPUS
+
+
+def test_system_keywords_escalate() -> None:
+    router = Router(RoutingConfig(escalate_keywords=("security review",)))
+    assert router.classify(100, 0, 512, "Perform a Security Review.") == OPUS
+    blocks = [{"type": "text", "text": "do a security review"}]
+    assert router.classify(100, 0, 512, blocks) == OPUS
+    assert router.classify(100, 0, 512, "summarize") == HAIKU
+
+
+def test_two_model_table_spreads_levels() -> None:
+    router = Router(RoutingConfig(models=(HAIKU, SONNET)))
+    assert router.classify(100, 0, 512, None) == HAIKU
+    assert router.classify(10_000, 0, 512, None) == SONNET
+    assert router.classify(100_000, 0, 512, None) == SONNET
+
+
+def test_routes_down_never_up() -> None:
+    router = Router(RoutingConfig())
+    assert router.route(OPUS, 100, 0, 512, None) == HAIKU
+    assert router.route(SONNET, 100_000, 0, 512, None) == SONNET
+    assert router.route("custom-model", 100, 0, 512, None) == "custom-model"
+    assert router.route(None, 100, 0, 512, None) is None
+
+
+def test_canonical_model_names_match_aliases() -> None:
+    router = Router(RoutingConfig())
+    assert router.route("claude-opus-4-20250514", 100, 0, 512, None) == HAIKU
+    assert router.route("claude-haiku-4-5-20251001", 100_000, 0, 512, None) == (
+        "claude-haiku-4-5-20251001"
+    )
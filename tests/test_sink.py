@@ -0,0 +1,166 @@
+"""Tests for beskar.sink.BatchingUsageSink."""
+from __future__ import annotations
+
+import threading
+import time
+from typing import List
+from unittest.mock import MagicMock
+
+import pytest
+
+from beskar.metrics import create_metrics_tracker
+from beskar.sink import BatchingUsageSink
+from beskar.types import BeskarError, MetricsConfig, TokenUsage
+
+
+def _usage(n: int = 1) -> TokenUsage:
+    return TokenUsage(
+        input_tokens=n,
+        output_tokens=0,
+        cache_creation_input_tokens=0,
+        cache_read_input_tokens=0,
+    )
+
+
+def test_batches_by_size() -> None:
+    batches: List[List[TokenUsage]] = []
+    with BatchingUsageSink(batches.append, max_batch_size=3, max_latency_s=60) as sink:
+        for i in range(7):
+            sink.submit(_usage(i))
+        assert sink.flush(timeout=5)
+
+    sizes = [len(b) for b in batches]
+    assert sizes == [3, 3, 1]
+    assert [u.input_tokens for b in batches for u in b] == list(range(7))
+
+
+def test_batches_by_time() -> None:
+    delivered = threading.Event()
+    batches: List[List[TokenUsage]] = []
+
+    def handler(batch: List[TokenUsage]) -> None:
+        batches.append(batch)
+        delivered.set()
+
+    sink = BatchingUsageSink(handler, max_batch_size=100, max_latency_s=0.05)
+    sink.submit(_usage())
+    assert delivered.wait(timeout=5)
+    assert len(batches[0]) == 1
+    sink.close()
+
+
+def test_close_flushes_pending_records() -> None:
+    batches: List[List[TokenUsage]] = []
+    sink = BatchingUsageSink(batches.append, max_batch_size=100, max_latency_s=60)
+    sink.submit(_usage())
+    sink.submit(_usage())
+    sink.close()
+    assert sum(len(b) for b in batches) == 2
+
+
+def test_drop_policy_counts_dropped_records() -> None:
+    release = threading.Event()
+
+    def slow_handler(batch: List[TokenUsage]) -> None:
+        release.wait(timeout=5)
+
+    sink = BatchingUsageSink(
+        slow_handler, max_batch_size=1, max_latency_s=60, max_queue_size=2, full_policy="drop"
+    )
+    for _ in range(20):
+        sink.submit(_usage())
+    assert sink.dropped > 0
+    release.set()
+    sink.close()
+
+
+def test_close_and_flush_time_out_when_handler_stalls() -> None:
+    release = threading.Event()
+
+    def stalled_handler(batch: List[TokenUsage]) -> None:
+        release.wait(timeout=10)
+
+    sink = BatchingUsageSink(stalled_handler, max_batch_size=1, max_queue_size=2)
+    for _ in range(5):
+        sink.submit(_usage())
+    started = time.monotonic()
+    assert sink.flush(timeout=0.2) is False
+    sink.close(timeout=0.2)
+    assert time.monotonic() - started < 2.0
+    release.set()
+
+
+def test_records_racing_close_are_delivered_or_counted() -> None:
+    received: List[TokenUsage] = []
+    sink = BatchingUsageSink(received.extend, max_batch_size=10, max_latency_s=0.01)
+
+    def submitter() -> None:
+        for _ in range(2000):
+            sink.submit(_usage())
+
+    threads = [threading.Thread(target=submitter) for _ in range(4)]
+    for t in threads:
+        t.start()
+    time.sleep(0.001)
+    sink.close()
+    for t in threads:
+        t.join()
+    assert len(received) + sink.dropped == 8000
+
+
+def test_block_policy_waits_for_space() -> None:
+    received: List[TokenUsage] = []
+
+    def slow_handler(batch: List[TokenUsage]) -> None:
+        time.sleep(0.001)
+        received.extend(batch)
+
+    sink = BatchingUsageSink(
+        slow_handler, max_batch_size=1, max_queue_size=1, full_policy="block"
+    )
+    for _ in range(20):
+        sink.submit(_usage())
+    sink.close()
+    assert sink.dropped == 0
+    assert len(received) == 20
+
+
+def test_handler_error_does_not_stop_flusher() -> None:
+    calls: List[int] = []
+
+    def flaky(batch: List[TokenUsage]) -> None:
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise RuntimeError("db down")
+
+    sink = BatchingUsageSink(flaky, max_batch_size=1)
+    sink.submit(_usage())
+    sink.submit(_usage())
+    sink.close()
+    assert sink.errors == 1
+    assert len(calls) == 2
+
+
+def test_submit_after_close_is_dropped() -> None:
+    sink = BatchingUsageSink(lambda batch: None)
+    sink.close()
+    sink.submit(_usage())
+    assert sink.dropped == 1
+
+
+def test_invalid_batch_size_raises() -> None:
+    with pytest.raises(BeskarError):
+        BatchingUsageSink(lambda batch: None, max_batch_size=0)
+
+
+def test_tracker_submits_to_sink() -> None:
+    batches: List[List[TokenUsage]] = []
+    sink = BatchingUsageSink(batches.append, max_latency_s=60)
+    tracker = create_metrics_tracker(MetricsConfig(sink=sink))
+
+    raw = MagicMock(input_tokens=7, output_tokens=1,
+                    cache_creation_input_tokens=0, cache_read_input_tokens=0)
+    tracker.track(raw)
+    assert tracker.flush(timeout=5)
+    tracker.close()
+    assert batches[0][0].input_tokens == 7
@@ -0,0 +1,138 @@
+"""Tests for beskar.spill — spilled tool results and recall."""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from beskar.compressor import (
+    collapse_tool_chains,
+    compress_tool_result,
+    compress_tool_results,
+    dedupe_tool_results,
+)
+from beskar.spill import RECALL_TOOL, RECALL_TOOL_NAME, SpillStore, spill_marker, with_recall_tool
+from beskar.types import CompressorConfig
+
+
+def _block(content: object, tool_use_id: str = "t1") -> dict:
+    return {"type": "tool_result", "tool_use_id": tool_use_id, "content": content}
+
+
+# --- SpillStore ---
+
+
+def test_memory_store_round_trip() -> None:
+    store = SpillStore()
+    store.put("t1", [{"type": "text", "text": "payload"}])
+    assert "t1" in store
+    assert store.get("t1") == [{"type": "text", "text": "payload"}]
+    assert store.get("missing") is None
+
+
+def test_put_keeps_first_payload_for_an_id() -> None:
+    store = SpillStore()
+    store.put("t1", "first")
+    store.put("t1", "second")
+    assert store.get("t1") == "first"
+
+
+def test_memory_lru_evicts_oldest() -> None:
+    store = SpillStore(max_memory_bytes=25)
+    store.put("a", "x" * 10)
+    store.put("b", "y" * 10)
+    assert store.get("a") == "x" * 10  # refreshes "a"
+    store.put("c", "z" * 10)
+    assert store.get("b") is None
+    assert store.get("a") is not None
+
+
+def test_disk_store_is_content_addressed_and_survives_restart(tmp_path: Path) -> None:
+    store = SpillStore(str(tmp_path), max_memory_bytes=1)
+    store.put("t1", "same payload")
+    store.put("t2", "same payload")
+    store.put("t3", "other payload")
+    objects = [f for _, _, files in os.walk(tmp_path / "objects") for f in files]
+    assert len(objects) == 2
+
+    reopened = SpillStore(str(tmp_path))
+    assert reopened.get("t2") == "same payload"
+    assert reopened.get("t3") == "other payload"
+
+
+def test_recall_answers_tool_use() -> None:
+    store = SpillStore()
+    store.put("t1", "full output")
+    tool_use = {
+        "type": "tool_use",
+        "id": "r1",
+        "name": RECALL_TOOL_NAME,
+        "input": {"tool_use_id": "t1"},
+    }
+    assert store.recall(tool_use) == {
+        "type": "tool_result",
+        "tool_use_id": "r1",
+        "content": "full output",
+    }
+    missing = store.recall({**tool_use, "input": {"tool_use_id": "nope"}})
+    assert missing["is_error"] is True
+
+
+def test_with_recall_tool_appends_once() -> None:
+    tools = with_recall_tool([{"name": "search"}])
+    assert tools[-1] is RECALL_TOOL
+    assert with_recall_tool(tools) == tools
+    assert with_recall_tool(None) == [RECALL_TOOL]
+
+
+# --- compressor integration ---
+
+
+def test_truncation_spills_original_and_leaves_marker() -> None:
+    store = SpillStore()
+    config = CompressorConfig(max_tool_result_tokens=10, spill=store)
+    result = compress_tool_result(_block("x" * 200), config)
+    assert result["content"][0]["text"].endswith("[truncated]")
+    assert result["content"][1] == {"type": "text", "text": spill_marker("t1")}
+    assert store.get("t1") == "x" * 200
+
+
+def test_untouched_result_is_not_spilled() -> None:
+    store = SpillStore()
+    block = _block("short")
+    config = CompressorConfig(max_tool_result_tokens=10, spill=store)
+    assert compress_tool_result(block, config) is block
+    assert "t1" not in store
+
+
+def test_collapse_spills_result_and_names_it() -> None:
+    store = SpillStore()
+    messages = [
+        {
+            "role": "assistant",
+            "content": [{"type": "tool_use", "id": "t1", "name": "scan", "input": {}}],
+        },
+        {"role": "user", "content": [_block("scan output")]},
+        {"role": "assistant", "content": "next"},
+        {"role": "user", "content": "go on"},
+    ]
+    result = collapse_tool_chains(messages, CompressorConfig(collapse_after_turns=1, spill=store))
+    assert spill_marker("t1") in result[0]["content"]
+    assert store.get("t1") == "scan output"
+
+
+def test_identical_spilled_results_are_deduped() -> None:
+    store = SpillStore()
+    config = CompressorConfig(max_tool_result_tokens=20, spill=store, dedupe_tool_results=True)
+    messages = []
+    for tool_id in ("t1", "t2"):
+        messages += [
+            {
+                "role": "assistant",
+                "content": [{"type": "tool_use", "id": tool_id, "name": "read", "input": {}}],
+            },
+            {"role": "user", "content": [_block("same payload " * 200, tool_id)]},
+        ]
+    result = dedupe_tool_results(compress_tool_results(messages, config), config)
+    assert result[1]["content"][0]["content"][-1]["text"] == spill_marker("t1")
+    assert result[3]["content"][0]["content"] == "[Same result as tool_use_id t1]"
+    assert store.get("t2") == "same payload " * 200
@@ -0,0 +1,101 @@
+"""Tests for beskar.streaming — usage gathered from stream events."""
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any, Iterator, List
+
+from beskar.streaming import MeteredStream, StreamUsage
+
+
+def _usage(**kwargs: Any) -> SimpleNamespace:
+    fields = {
+        "input_tokens": None,
+        "output_tokens": 0,
+        "cache_creation_input_tokens": None,
+        "cache_read_input_tokens": None,
+    }
+    return SimpleNamespace(**{**fields, **kwargs})
+
+
+def _start(**kwargs: Any) -> SimpleNamespace:
+    return SimpleNamespace(type="message_start", message=SimpleNamespace(usage=_usage(**kwargs)))
+
+
+def _delta(stop_reason: str = "end_turn", **kwargs: Any) -> SimpleNamespace:
+    return SimpleNamespace(
+        type="message_delta",
+        delta=SimpleNamespace(stop_reason=stop_reason),
+        usage=_usage(**kwargs),
+    )
+
+
+def _block(index: int, block_type: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        type="content_block_start", index=index, content_block=SimpleNamespace(type=block_type)
+    )
+
+
+def _text(index: int, text: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        type="content_block_delta", index=index, delta=SimpleNamespace(type="text_delta", text=text)
+    )
+
+
+def test_usage_merges_start_and_delta() -> None:
+    usage = StreamUsage()
+    assert usage.usage is None
+    usage.observe(_start(input_tokens=100, output_tokens=1, cache_read_input_tokens=900))
+    usage.observe(_delta(output_tokens=40, cache_read_input_tokens=None))
+    merged = usage.usage
+    assert merged is not None
+    assert (merged.input_tokens, merged.output_tokens) == (100, 40)
+    assert merged.cache_read_input_tokens == 900
+    assert usage.complete
+
+
+def test_first_token_time_set_once() -> None:
+    usage = StreamUsage()
+    usage.observe(_start(input_tokens=1))
+    assert usage.first_token_at is None
+    usage.observe(_text(0, "a"))
+    first = usage.first_token_at
+    usage.observe(_text(0, "b"))
+    assert first is not None and usage.first_token_at == first
+
+
+def test_thinking_tokens_exclude_visible_text() -> None:
+    usage = StreamUsage()
+    usage.observe(_start(input_tokens=10, output_tokens=1))
+    usage.observe(_block(0, "thinking"))
+    usage.observe(_block(1, "text"))
+    for _ in range(4):
+        usage.observe(_text(1, "x" * 100))
+    usage.observe(_delta(output_tokens=500))
+    assert usage.thinking_tokens() == 400
+
+    no_thinking = StreamUsage()
+    no_thinking.observe(_start(input_tokens=10))
+    no_thinking.observe(_delta(output_tokens=500))
+    assert no_thinking.thinking_tokens() == 0
+
+
+class _SdkStream:
+    def __init__(self, events: List[Any]) -> None:
+        self.events = events
+        self.closed = False
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.events)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_metered_stream_calls_on_done_once() -> None:
+    done: List[StreamUsage] = []
+    sdk_stream = _SdkStream([_start(input_tokens=5, output_tokens=1), _delta(output_tokens=3)])
+    stream = MeteredStream(sdk_stream, done.append)
+    assert list(stream) == sdk_stream.events
+    stream.close()
+    assert sdk_stream.closed
+    assert len(done) == 1 and done[0].complete
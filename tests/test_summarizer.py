@@ -0,0 +1,207 @@
+"""Tests for beskar.summarizer — background summaries for the summarize strategy."""
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import List
+
+from beskar.pruner import prune_messages
+from beskar.summarizer import BackgroundSummarizer, SummaryCache, render_transcript
+from beskar.types import BeskarMessage, PrunerConfig
+
+
+def _msgs(n: int) -> List[BeskarMessage]:
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"m{i}"} for i in range(n)
+    ]
+
+
+def _fake_summarize(calls: List[int]):  # type: ignore[no-untyped-def]
+    def summarize(prefix: List[BeskarMessage]) -> str:
+        calls.append(len(prefix))
+        return f"summary of {len(prefix)}"
+
+    return summarize
+
+
+def test_render_transcript_covers_block_types() -> None:
+    messages = [
+        {"role": "user", "content": "find it"},
+        {
+            "role": "assistant",
+            "content": [
+                {"type": "text", "text": "searching"},
+                {"type": "tool_use", "id": "t1", "name": "grep", "input": {"q": "x"}},
+            ],
+        },
+        {
+            "role": "user",
+            "content": [{"type": "tool_result", "tool_use_id": "t1", "content": "found"}],
+        },
+    ]
+    assert render_transcript(messages) == (
+        'user: find it\nassistant: searching\nassistant called grep({"q": "x"})\n'
+        "tool result: found"
+    )
+
+
+def test_prefetch_starts_before_limit_and_aligns_cuts() -> None:
+    calls: List[int] = []
+    summarizer = BackgroundSummarizer(_fake_summarize(calls), step=4)
+    summarizer.prefetch(_msgs(5), max_turns=10)
+    summarizer.wait()
+    assert calls == []  # more than one step away from the limit
+
+    summarizer.prefetch(_msgs(9), max_turns=10)
+    summarizer.wait()
+    # cut 4: one chunk; cut 8: the second chunk, then a merge of the two
+    assert calls == [4, 4, 2]
+
+
+def test_ready_is_non_blocking() -> None:
+    release = threading.Event()
+
+    def slow(prefix: List[BeskarMessage]) -> str:
+        release.wait(5)
+        return "done"
+
+    summarizer = BackgroundSummarizer(slow, step=2)
+    messages = _msgs(12)
+    summarizer.prefetch(messages, max_turns=10)
+    assert summarizer.ready(messages, max_turns=10) is None
+    release.set()
+    summarizer.wait()
+    assert summarizer.ready(messages, max_turns=10) == (2, "done")
+    summarizer.close()
+
+
+def test_evicted_jobs_are_cancelled() -> None:
+    release = threading.Event()
+
+    def slow(prefix: List[BeskarMessage]) -> str:
+        release.wait(5)
+        return "done"
+
+    summarizer = BackgroundSummarizer(slow, step=2, max_jobs=1)
+    messages = _msgs(30)
+    summarizer._submit(messages, 2)  # runs, blocking the worker
+    summarizer._submit(messages, 4)  # queued, then evicted
+    queued = summarizer._jobs[next(iter(summarizer._jobs))]
+    summarizer._submit(messages, 6)
+    assert queued.cancelled()
+    release.set()
+    summarizer.wait()
+    latest = summarizer._jobs[next(iter(summarizer._jobs))]
+    assert latest.done() and not latest.cancelled()
+    summarizer.close()
+
+
+def test_failed_summary_is_not_used() -> None:
+    def broken(prefix: List[BeskarMessage]) -> str:
+        raise RuntimeError("boom")
+
+    summarizer = BackgroundSummarizer(broken, step=2)
+    messages = _msgs(12)
+    summarizer.prefetch(messages, max_turns=10)
+    summarizer.wait()
+    assert summarizer.ready(messages, max_turns=10) is None
+
+
+def test_pruner_swaps_in_ready_summary() -> None:
+    release = threading.Event()
+
+    def gated(prefix: List[BeskarMessage]) -> str:
+        release.wait(5)
+        return f"summary of {len(prefix)}"
+
+    summarizer = BackgroundSummarizer(gated, step=4)
+    config = PrunerConfig(strategy="summarize", max_turns=6)
+
+    # Before the summary exists, pruning falls back to the placeholder.
+    first = prune_messages(_msgs(9), config, summarizer=summarizer)
+    assert first[0]["content"] == "[Previous context: 3 turns summarized]"
+    release.set()
+    summarizer.wait()
+
+    result = prune_messages(_msgs(9), config, summarizer=summarizer)
+    assert result[0] == {
+        "role": "user",
+        "content": "[Summary of the previous 4 turns]\nsummary of 4",
+    }
+    assert [m["content"] for m in result[1:]] == ["m4", "m5", "m6", "m7", "m8"]
+
+    # The same summary keeps serving as the conversation grows within the step.
+    grown = prune_messages(_msgs(10), config, summarizer=summarizer)
+    assert grown[0]["content"].endswith("summary of 4")
+    assert len(grown) == 7
+
+
+def test_prefix_summaries_reuse_chunks_and_merges() -> None:
+    calls: List[int] = []
+    summarizer = BackgroundSummarizer(_fake_summarize(calls), step=2)
+    messages = _msgs(16)
+
+    summarizer.summarize_prefix(messages[:8])  # 4 chunks, 2 + 1 merges
+    assert len(calls) == 7
+    calls.clear()
+
+    text = summarizer.summarize_prefix(messages[:14])  # 7 chunks → nodes of 4, 2, 1
+    assert len(calls) == 3 + 1  # three new chunks, one new merge
+    assert len(text.split("\n\n")) == 3
+
+
+def test_summary_cache_is_bounded_and_persists(tmp_path: Path) -> None:
+    cache = SummaryCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    path = str(tmp_path / "summaries.json")
+    cache.save(path)
+    loaded = SummaryCache.load(path)
+    assert loaded.get("a") == "1" and loaded.get("c") == "3"
+    assert len(SummaryCache.load(str(tmp_path / "missing.json"))) == 0
+
+
+def test_persisted_cache_avoids_resummarizing() -> None:
+    calls: List[int] = []
+    cache = SummaryCache()
+    BackgroundSummarizer(_fake_summarize(calls), step=2, cache=cache).summarize_prefix(_msgs(4))
+    calls.clear()
+    again = BackgroundSummarizer(_fake_summarize(calls), step=2, cache=cache)
+    assert again.summarize_prefix(_msgs(4)) == "summary of 2"
+    assert calls == []
+
+
+def _tool_loop(n: int) -> List[BeskarMessage]:
+    messages: List[BeskarMessage] = [{"role": "user", "content": "fix the build"}]
+    for i in range(n):
+        messages.append(
+            {
+                "role": "assistant",
+                "content": [{"type": "tool_use", "id": f"t{i}", "name": "run", "input": {}}],
+            }
+        )
+        result = {"type": "tool_result", "tool_use_id": f"t{i}", "content": "ok"}
+        messages.append({"role": "user", "content": [result]})
+    return messages
+
+
+def test_cut_never_orphans_a_tool_result() -> None:
+    calls: List[int] = []
+    summarizer = BackgroundSummarizer(_fake_summarize(calls), step=4)
+    config = PrunerConfig(strategy="summarize", max_turns=4)
+    messages = _tool_loop(5)  # the step-aligned cut at 8 lands on tool_result t3
+
+    placeholder = prune_messages(messages, config, summarizer=summarizer)
+    summarizer.wait()
+    summarized = prune_messages(messages, config, summarizer=summarizer)
+    summarizer.close()
+
+    assert calls == [4, 3, 2]
+    assert summarized[0]["content"].startswith("[Summary of the previous 7 turns]")
+    for result in (placeholder, summarized):
+        first_kept = result[1]
+        assert first_kept["role"] == "assistant"
+        assert first_kept["content"][0]["type"] == "tool_use"
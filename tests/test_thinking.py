@@ -0,0 +1,119 @@
+"""Tests for beskar.thinking — per-call thinking budgets."""
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+from anthropic.types import Message, TextBlock, ThinkingBlock, Usage
+
+from beskar.thinking import MIN_BUDGET_TOKENS, ThinkingController, thinking_tokens, turn_type
+from beskar.types import BeskarMessage, ThinkingConfig
+
+PLANNING: List[BeskarMessage] = [{"role": "user", "content": "refactor the parser"}]
+
+
+def _digestion(caller_thought: bool, output: str = "ok") -> List[BeskarMessage]:
+    content: List[Dict[str, Any]] = []
+    if caller_thought:
+        content.append({"type": "thinking", "thinking": "hmm", "signature": "sig"})
+    content.append({"type": "tool_use", "id": "t1", "name": "run", "input": {}})
+    return [
+        PLANNING[0],
+        {"role": "assistant", "content": content},
+        {
+            "role": "user",
+            "content": [{"type": "tool_result", "tool_use_id": "t1", "content": output}],
+        },
+    ]
+
+
+def _params(**extra: Any) -> Dict[str, Any]:
+    return {"model": "m", "max_tokens": 16_000, **extra}
+
+
+def _response(output_tokens: int, text: str = "", thought: bool = True) -> Message:
+    content: List[Any] = [TextBlock(type="text", text=text)]
+    if thought:
+        content.insert(0, ThinkingBlock(type="thinking", thinking="...", signature="s"))
+    return Message(
+        id="msg",
+        type="message",
+        role="assistant",
+        model="m",
+        content=content,
+        stop_reason="end_turn",
+        stop_sequence=None,
+        usage=Usage(input_tokens=10, output_tokens=output_tokens),
+    )
+
+
+def test_turn_type() -> None:
+    assert turn_type(PLANNING) == "planning"
+    assert turn_type(_digestion(False)) == "digestion"
+    assert turn_type([]) == "planning"
+
+
+def test_planning_gets_budget_and_digestion_none() -> None:
+    controller = ThinkingController(ThinkingConfig(planning_budget=4000))
+    assert controller.apply(_params(), PLANNING, "m") == (
+        {"type": "enabled", "budget_tokens": 4000},
+        "planning",
+        4000,
+    )
+    assert controller.apply(_params(), _digestion(False), "m") == (None, "digestion", 0)
+
+
+def test_tool_loop_that_thought_keeps_thinking() -> None:
+    controller = ThinkingController(ThinkingConfig())
+    thinking, turn, budget = controller.apply(_params(), _digestion(True), "m")
+    assert thinking == {"type": "enabled", "budget_tokens": MIN_BUDGET_TOKENS}
+    assert budget == MIN_BUDGET_TOKENS
+
+
+def test_trigger_raises_digestion_budget() -> None:
+    config = ThinkingConfig(planning_budget=6000, triggers=(r"\btraceback\b",))
+    controller = ThinkingController(config)
+    messages = _digestion(True, output="Traceback (most recent call last): ...")
+    assert controller.apply(_params(), messages, "m")[2] == 6000
+    # A loop that started without thinking cannot switch it on.
+    assert controller.apply(_params(), _digestion(False, "Traceback"), "m")[0] is None
+
+
+def test_merges_with_user_thinking() -> None:
+    controller = ThinkingController(ThinkingConfig(planning_budget=8000))
+    user = {"type": "enabled", "budget_tokens": 3000, "extra": 1}
+    thinking, _, budget = controller.apply(_params(thinking=user), PLANNING, "m")
+    assert thinking == {"type": "enabled", "budget_tokens": 3000, "extra": 1}
+    disabled = {"type": "disabled"}
+    assert controller.apply(_params(thinking=disabled), PLANNING, "m")[0] is disabled
+
+
+def test_request_constraints_turn_thinking_off() -> None:
+    controller = ThinkingController(ThinkingConfig())
+    assert controller.apply(_params(max_tokens=5000), PLANNING, "m")[2] == 4999
+    assert controller.apply(_params(max_tokens=1000), PLANNING, "m")[0] is None
+    forced = _params(tool_choice={"type": "tool", "name": "run"})
+    assert controller.apply(forced, PLANNING, "m")[0] is None
+
+
+def test_incompatible_sampling_params_leave_thinking_unset() -> None:
+    controller = ThinkingController(ThinkingConfig(triggers=["think hard"]))
+    triggered: List[BeskarMessage] = [{"role": "user", "content": "think hard about it"}]
+    for sampling in ({"temperature": 0.2}, {"top_k": 40}, {"top_p": 0.5}):
+        assert controller.apply(_params(**sampling), PLANNING, "m") == (None, "planning", 0)
+        assert controller.apply(_params(**sampling), triggered, "m")[0] is None
+    assert controller.apply(_params(temperature=1), PLANNING, "m")[0] is not None
+
+
+def test_observed_usage_lowers_budget() -> None:
+    controller = ThinkingController(ThinkingConfig(min_samples=5, margin=0.5))
+    for _ in range(4):
+        controller.observe("m", "planning", _response(2000))
+    assert controller.budget("m", "planning") == 8192
+    controller.observe("m", "planning", _response(2000))
+    assert 2800 <= controller.budget("m", "planning") <= 3200
+    assert controller.budget("other", "planning") == 8192
+
+
+def test_thinking_tokens_excludes_visible_output() -> None:
+    assert thinking_tokens(_response(500, text="x" * 400)) == 400
+    assert thinking_tokens(_response(500, thought=False)) == 0
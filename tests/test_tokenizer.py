@@ -0,0 +1,115 @@
+"""Tests for beskar.tokenizer — local BPE token estimation."""
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from beskar.compressor import compress_tool_result
+from beskar.pruner import prune_messages
+from beskar.tokenizer import BPEEstimator, dump_merges, load_merges, train_merges
+from beskar.types import BeskarError, CompressorConfig, PrunerConfig, estimate_many
+
+
+# --- merge tables ---
+
+
+def test_merges_round_trip_through_text_format() -> None:
+    merges = [("h", "e"), (" ", "w"), ("\n", "\n"), ("é", "t")]
+    ranks = load_merges("# header\n" + dump_merges(merges))
+    assert list(ranks) == merges
+    assert ranks[("h", "e")] == 0
+
+
+def test_load_merges_rejects_malformed_line() -> None:
+    with pytest.raises(BeskarError):
+        load_merges("a b c\n")
+
+
+def test_train_merges_learns_frequent_pairs_first() -> None:
+    merges = train_merges(["low low low lower lowest"], 3)
+    assert merges[0] in (("l", "o"), ("o", "w"))
+    assert len(merges) == 3
+
+
+# --- BPEEstimator ---
+
+
+def test_trained_table_merges_words_to_single_tokens() -> None:
+    ranks = load_merges(dump_merges(train_merges(["hello hello hello"], 10)))
+    estimate = BPEEstimator(ranks)
+    assert estimate("hello") == 1
+    assert estimate("hello hello") == 2
+
+
+def test_unknown_characters_count_one_token_each() -> None:
+    assert BPEEstimator({})("xyz") == 3
+
+
+def test_scale_applies_correction() -> None:
+    assert BPEEstimator({}, scale=0.5)("abcd") == 2
+
+
+def test_bundled_table_loads_lazily() -> None:
+    estimate = BPEEstimator()
+    assert estimate._ranks is None
+    assert 0 < estimate("The quick brown fox jumps over the lazy dog.") < 20
+    assert estimate._ranks is not None
+
+
+def test_estimate_many_matches_per_text_calls() -> None:
+    texts = ["hello world", '{"id": 12345, "ok": true}', "", "def f(x):\n    return x\n"]
+    estimate = BPEEstimator()
+    assert estimate.estimate_many(texts) == [estimate(t) for t in texts]
+
+
+def test_long_runs_estimate_in_linear_time() -> None:
+    estimate = BPEEstimator()
+    estimate("warm up")
+    for run in (" " * 20_000, "x" * 20_000, "=" * 20_000):
+        start = time.perf_counter()
+        assert estimate(run) > 0
+        assert time.perf_counter() - start < 0.5
+
+
+def test_cache_is_bounded() -> None:
+    estimate = BPEEstimator({}, cache_size=4)
+    estimate(" ".join(f"w{i}" for i in range(20)))
+    assert len(estimate._cache) <= 4
+
+
+def test_estimate_many_helper_falls_back_for_plain_callables() -> None:
+    assert estimate_many(["abcdefgh", "ab"]) == [2, 0]
+    assert estimate_many(["abc"], len) == [3]
+    assert estimate_many(["abc", "de"], BPEEstimator({})) == [3, 2]
+
+
+# --- module integration ---
+
+
+def test_compressor_counts_text_blocks_with_estimator() -> None:
+    block = {
+        "type": "tool_result",
+        "tool_use_id": "t1",
+        "content": [{"type": "text", "text": "a" * 10}, {"type": "text", "text": "b" * 10}],
+    }
+    estimate = BPEEstimator({})  # no merges: one token per character
+    tight = CompressorConfig(max_tool_result_tokens=15)
+    assert compress_tool_result(block, tight, estimate) is not block
+    exact = CompressorConfig(max_tool_result_tokens=20)
+    assert compress_tool_result(block, exact, estimate) is block
+
+
+def test_importance_pruner_scores_length_in_tokens() -> None:
+    messages = [
+        {"role": "user", "content": "x" * 4000},
+        {"role": "assistant", "content": "short"},
+        {"role": "user", "content": "q"},
+        {"role": "assistant", "content": "a"},
+    ]
+    config = PrunerConfig(strategy="importance", max_turns=3)
+    # By characters the long message scores highest; an estimator that counts
+    # it as one token makes it the cheapest to drop.
+    assert messages[0] in prune_messages(messages, config)
+    kept = prune_messages(messages, config, lambda text: 1)
+    assert messages[0] not in kept
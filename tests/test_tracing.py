@@ -0,0 +1,130 @@
+"""Tests for beskar.tracing and per-stage spans in BeskarClient."""
+from __future__ import annotations
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from beskar import BeskarClient
+from beskar.tracing import InMemoryTracer, NoOpTracer, resolve_tracer
+from beskar.types import (
+    BeskarConfig,
+    CacheConfig,
+    CompressorConfig,
+    MetricsConfig,
+    PrunerConfig,
+    TracingConfig,
+)
+
+
+def _make_response(cache_read: int = 0) -> MagicMock:
+    resp = MagicMock()
+    resp.usage.input_tokens = 100
+    resp.usage.output_tokens = 50
+    resp.usage.cache_creation_input_tokens = 0
+    resp.usage.cache_read_input_tokens = cache_read
+    return resp
+
+
+@pytest.fixture
+def mock_sdk():
+    with patch("anthropic.Anthropic") as MockAnthropic:
+        mock_instance = MagicMock()
+        MockAnthropic.return_value = mock_instance
+        mock_create = MagicMock(return_value=_make_response(cache_read=40))
+        mock_instance.messages.create = mock_create
+        yield mock_create
+
+
+PARAMS = {
+    "model": "claude-sonnet-4-6",
+    "max_tokens": 1024,
+    "system": "x" * 4097,
+    "messages": [{"role": "user", "content": f"msg{i}"} for i in range(5)],
+}
+
+
+# --- resolve_tracer ---
+
+
+def test_resolve_tracer_none_config_is_noop() -> None:
+    assert isinstance(resolve_tracer(None), NoOpTracer)
+
+
+def test_resolve_tracer_explicit_tracer_returned() -> None:
+    tracer = InMemoryTracer()
+    assert resolve_tracer(TracingConfig(tracer=tracer)) is tracer
+
+
+def test_noop_tracer_span_not_recording() -> None:
+    with NoOpTracer().start_as_current_span("x") as span:
+        assert span.is_recording() is False
+        span.set_attribute("k", 1)  # should not raise
+
+
+# --- InMemoryTracer ---
+
+
+def test_in_memory_tracer_records_parent_and_attributes() -> None:
+    tracer = InMemoryTracer()
+    with tracer.start_as_current_span("outer"):
+        with tracer.start_as_current_span("inner") as span:
+            span.set_attribute("k", 2)
+
+    spans = tracer.get_finished_spans()
+    assert [s.name for s in spans] == ["inner", "outer"]
+    assert spans[0].parent == "outer"
+    assert spans[0].attributes == {"k": 2}
+    assert spans[1].parent is None
+
+
+# --- Client integration ---
+
+
+def test_client_emits_span_per_stage(mock_sdk: MagicMock) -> None:
+    tracer = InMemoryTracer()
+    client = BeskarClient(
+        BeskarConfig(
+            cache=CacheConfig(),
+            pruner=PrunerConfig(max_turns=3),
+            compressor=CompressorConfig(max_tool_result_tokens=100),
+            metrics=MetricsConfig(),
+            tracing=TracingConfig(tracer=tracer),
+        )
+    )
+    client.messages.create(**PARAMS)
+
+    spans = {s.name: s for s in tracer.get_finished_spans()}
+    assert set(spans) == {
+        "beskar.messages.create",
+        "beskar.pruner",
+        "beskar.cache",
+        "beskar.compressor",
+        "beskar.api_call",
+        "beskar.metrics",
+    }
+    assert spans["beskar.pruner"].parent == "beskar.messages.create"
+    assert spans["beskar.pruner"].attributes["beskar.messages.in"] == 5
+    assert spans["beskar.pruner"].attributes["beskar.messages.out"] == 3
+    assert spans["beskar.cache"].attributes["beskar.cache.breakpoints"] == 1
+    assert spans["beskar.api_call"].attributes["beskar.usage.cache_read_input_tokens"] == 40
+
+    root = spans["beskar.messages.create"].attributes
+    assert root["beskar.messages.in"] == 5
+    assert root["beskar.messages.out"] == 3
+    assert root["beskar.tokens.estimated_before"] >= root["beskar.tokens.estimated_after"]
+
+
+def test_client_disabled_stages_emit_no_spans(mock_sdk: MagicMock) -> None:
+    tracer = InMemoryTracer()
+    client = BeskarClient(BeskarConfig(tracing=TracingConfig(tracer=tracer)))
+    client.messages.create(**PARAMS)
+
+    names = [s.name for s in tracer.get_finished_spans()]
+    assert names == ["beskar.api_call", "beskar.messages.create"]
+
+
+def test_client_without_tracing_config_still_works(mock_sdk: MagicMock) -> None:
+    client = BeskarClient(BeskarConfig(pruner=PrunerConfig(max_turns=2)))
+    client.messages.create(**PARAMS)
+    assert len(mock_sdk.call_args.kwargs["messages"]) == 2
@@ -0,0 +1,111 @@
+"""Tests for beskar.window.RollingWindow and tracker window summaries."""
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from beskar.metrics import create_metrics_tracker
+from beskar.types import BeskarError, MetricsConfig, TokenUsage
+from beskar.window import CALLS, INPUT, RollingWindow
+
+
+def _usage(input_tokens: int = 10, cache_read: int = 0) -> TokenUsage:
+    return TokenUsage(
+        input_tokens=input_tokens,
+        output_tokens=1,
+        cache_creation_input_tokens=0,
+        cache_read_input_tokens=cache_read,
+    )
+
+
+def test_window_sums_recent_slots() -> None:
+    window = RollingWindow(60, slots=60)
+    window.add(_usage(10), 0.5, 0.0, now=1000.0)
+    window.add(_usage(20), 0.5, 0.0, now=1030.0)
+
+    counts, cost, _ = window.totals(now=1030.0)
+    assert counts[CALLS] == 2
+    assert counts[INPUT] == 30
+    assert cost == 1.0
+
+
+def test_window_merge_adds_live_slots() -> None:
+    window = RollingWindow(60, slots=60)
+    window.add(_usage(10), 0.5, 0.0, now=1000.0)
+    other = RollingWindow(60, slots=60)
+    other.add(_usage(20), 0.25, 0.0, now=1000.0)
+    other.add(_usage(5), 0.25, 0.0, now=1030.0)
+
+    window.merge(other)
+    counts, cost, _ = window.totals(now=1030.0)
+    assert counts[INPUT] == 35
+    assert counts[CALLS] == 3
+    assert cost == 1.0
+    with pytest.raises(BeskarError):
+        window.merge(RollingWindow(120, slots=60))
+
+
+def test_window_expires_old_slots() -> None:
+    window = RollingWindow(60, slots=60)
+    window.add(_usage(10), 0.0, 0.0, now=1000.0)
+    window.add(_usage(20), 0.0, 0.0, now=1050.0)
+
+    counts, _, _ = window.totals(now=1065.0)
+    assert counts[INPUT] == 20
+
+
+def test_window_reuses_slot_after_wraparound() -> None:
+    window = RollingWindow(10, slots=10)
+    window.add(_usage(5), 0.0, 0.0, now=100.0)
+    window.add(_usage(7), 0.0, 0.0, now=110.0)  # same slot index, newer interval
+
+    counts, _, _ = window.totals(now=110.0)
+    assert counts[INPUT] == 7
+
+
+def test_window_ignores_records_older_than_ring() -> None:
+    window = RollingWindow(10, slots=10)
+    window.add(_usage(7), 0.0, 0.0, now=110.0)
+    window.add(_usage(5), 0.0, 0.0, now=100.0)
+
+    counts, _, _ = window.totals(now=110.0)
+    assert counts[INPUT] == 7
+
+
+def test_window_invalid_span_raises() -> None:
+    with pytest.raises(BeskarError):
+        RollingWindow(0)
+
+
+def _make_raw(input_tokens: int, cache_read: int = 0) -> MagicMock:
+    raw = MagicMock()
+    raw.input_tokens = input_tokens
+    raw.output_tokens = 0
+    raw.cache_creation_input_tokens = 0
+    raw.cache_read_input_tokens = cache_read
+    return raw
+
+
+def test_tracker_window_summary(monkeypatch: pytest.MonkeyPatch) -> None:
+    import beskar.metrics as metrics
+
+    clock = [10_000.0]
+    monkeypatch.setattr(metrics.time, "time", lambda: clock[0])
+    tracker = create_metrics_tracker(MetricsConfig(windows=(60, 3600)))
+
+    tracker.track(_make_raw(900, cache_read=100))
+    clock[0] += 120
+    tracker.track(_make_raw(100, cache_read=900))
+
+    last_minute = tracker.window_summary(60)
+    assert last_minute.total_calls == 1
+    assert abs(last_minute.cache_hit_rate - 0.9) < 1e-9
+    assert tracker.window_summary(3600).total_calls == 2
+    assert tracker.summary().total_calls == 2
+
+
+def test_tracker_unknown_window_raises() -> None:
+    tracker = create_metrics_tracker(MetricsConfig(windows=(60,)))
+    with pytest.raises(BeskarError):
+        tracker.window_summary(900)